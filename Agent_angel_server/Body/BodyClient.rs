@@ -3,7 +3,7 @@
    ⚡ 逻辑摘要 : 封装 HTTP 请求，将 Rust 端的 BrowserAction 转换为 JSON 发送给 Python Worker，并处理响应数据（如 Base64 截图解码）。
    💡 易懂解释 : 这里负责开心地把 Rust 的指令送给 Python 朋友，让它帮忙操作浏览器，然后再把结果带回来！
    🔋 未来扩展 : 支持 WebSocket 长连接以降低 HTTP 握手延迟；增加重试机制。
-   📊 当前状态 : 活跃 (更新: 2025-12-06)
+   📊 当前状态 : 活跃 (更新: 2026-10-17)
    🧱 Body/BodyClient.rs 踩坑记录 (累积，勿覆盖) :
       1. [2025-12-04] [已修复] [截图格式]: Python 返回 JSON 包装的 Base64，而非直接二进制。 -> 需先解析 JSON。 (Line 108)
    ========================================================================== */
@@ -116,19 +116,21 @@ impl BrowserClient {
         //  🎉 获取截图 (用户ID)
         //
         //  🎨 代码用途：
-        //      向 Python 端发送 GET 请求，获取当前页面的 Base64 截图并解码为二进制。
+        //      向 Python 端发送 GET 请求 (Accept: image/jpeg)，直接获取 JPEG 原始字节；
+        //      若对端仍返回旧版 JSON，则回退为 Base64 解码。
         //
         //  💡 易懂解释:
         //      问问 Python：“现在屏幕上是什么样子呀？快拍张照片发给我看看！”
         //
         //  ⚠️ 警告:
-        //      [内存消耗]: 高分辨率截图解码后占用内存较大。
+        //      [内存消耗]: 高分辨率截图占用内存较大。
         //
         //  ⚙️ 触发源:
         //      通过 Planner.rs 视觉系统的 “获取视野” 请求 -> process_user 函数触发
         // =============================================================================
         let url = format!("{}/state/screenshot?user_id={}", PYTHON_WORKER_URL, user_id); // 🔗 拼接 API 地址
         let res = self.client.get(&url) // 📥 构建 GET 请求
+            .header("Accept", "image/jpeg, application/json;q=0.5") // 🖼️ 优先二进制
             .send() // 🚀 发送网络请求
             .await // ⏳ 等待异步响应
             .map_err(|e| e.to_string())?; // 🚨 转换错误类型
@@ -137,9 +139,15 @@ impl BrowserClient {
             return Err(format!("Failed to get screenshot: {}", res.status())); // ❌ 返回错误信息
         }
 
-        // Python returns raw bytes or base64? Let's assume raw bytes for efficiency if possible, 
-        // but for simplicity with JSON APIs, base64 in JSON is safer.
-        // Let's assume the Python endpoint returns JSON: { "screenshot": "base64..." }
+        let is_jpeg = res.headers().get("content-type") // 🔍 读取内容类型
+            .and_then(|v| v.to_str().ok()) // 🔤 转为字符串
+            .map(|v| v.starts_with("image/jpeg")) // 🖼️ 判断二进制
+            .unwrap_or(false); // 🚫 默认 JSON
+        if is_jpeg { // 🚦 二进制响应
+            return res.bytes().await.map(|b| b.to_vec()).map_err(|e| e.to_string()); // 📤 原始字节
+        }
+
+        // 旧版 Worker 返回 JSON: { "screenshot": "base64..." }
         let json: serde_json::Value = res.json().await.map_err(|e| e.to_string())?; // 📦 解析 JSON 数据
         let b64 = json["screenshot"].as_str().ok_or("No screenshot field")?; // 🔍 提取截图字段
         
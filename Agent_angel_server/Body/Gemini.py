@@ -3,12 +3,13 @@
 #  ⚡ 逻辑摘要 : 封装 Google Gemini API，负责图像理解和动作规划。
 #  💡 易懂解释 : 机器人的 "大脑"，看图说话，告诉手脚该干嘛。
 #  🔋 未来扩展 : 支持更多模型 (GPT-4o, Claude 3.5)，支持流式输出。
-#  📊 当前状态 : 活跃 (更新: 2025-12-06)
+#  📊 当前状态 : 活跃 (更新: 2026-10-17)
 #  🧱 Body/Gemini.py 踩坑记录 (累积，勿覆盖) :
 #     1. [2025-12-04] [已修复] [JSON解析]: Gemini 有时会返回 Markdown 格式的 JSON。 -> 增加了 strip() 和 replace() 清理代码。
 # ==========================================================================
 
 import aiohttp
+import asyncio
 import json
 import time
 import sys
@@ -16,20 +17,125 @@ import os
 
 # 🛠️ 确保能导入 Memory 模块
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from Memory.Config import GEMINI_API_KEY, PRICING_TABLE
+from Memory.Config import PRICING_TABLE, GEMINI_KEY_MAX_ATTEMPTS, GEMINI_MAX_CONNECTIONS, GEMINI_MAX_INFLIGHT, GEMINI_DNS_TTL_S, GEMINI_KEEPALIVE_S, GEMINI_TIMEOUT_S, GEMINI_API_BASE, GEMINI_STREAMING, GEMINI_MODEL_TIERS, GEMINI_ESCALATE_CONFIDENCE
+from Body.PlanCache import angel_plan_cache
+from Body.KeyPool import angel_key_pool, THROTTLE_STATUSES
+from Body.ImagePrep import map_to_viewport
+from Energy.SessionCost import global_session_cost
+from Energy.Budget import global_budget
+
+IMAGE_TOKENS = 258 # 🖼️ Gemini 1.5 单张图片固定 Token 数 (估算回退用)
+
+VALID_ACTIONS = ("click", "type", "scroll", "navigate", "done", "wait") # ✅ 合法动作
+
+def plan_problem(plan):
+    # =============================================================================
+    #  🎉 检查计划 (动作计划)
+    #
+    #  🎨 代码用途:
+    #      判断计划是否需要升级到更大的模型，返回原因 (no_plan / invalid / low_confidence)，合格返回 None。
+    #
+    #  💡 易懂解释:
+    #      看看小脑袋给的答案靠不靠谱！
+    #
+    #  ⚠️ 警告:
+    #      [置信度缺失]: 未返回 confidence 的计划视为合格，不升级。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/Gemini.py "plan_next_action" -> plan_problem
+    # =============================================================================
+    if not isinstance(plan, dict): return "no_plan" # 🛑 无计划或解析失败
+    action = plan.get("action") # 🎬 动作
+    params = plan.get("params") or {} # 📋 参数
+    if action not in VALID_ACTIONS or not isinstance(params, dict): return "invalid" # 🛑 未知动作
+    try:
+        if action == "click" and "element" in params: int(params["element"]) # 🔢 元素序号必须是整数
+        elif action == "click" and not (0 <= float(params["x"]) <= 1 and 0 <= float(params["y"]) <= 1): return "invalid" # 🛑 坐标越界
+        if action == "type" and not params.get("text"): return "invalid" # 🛑 缺少文本
+        if action == "navigate" and not params.get("url"): return "invalid" # 🛑 缺少 URL
+        if float(plan.get("confidence", 1.0)) < GEMINI_ESCALATE_CONFIDENCE: return "low_confidence" # 🤔 不够自信
+    except (KeyError, TypeError, ValueError): return "invalid" # 🛑 参数缺失或类型错误
+    return None # ✅ 合格
+
+def count_images(payload):
+    return sum(1 for part in payload["contents"][0]["parts"] if "inline_data" in part) # 🖼️ 负载中的图片数
+
+def estimate_tokens(prompt, images=1, output=256):
+    return int(len(prompt) * 0.35) + images * IMAGE_TOKENS + output # 📏 调用前预估 Token (用于配额预扣)
+
+class JsonObjectScanner:
+    # =============================================================================
+    #  🎉 增量 JSON 扫描器
+    #
+    #  🎨 代码用途:
+    #      逐段喂入模型输出文本，跳过对象前的 Markdown 标记，
+    #      在第一个顶层 JSON 对象闭合时立即返回解析结果。
+    #
+    #  💡 易懂解释:
+    #      边听边记，大括号一合上就知道答案了，不用等它说完！
+    #
+    #  ⚠️ 警告:
+    #      [字符串感知]: 会跟踪字符串与转义，字符串内的括号不计入深度。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/Gemini.py "_request_stream" -> JsonObjectScanner
+    # =============================================================================
+    def __init__(self):
+        self.buf = [] # 📋 对象文本
+        self.depth = 0 # 🧮 括号深度
+        self.in_str = False # 🔤 是否在字符串内
+        self.escape = False # ↩️ 上一个字符是否为转义
+        self.text = [] # 📜 全部原文 (兜底解析用)
+
+    def feed(self, chunk):
+        # =============================================================================
+        #  🎉 喂入文本 (文本片段)
+        #
+        #  🎨 代码用途:
+        #      扫描新片段，对象闭合时返回 dict，否则返回 None。
+        #
+        #  💡 易懂解释:
+        #      又听到一句，看看话说完没有！
+        #
+        #  ⚠️ 警告:
+        #      [非法对象]: 闭合后解析失败会抛出 ValueError。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "_request_stream" -> feed
+        # =============================================================================
+        self.text.append(chunk) # 📜 记录原文
+        for ch in chunk: # 🔄 逐字符扫描
+            if self.depth == 0: # 🚦 尚未进入对象
+                if ch != "{": continue # 🛑 跳过前缀
+            elif self.in_str: # 🔤 字符串内
+                if self.escape: self.escape = False # ↩️ 转义结束
+                elif ch == "\\": self.escape = True # ↩️ 转义开始
+                elif ch == '"': self.in_str = False # 🔚 字符串结束
+                self.buf.append(ch) # 📥 记录字符
+                continue # 🔄 下一个
+            self.buf.append(ch) # 📥 记录字符
+            if ch == '"': self.in_str = True # 🔤 字符串开始
+            elif ch == "{": self.depth += 1 # ⬇️ 深入
+            elif ch == "}": # ⬆️ 退出
+                self.depth -= 1 # 🧮 深度减一
+                if self.depth == 0: return json.loads("".join(self.buf)) # 📦 对象闭合
+        return None # ⏳ 尚未闭合
+
 
 class AICostTracker:
     # =============================================================================
     #  🎉 AI 成本追踪器
     #
     #  🎨 代码用途:
-    #      估算 Token 消耗和美元成本。
+    #      按 generateContent 返回的 usageMetadata 记录 Token 消耗和美元成本，
+    #      并按模型、用户、模态分别汇总。
     #
     #  💡 易懂解释:
     #      这里是记账的小本本，看看我们花了多少零花钱！
     #
     #  ⚠️ 警告:
-    #      [估算偏差]: 目前是基于字符长度的粗略估算，非官方 Token 计数。
+    #      [估算偏差]: 响应缺少 usageMetadata 时才回退到基于字符长度的粗略估算，
+    #                  回退次数单独计入 estimated_calls。
     #
     #  ⚙️ 触发源:
     #      Through Body/Gemini.py "Cost Tracking" -> AICostTracker
@@ -37,45 +143,167 @@ class AICostTracker:
     def __init__(self):
         self.input_tokens = 0 # 📥 输入 Token 总数
         self.output_tokens = 0 # 📤 输出 Token 总数
+        self.cached_tokens = 0 # 🗃️ 命中上下文缓存的输入 Token 总数
         self.cost_usd = 0.0 # 💰 总成本 (USD)
+        self.estimated_calls = 0 # 📏 回退到估算的调用次数
+        self.cache_hits = 0 # 🎯 规划缓存命中
+        self.cache_misses = 0 # 💨 规划缓存未命中
+        self.cache_saved_usd = 0.0 # 💰 规划缓存节省成本
+        self.by_model = {} # {model: totals} # 🧠 分模型汇总
+        self.by_modality = {} # {"prompt:IMAGE": tokens} # 🖼️ 分模态汇总
         
         # 增量 (用于周期性上报)
         self.delta_input = 0 # ➕ 输入增量
         self.delta_output = 0 # ➕ 输出增量
+        self.delta_cached = 0 # ➕ 缓存输入增量
         self.delta_cost = 0.0 # ➕ 成本增量
 
-    def track(self, input_len, output_len, model="gemini-1.5-flash"):
+    def track(self, input_len, output_len, model="gemini-1.5-flash", user_id=None, images=0):
         # =============================================================================
-        #  🎉 记录成本 (输入长度，输出长度，模型)
+        #  🎉 估算成本 (输入长度，输出长度，模型，用户，图片数)
         #
         #  🎨 代码用途:
-        #     计算单次调用的成本。
+        #     响应缺少 usageMetadata 时，按字符长度估算单次调用的成本。
         #
         #  💡 易懂解释:
-        #      记下一笔账，看看这次思考花了多少钱。
+        #      没有小票的时候，只能凭感觉记一笔账。
         #
         #  ⚠️ 警告:
         #      [配置依赖]: PRICING_TABLE 必须包含对应模型的定价。
+        #      [图片计数]: 输入长度只包含文本，图片按每张 IMAGE_TOKENS 计，base64 字符串不计入长度。
         #
         #  ⚙️ 触发源:
-        #      Through Body/Gemini.py "API Call" -> track
+        #      Through Body/Gemini.py "API Call (fallback)" -> track
         # =============================================================================
         # 🔢 简单估算: 1 char ≈ 0.35 tokens (英文) / 0.6 (中文)
         # 这里使用保守估计
-        in_tok = int(input_len * 0.35) # 📏 估算输入 Token
+        in_tok = int(input_len * 0.35) + images * IMAGE_TOKENS # 📏 估算输入 Token
         out_tok = int(output_len * 0.35) # 📏 估算输出 Token
-        
+        self.estimated_calls += 1 # 📏 估算计数
+        return self._record(model, user_id, in_tok, out_tok, 0) # 🧾 记账
+
+    def track_usage(self, usage, model="gemini-1.5-flash", user_id=None):
+        # =============================================================================
+        #  🎉 按用量记账 (usageMetadata，模型，用户)
+        #
+        #  🎨 代码用途:
+        #      读取 promptTokenCount / candidatesTokenCount / thoughtsTokenCount /
+        #      cachedContentTokenCount 以及按模态拆分的明细并记账。
+        #
+        #  💡 易懂解释:
+        #      照着官方小票一笔一笔记！
+        #
+        #  ⚠️ 警告:
+        #      [缓存计价]: promptTokenCount 已包含缓存部分，缓存部分按 cached 单价计费。
+        #      [思考 Token]: thoughtsTokenCount 按输出单价计费。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "API Call" -> track_usage
+        # =============================================================================
+        in_tok = int(usage.get("promptTokenCount", 0)) # 📥 输入 Token
+        out_tok = int(usage.get("candidatesTokenCount", 0)) + int(usage.get("thoughtsTokenCount", 0)) # 📤 输出 Token
+        cached = int(usage.get("cachedContentTokenCount", 0)) # 🗃️ 缓存 Token
+        for kind, field in (("prompt", "promptTokensDetails"), ("output", "candidatesTokensDetails"), ("cached", "cacheTokensDetails")): # 🔄 按模态拆分
+            for item in usage.get(field) or []: # 🔄 遍历明细
+                key = f"{kind}:{item.get('modality', 'UNKNOWN')}" # 🏷️ 模态键
+                self.by_modality[key] = self.by_modality.get(key, 0) + int(item.get("tokenCount", 0)) # 📈 累加
+        return self._record(model, user_id, in_tok, out_tok, cached) # 🧾 记账
+
+    def _record(self, model, user_id, in_tok, out_tok, cached):
+        # =============================================================================
+        #  🎉 记账 (模型，用户，输入，输出，缓存)
+        #
+        #  🎨 代码用途:
+        #      按定价计算成本并累加到总数、增量、分模型和分用户汇总。
+        #
+        #  💡 易懂解释:
+        #      把这笔账同时记到总账、模型账和用户账上！
+        #
+        #  ⚠️ 警告:
+        #      [配置依赖]: 定价缺少 cached 时按输入单价的 25% 计算。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "track / track_usage" -> _record
+        # =============================================================================
         price = PRICING_TABLE.get(model, PRICING_TABLE["gemini-1.5-flash"]) # 💲 获取单价
-        cost = (in_tok / 1_000_000 * price["input"]) + (out_tok / 1_000_000 * price["output"]) # 💸 计算成本
+        cached_price = price.get("cached", price["input"] * 0.25) # 💲 缓存单价
+        cost = ((in_tok - cached) / 1_000_000 * price["input"]) + (cached / 1_000_000 * cached_price) + (out_tok / 1_000_000 * price["output"]) # 💸 计算成本
         
         self.input_tokens += in_tok # 📈 累加输入
         self.output_tokens += out_tok # 📈 累加输出
+        self.cached_tokens += cached # 📈 累加缓存
         self.cost_usd += cost # 📈 累加成本
         
         self.delta_input += in_tok # ➕ 累加增量输入
         self.delta_output += out_tok # ➕ 累加增量输出
+        self.delta_cached += cached # ➕ 累加增量缓存
         self.delta_cost += cost # ➕ 累加增量成本
 
+        t = self.by_model.setdefault(model, {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0, "cost_usd": 0.0}) # 📋 模型账本
+        t["calls"] += 1 # 🔢 调用次数
+        t["input_tokens"] += in_tok # 📥 输入
+        t["output_tokens"] += out_tok # 📤 输出
+        t["cached_tokens"] += cached # 🗃️ 缓存
+        t["cost_usd"] += cost # 💰 成本
+        global_session_cost.track_ai(user_id, in_tok, out_tok, cached, cost) # 👤 分用户归属
+        return cost # 📤 返回本次成本
+
+    def record_cache(self, hit, saved_usd=0.0, user_id=None):
+        # =============================================================================
+        #  🎉 记录缓存 (是否命中，节省成本，用户)
+        #
+        #  🎨 代码用途:
+        #      累计规划缓存命中率，命中时按原调用成本记入节省金额 (总计与分用户)。
+        #
+        #  💡 易懂解释:
+        #      这次没花钱！记下省了多少！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "plan_next_action" -> record_cache
+        # =============================================================================
+        if not hit: # 🚦 未命中
+            self.cache_misses += 1 # 💨 未命中计数
+            return # 🔙 完成
+        self.cache_hits += 1 # 🎯 命中计数
+        self.cache_saved_usd += saved_usd # 💰 累加节省
+        global_session_cost.track_cache_hit(user_id, saved_usd) # 👤 用户命中与节省
+
+    def get_stats(self):
+        # =============================================================================
+        #  🎉 获取统计 (无参数)
+        #
+        #  🎨 代码用途:
+        #      返回累计总数、规划缓存命中率以及分模型、分用户、分模态的汇总。
+        #
+        #  💡 易懂解释:
+        #      把账本摊开给大家看！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/brain/cost" -> get_stats
+        # =============================================================================
+        return {
+            "input_tokens": self.input_tokens, # 📥 输入
+            "output_tokens": self.output_tokens, # 📤 输出
+            "cached_tokens": self.cached_tokens, # 🗃️ 缓存
+            "cost_usd": round(self.cost_usd, 6), # 💰 成本
+            "estimated_calls": self.estimated_calls, # 📏 估算次数
+            "plan_cache": {
+                "hits": self.cache_hits, # 🎯 命中
+                "misses": self.cache_misses, # 💨 未命中
+                "hit_rate": round(self.cache_hits / max(1, self.cache_hits + self.cache_misses), 4), # 📊 命中率
+                "saved_usd": round(self.cache_saved_usd, 6), # 💰 节省成本
+            }, # 🗃️ 规划缓存
+            "by_model": self.by_model, # 🧠 分模型
+            "top_users": global_session_cost.top(10, "ai_cost_usd"), # 👤 模型成本前 10 的用户 (完整账本见 /cost/sessions)
+            "by_modality": self.by_modality, # 🖼️ 分模态
+        } # 📦 统计结果
+
     def pop_deltas(self):
         # =============================================================================
         #  🎉 获取增量
@@ -95,10 +323,12 @@ class AICostTracker:
         d = {
             "input_tokens": self.delta_input, # 📦 打包输入增量
             "output_tokens": self.delta_output, # 📦 打包输出增量
+            "cached_tokens": self.delta_cached, # 📦 打包缓存增量
             "cost_usd": self.delta_cost # 📦 打包成本增量
         }
         self.delta_input = 0 # 🧹 重置输入增量
         self.delta_output = 0 # 🧹 重置输出增量
+        self.delta_cached = 0 # 🧹 重置缓存增量
         self.delta_cost = 0.0 # 🧹 重置成本增量
         return d # 📤 返回增量数据
 
@@ -115,18 +345,191 @@ class GeminiClient:
     #      这是我们的大脑连接器，专门负责和聪明的 Gemini 聊天！
     #
     #  ⚠️ 警告:
-    #      [密钥依赖]: 需要有效的 GEMINI_API_KEY。
+    #      [密钥依赖]: 密钥池中至少要有一个有效密钥 (keys_db 或 ANGEL_GEMINI_KEYS)。
+    #      [长连接]: HTTP 会话在首次调用时创建并复用，应用退出时需调用 close()。
     #
     #  ⚙️ 触发源:
     #      Through Body/Gemini.py "Init" -> GeminiClient
     # =============================================================================
     def __init__(self):
-        self.api_key = GEMINI_API_KEY # 🔑 API 密钥
-        self.model = "gemini-1.5-flash" # 🧠 模型名称
+        self.keys = angel_key_pool # 🔑 密钥池
+        self.tiers = list(GEMINI_MODEL_TIERS) or ["gemini-1.5-flash"] # 🪜 级联模型 (便宜在前)
+        self.model = self.tiers[0] # 🧠 首选模型
+        self.obs_stats = {m: {"calls": 0, "payload_bytes": 0, "est_tokens": 0, "latency_ms_total": 0.0} for m in ("image", "elements", "both")} # 👁️ 分观察模式统计
+        self.tier_stats = {m: {"calls": 0, "escalations": 0, "latency_ms_total": 0.0, "cost_usd": 0.0, "reasons": {}} for m in self.tiers} # 📊 分级统计
+        self.session = None # 🌐 复用的 HTTP 会话 (惰性创建)
+        self.gate = asyncio.Semaphore(GEMINI_MAX_INFLIGHT) # 🚧 全局并发闸门
+        self.inflight = 0 # 🏃 进行中的调用
+        self.queued = 0 # ⏳ 排队中的调用
+        self.stats = {"calls": 0, "errors": 0, "max_queued": 0, "wait_ms_total": 0.0, "call_ms_total": 0.0} # 📊 调用统计
+        self.streaming = GEMINI_STREAMING # 🌊 默认规划模式
+        self.modes = {m: {"calls": 0, "ttft_ms_total": 0.0, "action_ms_total": 0.0} for m in ("blocking", "stream")} # ⏱️ 分模式延迟
+
+    def _get_session(self):
+        # =============================================================================
+        #  🎉 获取会话 (无参数)
+        #
+        #  🎨 代码用途:
+        #      惰性创建带连接池的 aiohttp 会话 (连接上限、DNS 缓存、保活)，关闭后自动重建。
+        #
+        #  💡 易懂解释:
+        #      电话线只拉一次，以后一直用这条线聊天！
+        #
+        #  ⚠️ 警告:
+        #      [事件循环]: 会话绑定到首次创建时的事件循环，必须在 FastAPI 的事件循环中调用。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "plan_next_action" -> _get_session
+        # =============================================================================
+        if self.session is None or self.session.closed: # 🚦 尚未创建或已关闭
+            connector = aiohttp.TCPConnector(
+                limit=GEMINI_MAX_CONNECTIONS, # 🔌 连接上限
+                ttl_dns_cache=GEMINI_DNS_TTL_S, # 🌐 DNS 缓存
+                keepalive_timeout=GEMINI_KEEPALIVE_S, # 🔗 保活时长
+            ) # 🔌 连接池
+            self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=GEMINI_TIMEOUT_S)) # 🌐 创建会话
+        return self.session # 📤 返回会话
 
-    async def plan_next_action(self, screenshot_b64: str, goal: str, current_url: str):
+    async def close(self):
         # =============================================================================
-        #  🎉 规划下一步 (截图, 目标, URL)
+        #  🎉 关闭 (无参数)
+        #
+        #  🎨 代码用途:
+        #      关闭复用的 HTTP 会话并释放连接池。
+        #
+        #  💡 易懂解释:
+        #      下班啦，把电话线挂掉！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Brain/Main.py "Server Shutdown" -> close
+        # =============================================================================
+        if self.session and not self.session.closed: # 🚦 会话存在
+            await self.session.close() # 🔒 关闭会话
+        self.session = None # 🧹 清空引用
+
+    def get_stats(self):
+        # =============================================================================
+        #  🎉 获取调用统计 (无参数)
+        #
+        #  🎨 代码用途:
+        #      返回进行中/排队中的调用数、平均排队与调用耗时。
+        #
+        #  💡 易懂解释:
+        #      看看大脑现在忙不忙，有多少问题在排队！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/brain/stats" -> get_stats
+        # =============================================================================
+        calls = max(1, self.stats["calls"]) # 🔢 调用次数 (避免除零)
+        return {
+            "max_inflight": GEMINI_MAX_INFLIGHT, # 🧮 并发上限
+            "inflight": self.inflight, # 🏃 进行中
+            "queued": self.queued, # ⏳ 排队中
+            "max_queued": self.stats["max_queued"], # 📈 历史最大排队
+            "calls": self.stats["calls"], # 🔢 调用次数
+            "errors": self.stats["errors"], # 🚨 失败次数
+            "avg_wait_ms": round(self.stats["wait_ms_total"] / calls, 2), # ⏱️ 平均排队耗时
+            "avg_call_ms": round(self.stats["call_ms_total"] / calls, 2), # ⏱️ 平均调用耗时
+            "session_open": self.session is not None and not self.session.closed, # 🌐 会话状态
+            "modes": {m: {
+                "calls": v["calls"], # 🔢 调用次数
+                "avg_ttft_ms": round(v["ttft_ms_total"] / max(1, v["calls"]), 2), # ⏱️ 平均首 Token 耗时
+                "avg_action_ms": round(v["action_ms_total"] / max(1, v["calls"]), 2), # ⏱️ 平均出动作耗时
+            } for m, v in self.modes.items()}, # 🌊 分模式延迟
+            "tiers": {m: {
+                "calls": v["calls"], # 🔢 调用次数
+                "avg_latency_ms": round(v["latency_ms_total"] / max(1, v["calls"]), 2), # ⏱️ 平均延迟
+                "cost_usd": round(v["cost_usd"], 6), # 💰 累计成本
+                "escalation_rate": round(v["escalations"] / max(1, v["calls"]), 4), # 🪜 升级率
+                "reasons": dict(v["reasons"]), # 📋 升级原因
+            } for m, v in self.tier_stats.items()}, # 🪜 分级统计
+            "observation": {m: {
+                "calls": v["calls"], # 🔢 调用次数
+                "avg_payload_bytes": round(v["payload_bytes"] / max(1, v["calls"])), # 📦 平均负载
+                "avg_est_tokens": round(v["est_tokens"] / max(1, v["calls"])), # 🧮 平均预估输入 Token
+                "avg_step_ms": round(v["latency_ms_total"] / max(1, v["calls"]), 2), # ⏱️ 平均规划耗时
+            } for m, v in self.obs_stats.items()}, # 👁️ 分观察模式统计
+        } # 📦 统计结果
+
+    @staticmethod
+    def _when_cost(costs, fn):
+        # =============================================================================
+        #  🎉 成本到账后回调 (成本列表，回调)
+        #
+        #  🎨 代码用途:
+        #      成本可能是数字或流式后台记账任务，全部就绪后以总成本调用 fn。
+        #
+        #  💡 易懂解释:
+        #      账单都到齐了再算总数！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "plan_next_action" -> _when_cost
+        # =============================================================================
+        tasks = [c for c in costs if isinstance(c, asyncio.Task)] # ⏳ 未到账
+        done = sum(c for c in costs if not isinstance(c, asyncio.Task)) # 💰 已到账
+        if not tasks: return fn(done) # ⚡ 立即回调
+        asyncio.gather(*tasks, return_exceptions=True).add_done_callback(
+            lambda f: fn(done + (0.0 if f.cancelled() else sum(r for r in f.result() if isinstance(r, float))))) # ⏳ 到账后回调
+
+    def _add_tier_cost(self, model, cost):
+        self.tier_stats[model]["cost_usd"] += cost # 💰 累加分级成本
+
+    def _endpoint(self, method, key, model):
+        return f"{GEMINI_API_BASE}/v1beta/models/{model}:{method}?key={key.key}" # 🔗 构造 API URL
+
+    async def _post(self, method, model, payload, est_tokens, query=""):
+        # =============================================================================
+        #  🎉 发送并切换密钥 (方法，模型，负载，预估 Token，附加参数)
+        #
+        #  🎨 代码用途:
+        #      从密钥池取密钥发送请求，遇到 429/503 时冷却该密钥并换下一个，
+        #      最多尝试 GEMINI_KEY_MAX_ATTEMPTS 个密钥。返回 (响应, 密钥)。
+        #
+        #  💡 易懂解释:
+        #      这把钥匙打不开就换一把！
+        #
+        #  ⚠️ 警告:
+        #      [调用方负责]: 返回的响应需要由调用方读取并释放。
+        #      [全部失败]: 没有可用密钥时返回 (None, None)，尝试次数用尽时返回最后一次的限流响应。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "_request / _request_stream" -> _post
+        # =============================================================================
+        session = self._get_session() # 🌐 复用会话
+        tried = [] # 📋 已尝试密钥
+        for attempt in range(GEMINI_KEY_MAX_ATTEMPTS): # 🔁 故障切换
+            key = await self.keys.acquire(est_tokens, exclude=tried) # 🔑 取密钥
+            if key is None: return None, None # 🛑 无可用密钥
+            tried.append(key) # 📋 记录
+            t0 = time.time() # ⏱️ 发送时间
+            try: resp = await session.post(self._endpoint(method, key, model) + query, json=payload) # 📮 发送 POST 请求
+            except Exception: # 🚨 网络异常
+                self.keys.release(key, 0, 0) # 🔓 归还密钥
+                raise # 🔙 交给上层
+            self.keys.release(key, resp.status, (time.time() - t0) * 1000) # 🔓 回填状态与延迟
+            if resp.status not in THROTTLE_STATUSES or attempt == GEMINI_KEY_MAX_ATTEMPTS - 1: return resp, key # 📤 返回响应
+            print(f"⚠️ [Gemini] 密钥 {key.label} 被限流 ({resp.status})，切换下一个") # 📢 打印警告
+            resp.release() # 🔓 归还连接
+        return None, None # 🛑 理论上不可达
+
+    def _record_latency(self, mode, start_t, first_t, action_t):
+        m = self.modes[mode] # ⏱️ 模式统计
+        m["calls"] += 1 # 🔢 调用计数
+        m["ttft_ms_total"] += (first_t - start_t) * 1000 # ⏱️ 首 Token 耗时
+        m["action_ms_total"] += (action_t - start_t) * 1000 # ⏱️ 出动作耗时
+
+    async def plan_next_action(self, screenshot_b64: str, goal: str, current_url: str, user_id: str = None, use_cache: bool = True, stream: bool = None, frame_box: tuple = None, elements: str = None):
+        # =============================================================================
+        #  🎉 规划下一步 (截图, 目标, URL, 用户, 是否走缓存, 是否流式, 裁剪框, 元素清单)
         #
         #  🎨 代码用途:
         #      发送截图和目标，获取下一步操作。
@@ -135,33 +538,58 @@ class GeminiClient:
         #      把看到的画面发给 Gemini，问问它接下来该怎么办！
         #
         #  ⚠️ 警告:
-        #      [网络超时]: 网络请求可能超时。
+        #      [网络超时]: 网络请求可能超时 (GEMINI_TIMEOUT_S)。
+        #      [并发闸门]: 超过 GEMINI_MAX_INFLIGHT 的调用在闸门前排队。
+        #      [规划缓存]: 目标、URL 相同且截图近似时直接返回缓存计划，use_cache=False 可跳过。
+        #      [流式模式]: stream 为 None 时取 GEMINI_STREAMING，对象闭合即返回，剩余输出在后台读完并记账。
+        #      [模型级联]: 首选模型的计划无法解析、动作不合法或置信度低于阈值时，依次升级到更大的模型。
+        #      [裁剪映射]: 截图经过裁剪时传入 frame_box (视口比例)，返回的坐标会映射回整个视口。
+        #      [元素模式]: 传入 elements (serialize_elements 文本) 时可省略截图，模型可用 params.element 指定元素序号。
+        #      [预算]: 缓存未命中且该用户 (或全局) 预算耗尽时抛出 BudgetExceededError，不再调用模型。
         #
         #  ⚙️ 触发源:
         #      Through Brain/Main.py "Decision Cycle" -> plan_next_action
         # =============================================================================
-        if not self.api_key: # 🛑 检查 API Key
+        if not self.keys.keys and not self.keys.reload(): # 🛑 检查 API Key
             print("❌ [Gemini] 未配置 API Key") # 📢 打印错误
             return None # 🔙 返回空
 
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model}:generateContent?key={self.api_key}" # 🔗 构造 API URL
-        
+        mode = "both" if screenshot_b64 and elements else "elements" if elements else "image" # 👁️ 观察模式
+        cache_model = self.model if mode == "image" else f"{self.model}:{mode}" # 🔑 缓存分区
+        step_t = time.time() # ⏱️ 规划开始
+        fp = None # 🖐️ 截图指纹
+        if use_cache and angel_plan_cache.enabled: # 🚦 走缓存
+            if screenshot_b64: fp = await angel_plan_cache.fingerprint(screenshot_b64) # 🖐️ 截图指纹
+            if elements: fp = angel_plan_cache.fingerprint_text(elements) ^ (fp or 0) # 🖐️ 叠加元素指纹
+            hit = angel_plan_cache.get(cache_model, goal, current_url, fp, frame_box) if fp is not None else None # 🔍 查缓存 (裁剪框进键)
+            global_ai_cost.record_cache(hit is not None, hit[1] if hit else 0.0, user_id) # 📊 记录命中率
+            if hit: return hit[0] # ⚡ 缓存命中 (已是视口坐标)
+        global_budget.check(user_id or "anonymous") # 💳 预算耗尽时抛出 BudgetExceededError
+
         # 📝 构造 Prompt
+        if elements: # 🧩 元素清单
+            observation = ("Interactive elements in the viewport, one per line as: index role \"name\" x,y,w,h (relative to the viewport):\n"
+                           + elements + ("\nUse the screenshot for visual context." if screenshot_b64 else "")) # 📝 元素说明
+            element_param = ',\n                "element": int (index from the element list; prefer it over x/y for click and type)' # 🔢 元素参数
+        else:
+            observation, element_param = "Analyze the screenshot.", "" # 🖼️ 仅截图
         prompt = f"""You are an intelligent web browsing agent.
         User Goal: "{goal}"
         Current URL: "{current_url}"
         
-        Analyze the screenshot and determine the NEXT single action to achieve the goal.
+        {observation}
+        Determine the NEXT single action to achieve the goal.
         Return ONLY a JSON object with the following format (no markdown):
         {{
             "action": "click" | "type" | "scroll" | "navigate" | "done" | "wait",
             "reason": "Short explanation",
+            "confidence": 0.0-1.0 (how sure you are this action is correct),
             "params": {{
                 "x": 0.0-1.0 (relative width),
                 "y": 0.0-1.0 (relative height),
                 "text": "string",
                 "url": "string",
-                "delta_y": int
+                "delta_y": int{element_param}
             }}
         }}""" # 🗣️ 提示词
 
@@ -169,31 +597,199 @@ class GeminiClient:
             "contents": [{
                 "parts": [
                     { "text": prompt }, # 📄 文本部分
-                    { "inline_data": { "mime_type": "image/jpeg", "data": screenshot_b64 } } # 🖼️ 图片部分
-                ]
+                ] + ([{ "inline_data": { "mime_type": "image/jpeg", "data": screenshot_b64 } }] if screenshot_b64 else []) # 🖼️ 图片部分
             }]
         } # 📦 请求负载
 
-        async with aiohttp.ClientSession() as session: # 🌐 创建会话
-            start_t = time.time() # ⏱️ 记录开始时间
-            async with session.post(url, json=payload) as resp: # 📮 发送 POST 请求
-                if resp.status != 200: # 🚦 检查状态码
-                    print(f"❌ [Gemini] API Error: {resp.status} {await resp.text()}") # 📢 打印错误详情
-                    return None # 🔙 返回空
-                
-                data = await resp.json() # 📦 解析响应 JSON
+        self.queued += 1 # ⏳ 进入排队
+        self.stats["max_queued"] = max(self.stats["max_queued"], self.queued) # 📈 记录最大排队
+        wait_t = time.time() # ⏱️ 排队开始
+        try: await self.gate.acquire() # 🚧 等待闸门
+        finally: self.queued -= 1 # ⏳ 离开排队 (含取消)
+        self.inflight += 1 # 🏃 开始调用
+        start_t = time.time() # ⏱️ 记录开始时间
+        self.stats["calls"] += 1 # 🔢 调用计数
+        self.stats["wait_ms_total"] += (start_t - wait_t) * 1000 # ⏱️ 累加排队耗时
+        try:
+            request = self._request_stream if (self.streaming if stream is None else stream) else self._request # 🌊 流式或阻塞
+            costs = [] # 💰 各级成本
+            for i, model in enumerate(self.tiers): # 🪜 逐级尝试
+                tier_t = time.time() # ⏱️ 本级开始
+                plan, cost = await request(payload, prompt, user_id, model) # 📮 发送请求
+                costs.append(cost) # 💰 记录成本
+                problem = plan_problem(plan) # 🔍 检查计划
+                tier = self.tier_stats[model] # 📊 本级统计
+                tier["calls"] += 1 # 🔢 调用计数
+                tier["latency_ms_total"] += (time.time() - tier_t) * 1000 # ⏱️ 累加延迟
+                self._when_cost([cost], lambda c, m=model: self._add_tier_cost(m, c)) # 💰 累加成本
+                if problem is None or i == len(self.tiers) - 1: break # ✅ 合格或已是最后一级
+                tier["escalations"] += 1 # 🪜 升级计数
+                tier["reasons"][problem] = tier["reasons"].get(problem, 0) + 1 # 📋 升级原因
+                print(f"🪜 [Gemini] {model} 计划不合格 ({problem})，升级到 {self.tiers[i + 1]}") # 📢 打印升级
+            plan = map_to_viewport(plan, frame_box) # 📐 映射回视口
+            if problem is None and fp is not None: # 🚦 合格计划才写入缓存
+                self._when_cost(costs, lambda c: angel_plan_cache.put(cache_model, goal, current_url, fp, plan, c, frame_box)) # 💾 成本到账后写入缓存 (视口坐标)
+            obs = self.obs_stats[mode] # 👁️ 观察模式统计
+            obs["calls"] += 1 # 🔢 调用计数
+            obs["payload_bytes"] += len(prompt) + len(screenshot_b64 or "") # 📦 负载字节
+            obs["est_tokens"] += estimate_tokens(prompt, count_images(payload), 0) # 🧮 预估输入 Token
+            obs["latency_ms_total"] += (time.time() - step_t) * 1000 # ⏱️ 规划耗时
+            return plan # 📤 返回计划
+        except Exception as e: # 🚨 网络异常
+            self.stats["errors"] += 1 # 🚨 失败计数
+            print(f"❌ [Gemini] 请求失败: {e}") # 📢 打印错误
+            return None # 🔙 返回空
+        finally:
+            self.inflight -= 1 # 🏁 调用结束
+            self.stats["call_ms_total"] += (time.time() - start_t) * 1000 # ⏱️ 累加调用耗时
+            self.gate.release() # 🚧 释放闸门
+
+    async def _request(self, payload, prompt, user_id=None, model=None):
+        # =============================================================================
+        #  🎉 发送请求 (负载，提示词，用户，模型)
+        #
+        #  🎨 代码用途:
+        #      通过复用的会话调用 generateContent，解析动作 JSON，返回 (计划, 本次成本)。
+        #
+        #  💡 易懂解释:
+        #      真正把问题寄出去，再把回信读懂！
+        #
+        #  ⚠️ 警告:
+        #      [调用方]: 只能在并发闸门内调用。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "plan_next_action" -> _request
+        # =============================================================================
+        start_t = time.time() # ⏱️ 记录开始时间
+        est = estimate_tokens(prompt, count_images(payload)) # 📏 预估 Token
+        model = model or self.model # 🧠 本次模型
+        resp, key = await self._post("generateContent", model, payload, est) # 📮 发送 POST 请求
+        if resp is None: return None, 0.0 # 🛑 无可用密钥
+        async with resp: # 🔓 读完即释放
+            if resp.status != 200: # 🚦 检查状态码
+                self.stats["errors"] += 1 # 🚨 失败计数
+                print(f"❌ [Gemini] API Error: {resp.status} {await resp.text()}") # 📢 打印错误详情
+                return None, 0.0 # 🔙 返回空
+            
+            data = await resp.json() # 📦 解析响应 JSON
+            first_t = time.time() # ⏱️ 完整响应到达 (阻塞模式的首 Token)
+            cost = 0.0 # 💰 本次成本
+            # 💰 计费 (优先使用官方用量，先于取文本，安全拦截等无候选文本的响应也照常记账)
+            usage = data.get("usageMetadata") # 🧾 官方用量
+            if usage: # 🚦 有官方用量
+                self.keys.charge(key, int(usage.get("totalTokenCount", 0)), est) # 🪙 修正密钥配额
+                cost = global_ai_cost.track_usage(usage, model, user_id) # 🧾 按用量记账
+            try:
+                text = data["candidates"][0]["content"]["parts"][0]["text"] # 🔍 提取响应文本
+                if not usage: cost = global_ai_cost.track(len(prompt), len(text), model, user_id, images=count_images(payload)) # 📏 缺失用量时按文本长度估算
                 
-                # 💰 计费
-                input_len = len(prompt) + len(screenshot_b64) # 粗略估算 # 📏 估算输入长度
-                try:
-                    text = data["candidates"][0]["content"]["parts"][0]["text"] # 🔍 提取响应文本
-                    global_ai_cost.track(input_len, len(text), self.model) # 🧾 记录成本
-                    
-                    # 🧹 解析 JSON (清理 Markdown 标记)
-                    clean_text = text.replace("```json", "").replace("```", "").strip() # 🧹 清理 Markdown
-                    return json.loads(clean_text) # 📦 解析 JSON
-                except Exception as e: # 🚨 捕获异常
-                    print(f"❌ [Gemini] 解析失败: {e}") # 📢 打印错误
-                    return None # 🔙 返回空
+                # 🧹 解析 JSON (清理 Markdown 标记)
+                clean_text = text.replace("```json", "").replace("```", "").strip() # 🧹 清理 Markdown
+                plan = json.loads(clean_text) # 📦 解析 JSON
+                self._record_latency("blocking", start_t, first_t, time.time()) # ⏱️ 记录延迟
+                return plan, cost # 📤 返回计划与成本
+            except Exception as e: # 🚨 捕获异常
+                print(f"❌ [Gemini] 解析失败: {e}") # 📢 打印错误
+                return None, cost # 🔙 返回空 (已产生的成本照常返回)
+
+    async def _request_stream(self, payload, prompt, user_id=None, model=None):
+        # =============================================================================
+        #  🎉 流式请求 (负载，提示词，用户，模型)
+        #
+        #  🎨 代码用途:
+        #      调用 streamGenerateContent (SSE)，边收边解析，第一个 JSON 对象闭合即返回；
+        #      剩余事件在后台任务中读完，拿到最终 usageMetadata 后记账。
+        #
+        #  💡 易懂解释:
+        #      听到答案就先去干活，账单等它说完再记！
+        #
+        #  ⚠️ 警告:
+        #      [返回值]: 成功时第二项是后台记账任务 (结果为本次成本)；200 之后解析失败时就地读完记账，返回 (None, 成本)；
+        #               未拿到 200 时为 0.0。
+        #      [连接占用]: 后台读取期间连接仍被占用，但不再占用并发闸门。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "plan_next_action" -> _request_stream
+        # =============================================================================
+        start_t = time.time() # ⏱️ 记录开始时间
+        est = estimate_tokens(prompt, count_images(payload)) # 📏 预估 Token
+        model = model or self.model # 🧠 本次模型
+        resp, key = await self._post("streamGenerateContent", model, payload, est, "&alt=sse") # 📮 发送 POST 请求
+        if resp is None: return None, 0.0 # 🛑 无可用密钥
+        if resp.status != 200: # 🚦 检查状态码
+            self.stats["errors"] += 1 # 🚨 失败计数
+            print(f"❌ [Gemini] API Error: {resp.status} {await resp.text()}") # 📢 打印错误详情
+            resp.release() # 🔓 归还连接
+            return None, 0.0 # 🔙 返回空
+
+        scanner = JsonObjectScanner() # 🔍 增量解析器
+        state = {"usage": None, "first_t": None, "images": count_images(payload)} # 📋 流状态
+        plan = None # 📦 动作计划
+        try:
+            async for chunk in self._sse_chunks(resp, state): # 🌊 逐事件读取
+                plan = scanner.feed(chunk) # 🔍 增量解析
+                if plan is not None: break # ⚡ 对象闭合
+        except Exception as e: # 🚨 解析或读取失败
+            print(f"❌ [Gemini] 流式解析失败: {e}") # 📢 打印错误
+        else:
+            if plan is None: print("❌ [Gemini] 流式响应中没有完整的 JSON 对象") # 📢 流结束仍未闭合
+        if plan is None: # 🚦 解析失败或未闭合
+            return None, await self._drain_stream(resp, state, scanner, prompt, user_id, key, est, model) # 🔙 返回空 (读完剩余输出并照常记账)
+        self._record_latency("stream", start_t, state["first_t"] or start_t, time.time()) # ⏱️ 记录延迟
+        return plan, asyncio.create_task(self._drain_stream(resp, state, scanner, prompt, user_id, key, est, model)) # 📤 计划与后台记账
+
+    async def _sse_chunks(self, resp, state):
+        # =============================================================================
+        #  🎉 SSE 事件 (响应，流状态)
+        #
+        #  🎨 代码用途:
+        #      逐行读取 "data: {...}" 事件，产出其中的文本片段，并记录首 Token 时间与最新 usageMetadata。
+        #
+        #  💡 易懂解释:
+        #      一句一句地把大脑的话拆出来！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "_request_stream / _drain_stream" -> _sse_chunks
+        # =============================================================================
+        async for raw in resp.content: # 🔄 逐行读取
+            line = raw.decode("utf-8").strip() # ✂️ 去掉换行
+            if not line.startswith("data:"): continue # 🛑 跳过非数据行
+            event = json.loads(line[5:]) # 📦 解析事件
+            if event.get("usageMetadata"): state["usage"] = event["usageMetadata"] # 🧾 最新用量
+            for cand in event.get("candidates") or []: # 🔄 遍历候选
+                for part in (cand.get("content") or {}).get("parts") or []: # 🔄 遍历片段
+                    if part.get("text"): # 🚦 有文本
+                        if state["first_t"] is None: state["first_t"] = time.time() # ⏱️ 首 Token
+                        yield part["text"] # 📤 文本片段
+
+    async def _drain_stream(self, resp, state, scanner, prompt, user_id, key, est, model):
+        # =============================================================================
+        #  🎉 读完剩余流 (响应，流状态，解析器，提示词，用户，密钥，预估 Token，模型)
+        #
+        #  🎨 代码用途:
+        #      读完剩余事件拿到最终 usageMetadata，记账并修正密钥配额，返回本次成本。
+        #
+        #  💡 易懂解释:
+        #      答案已经送出去了，现在慢慢把账单对完！
+        #
+        #  ⚠️ 警告:
+        #      [吞异常]: 读取失败时按已收到的文本估算记账，不向上抛出。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "_request_stream" -> _drain_stream
+        # =============================================================================
+        try:
+            async for chunk in self._sse_chunks(resp, state): scanner.text.append(chunk) # 📜 记录剩余文本
+        except Exception as e: # 🚨 读取失败
+            print(f"⚠️ [Gemini] 流式尾部读取失败: {e}") # 📢 打印警告
+        finally:
+            resp.release() # 🔓 归还连接
+        if state["usage"]: # 🚦 有官方用量
+            self.keys.charge(key, int(state["usage"].get("totalTokenCount", 0)), est) # 🪙 修正密钥配额
+            return global_ai_cost.track_usage(state["usage"], model, user_id) # 🧾 按用量记账
+        return global_ai_cost.track(len(prompt), len("".join(scanner.text)), model, user_id, images=state["images"]) # 📏 回退估算
 
 angel_brain = GeminiClient()
@@ -0,0 +1,348 @@
+# ==========================================================================
+#  📃 文件功能 : 跨上下文共享 HTTP 磁盘缓存
+#  ⚡ 逻辑摘要 : 通过 Patchright 路由拦截静态资源，按 URL 缓存到 Memorybank/HttpCache；遵守 Cache-Control/Expires，按 LRU 淘汰到容量上限。
+#  💡 易懂解释 : 大家看过的图片和脚本先存一份，下一个朋友再看同一个网页时直接从硬盘拿，又快又省流量！
+#  🔋 未来扩展 : 支持 ETag/Last-Modified 条件请求复验，支持按站点设置容量配额。
+#  📊 当前状态 : 活跃 (更新: 2026-10-17)
+#  🧱 Body/HttpCache.py 踩坑记录 (累积，勿覆盖) :
+#     1. [2026-10-17] [待验证] [编码头]: response.body() 返回解压后的内容。 -> 回放时去掉 content-encoding/content-length 等传输头。
+# ==========================================================================
+
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+
+# 🛠️ 确保能导入 Memory 模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Memory.Config import HTTP_CACHE_ENABLED, HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_TYPES
+
+HOP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive", "set-cookie"} # 🚫 回放时剔除的头
+CACHE_HIT_HEADER = "x-angel-cache" # 🏷️ 命中标记头 (流量统计据此跳过)
+
+def freshness_ttl(headers):
+    # =============================================================================
+    #  🎉 新鲜度 (响应头)
+    #
+    #  🎨 代码用途:
+    #      依据 Cache-Control (no-store/private/no-cache/max-age/s-maxage) 和 Expires 计算可缓存秒数。
+    #
+    #  💡 易懂解释:
+    #      看看网站允许我们把这个文件存多久！
+    #
+    #  ⚠️ 警告:
+    #      [保守策略]: 无显式新鲜度或带 Vary (除 Accept-Encoding) 的响应一律不缓存，返回 0。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/HttpCache.py "store" -> freshness_ttl
+    # =============================================================================
+    vary = headers.get("vary", "").lower().replace(" ", "") # 🔀 Vary 头
+    if vary and vary not in ("accept-encoding", "origin,accept-encoding", "accept-encoding,origin"): return 0 # 🛑 变体响应
+    cc = {} # {directive: value} # 📋 Cache-Control 指令
+    for part in headers.get("cache-control", "").lower().split(","): # 🔄 解析指令
+        k, _, v = part.strip().partition("=") # ✂️ 拆分键值
+        if k: cc[k] = v.strip('"') # 📥 记录指令
+    if {"no-store", "private", "no-cache"} & cc.keys(): return 0 # 🛑 禁止缓存
+    for key in ("s-maxage", "max-age"): # 🔄 优先共享缓存指令
+        if key in cc: # 🚦 存在指令
+            try: return max(0, int(cc[key])) # ⏳ 指令秒数
+            except ValueError: return 0 # 🛑 非法值
+    if "expires" in headers: # 🚦 存在 Expires
+        from email.utils import parsedate_to_datetime # 📦 延迟导入
+        try: return max(0, int(parsedate_to_datetime(headers["expires"]).timestamp() - time.time())) # ⏳ 剩余秒数
+        except Exception: return 0 # 🛑 非法日期
+    return 0 # 🛑 无显式新鲜度
+
+class HttpCache:
+    # =============================================================================
+    #  🎉 HTTP 缓存
+    #
+    #  🎨 代码用途:
+    #      内存维护 LRU 索引 (键 -> 元数据)，正文以 <sha1>.bin + <sha1>.json 落盘，
+    #      启动时按文件修改时间重建索引。
+    #
+    #  💡 易懂解释:
+    #      一个会自己整理的小仓库，满了就把最久没用的东西扔掉！
+    #
+    #  ⚠️ 警告:
+    #      [磁盘 IO]: 读写通过 asyncio.to_thread 放到线程池，避免阻塞事件循环。
+    #      [共享范围]: 仅缓存 GET 200 且资源类型属于 HTTP_CACHE_TYPES 的响应。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/Playwright.py "_route_request" -> HttpCache
+    # =============================================================================
+    def __init__(self, root=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES, types=HTTP_CACHE_TYPES, enabled=HTTP_CACHE_ENABLED):
+        self.root = root # 📂 缓存目录
+        self.max_bytes = max_bytes # 🧮 容量上限
+        self.types = set(types) # 🗂️ 可缓存资源类型
+        self.enabled = enabled # 🚦 开关
+        self.index = OrderedDict() # {key: {url, status, headers, size, expires}} (LRU 顺序) # 📇 缓存索引
+        self.total_bytes = 0 # 💾 已用字节
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "bytes_saved": 0} # 📊 缓存统计
+        if self.enabled: self._load_index() # 📥 重建索引
+
+    def _paths(self, key):
+        # =============================================================================
+        #  🎉 文件路径 (缓存键)
+        #
+        #  🎨 代码用途:
+        #      返回缓存键对应的元数据文件与正文文件路径。
+        #
+        #  💡 易懂解释:
+        #      这个文件放在仓库哪个格子里？
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/HttpCache.py "_load_index / _remove_files / lookup / store" -> _paths
+        # =============================================================================
+        return os.path.join(self.root, key + ".json"), os.path.join(self.root, key + ".bin") # 📄 元数据与正文路径
+
+    def _load_index(self):
+        # =============================================================================
+        #  🎉 重建索引()
+        #
+        #  🎨 代码用途:
+        #      扫描缓存目录，按修改时间从旧到新恢复 LRU 索引并清理过期或残缺条目。
+        #
+        #  💡 易懂解释:
+        #      开机时清点一下仓库里有什么！
+        #
+        #  ⚠️ 警告:
+        #      [启动耗时]: 条目很多时会拖慢启动，仅在模块导入时执行一次。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/HttpCache.py "__init__" -> _load_index
+        # =============================================================================
+        os.makedirs(self.root, exist_ok=True) # 📁 创建目录
+        now = time.time() # ⏱️ 当前时间
+        metas = [] # 📋 元数据列表
+        for name in os.listdir(self.root): # 🔄 遍历目录
+            if not name.endswith(".json"): continue # 🛑 跳过正文
+            key = name[:-5] # 🔑 缓存键
+            meta_path, body_path = self._paths(key) # 📄 文件路径
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f: meta = json.load(f) # 📖 读取元数据
+                mtime = os.path.getmtime(body_path) # 🕒 最近使用
+            except Exception: # 🚨 残缺条目
+                self._remove_files(key) # 🗑️ 清理
+                continue # 🔄 下一个
+            if meta.get("expires", 0) <= now: # 🚦 已过期
+                self._remove_files(key) # 🗑️ 清理
+                continue # 🔄 下一个
+            metas.append((mtime, key, meta)) # 📥 收集
+        for _, key, meta in sorted(metas): # 🔄 按时间排序
+            self.index[key] = meta # 📇 写入索引
+            self.total_bytes += meta["size"] # 💾 累加容量
+        self._evict() # 🧹 压到上限
+
+    def _remove_files(self, key):
+        # =============================================================================
+        #  🎉 删除文件 (缓存键)
+        #
+        #  🎨 代码用途:
+        #      删除条目的元数据与正文文件，忽略不存在的文件。
+        #
+        #  💡 易懂解释:
+        #      把这个格子清空！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/HttpCache.py "_evict / lookup / _load_index" -> _remove_files
+        # =============================================================================
+        for path in self._paths(key): # 🔄 遍历文件
+            try: os.remove(path) # 🗑️ 删除文件
+            except OSError: pass # 🤐 忽略错误
+
+    def _evict(self):
+        # =============================================================================
+        #  🎉 淘汰()
+        #
+        #  🎨 代码用途:
+        #      从 LRU 头部删除条目，直到总字节数不超过上限。
+        #
+        #  💡 易懂解释:
+        #      仓库满了，把最久没人用的先扔掉！
+        #
+        #  ⚠️ 警告:
+        #      [同步删除]: 文件删除在调用线程执行，单次淘汰通常只涉及少量文件。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/HttpCache.py "store / _load_index" -> _evict
+        # =============================================================================
+        while self.total_bytes > self.max_bytes and self.index: # 🚦 超出容量
+            key, meta = self.index.popitem(last=False) # 📤 最久未用
+            self.total_bytes -= meta["size"] # 💾 释放容量
+            self.stats["evictions"] += 1 # 📈 淘汰计数
+            self._remove_files(key) # 🗑️ 删除文件
+
+    def eligible(self, request):
+        # =============================================================================
+        #  🎉 是否适用 (请求)
+        #
+        #  🎨 代码用途:
+        #      仅 GET 且资源类型在 HTTP_CACHE_TYPES 内的请求走缓存。
+        #
+        #  💡 易懂解释:
+        #      这个文件适合放进仓库吗？
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "_route_request" -> eligible
+        # =============================================================================
+        return self.enabled and request.method == "GET" and request.resource_type in self.types # 🚦 适用判定
+
+    async def lookup(self, url):
+        # =============================================================================
+        #  🎉 查找 (URL)
+        #
+        #  🎨 代码用途:
+        #      命中且未过期时读取正文，返回 (状态码, 响应头, 正文)；否则返回 None。
+        #
+        #  💡 易懂解释:
+        #      仓库里有没有这个文件？还新鲜吗？
+        #
+        #  ⚠️ 警告:
+        #      [过期]: 过期条目立即删除并计为未命中。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "_serve_cached" -> lookup
+        # =============================================================================
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest() # 🔑 缓存键
+        meta = self.index.get(key) # 📇 查索引
+        if meta is None or meta["url"] != url: # 🚦 未命中
+            self.stats["misses"] += 1 # 📈 未命中计数
+            return None # 🔙 未命中
+        if meta["expires"] <= time.time(): # 🚦 已过期
+            self.index.pop(key, None) # 🗑️ 移出索引
+            self.total_bytes -= meta["size"] # 💾 释放容量
+            self._remove_files(key) # 🗑️ 删除文件
+            self.stats["misses"] += 1 # 📈 未命中计数
+            return None # 🔙 未命中
+        body_path = self._paths(key)[1] # 📄 正文路径
+        try: body = await asyncio.to_thread(self._read_body, body_path) # 📖 线程池读取
+        except OSError: # 🚨 文件丢失
+            self.index.pop(key, None) # 🗑️ 移出索引
+            self.total_bytes -= meta["size"] # 💾 释放容量
+            self.stats["misses"] += 1 # 📈 未命中计数
+            return None # 🔙 未命中
+        self.index.move_to_end(key) # 🔝 刷新 LRU
+        self.stats["hits"] += 1 # 📈 命中计数
+        self.stats["bytes_saved"] += len(body) # 💾 节省字节
+        return meta["status"], meta["headers"], body # 📤 缓存内容
+
+    @staticmethod
+    def _read_body(path):
+        # =============================================================================
+        #  🎉 读取正文 (文件路径)
+        #
+        #  🎨 代码用途:
+        #      读取正文并刷新文件修改时间，使重启后的 LRU 顺序保持准确。
+        #
+        #  💡 易懂解释:
+        #      把文件拿出来，顺便记下刚刚用过！
+        #
+        #  ⚠️ 警告:
+        #      [线程]: 在线程池中执行。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/HttpCache.py "lookup" -> _read_body
+        # =============================================================================
+        with open(path, "rb") as f: body = f.read() # 📖 读取正文
+        os.utime(path) # 🕒 刷新使用时间 (重启后 LRU 顺序)
+        return body # 📤 正文
+
+    async def store(self, url, status, headers, body):
+        # =============================================================================
+        #  🎉 存储 (URL，状态码，响应头，正文)
+        #
+        #  🎨 代码用途:
+        #      对 200 且具备显式新鲜度的响应落盘，并更新索引与容量。
+        #
+        #  💡 易懂解释:
+        #      把新下载的文件放进仓库！
+        #
+        #  ⚠️ 警告:
+        #      [大文件]: 超过容量 1/8 的单个响应不缓存，避免一次挤掉大量条目。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "_serve_cached" -> store
+        # =============================================================================
+        if status != 200 or not body or len(body) > self.max_bytes // 8: return # 🛑 不适合缓存
+        headers = {k.lower(): v for k, v in headers.items()} # 🔡 统一小写
+        ttl = freshness_ttl(headers) # ⏳ 新鲜度
+        if ttl <= 0: return # 🛑 不可缓存
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest() # 🔑 缓存键
+        meta = {
+            "url": url, # 🔗 原始 URL
+            "status": status, # 🚦 状态码
+            "headers": {k: v for k, v in headers.items() if k not in HOP_HEADERS}, # 📋 回放头
+            "size": len(body), # 💾 正文大小
+            "expires": time.time() + ttl, # ⏳ 过期时间
+        } # 📦 元数据
+        try: await asyncio.to_thread(self._write_entry, key, meta, body) # 💾 线程池写入
+        except OSError as e: # 🚨 写入失败
+            print(f"⚠️ [HttpCache] 写入失败: {e}") # 📢 打印警告
+            return # 🛑 放弃缓存
+        old = self.index.pop(key, None) # 🔄 覆盖旧条目
+        if old: self.total_bytes -= old["size"] # 💾 释放旧容量
+        self.index[key] = meta # 📇 写入索引
+        self.total_bytes += meta["size"] # 💾 累加容量
+        self.stats["stores"] += 1 # 📈 存储计数
+        self._evict() # 🧹 压到上限
+
+    def _write_entry(self, key, meta, body):
+        # =============================================================================
+        #  🎉 写入条目 (缓存键，元数据，正文)
+        #
+        #  🎨 代码用途:
+        #      先写正文再写元数据，保证有元数据的条目一定有正文。
+        #
+        #  💡 易懂解释:
+        #      把文件和它的标签一起放进格子！
+        #
+        #  ⚠️ 警告:
+        #      [线程]: 在线程池中执行。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/HttpCache.py "store" -> _write_entry
+        # =============================================================================
+        meta_path, body_path = self._paths(key) # 📄 文件路径
+        with open(body_path, "wb") as f: f.write(body) # 💾 写入正文
+        with open(meta_path, "w", encoding="utf-8") as f: json.dump(meta, f) # 💾 写入元数据
+
+    def get_stats(self):
+        # =============================================================================
+        #  🎉 获取缓存统计()
+        #
+        #  🎨 代码用途:
+        #      导出命中率、节省字节、条目数与容量占用。
+        #
+        #  💡 易懂解释:
+        #      看看仓库帮我们省了多少！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/browser/stats" -> get_stats
+        # =============================================================================
+        lookups = self.stats["hits"] + self.stats["misses"] # 🧮 查询总数
+        return {
+            "enabled": self.enabled, # 🚦 开关
+            "entries": len(self.index), # 📇 条目数
+            "bytes": self.total_bytes, # 💾 已用字节
+            "max_bytes": self.max_bytes, # 🧮 容量上限
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0, # 🎯 命中率
+            **self.stats, # 📊 计数
+        } # 📦 统计结果
+
+global_http_cache = HttpCache()
@@ -0,0 +1,258 @@
+# ==========================================================================
+#  📃 文件功能 : 截图预处理
+#  ⚡ 逻辑摘要 : 在截图与 plan_next_action 之间裁剪 (变化区域/指定区域)、按分辨率或 Token 预算缩放、自适应 JPEG 质量；
+#               Pillow 在线程池中运行，并记录裁剪框以便把模型坐标映射回 VIEWPORT。
+#  💡 易懂解释 : 给大脑看的图先修一修：剪掉没用的、缩小一点、压得刚刚好，省钱又不耽误看清楚！
+#  🔋 未来扩展 : 支持按页面类型自动选择感兴趣区域，支持灰度模式。
+#  📊 当前状态 : 活跃 (更新: 2026-10-17)
+#  🧱 Body/ImagePrep.py 踩坑记录 (累积，勿覆盖) :
+#     1. [2026-10-17] [待验证] [裁剪过窄]: 只给模型看变化区域时，它无法点击区域外的元素。 -> 裁剪框设最小边长并加边距，默认不裁剪。
+# ==========================================================================
+
+import asyncio
+import base64
+import io
+import math
+import sys
+import os
+
+# 🛠️ 确保能导入 Memory 模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Memory.Config import (IMAGE_PREP_ENABLED, IMAGE_PREP_MAX_WIDTH, IMAGE_PREP_TOKEN_BUDGET, IMAGE_PREP_CROP,
+                           IMAGE_PREP_QUALITIES, IMAGE_PREP_TARGET_BYTES, IMAGE_TILE_PX, IMAGE_TILE_TOKENS)
+
+FULL_BOX = (0.0, 0.0, 1.0, 1.0) # 🖼️ 整帧裁剪框 (视口比例)
+DIFF_SIZE = (160, 90) # 🔍 变化检测缩略图尺寸
+DIFF_THRESHOLD = 16 # 📏 像素变化阈值 (灰度)
+CROP_MIN_RATIO = 0.5 # 📏 裁剪框最小边长 (占视口比例)
+CROP_PADDING = 0.05 # 📏 裁剪框四周边距 (占视口比例)
+
+def image_tokens(width, height):
+    return math.ceil(width / IMAGE_TILE_PX) * math.ceil(height / IMAGE_TILE_PX) * IMAGE_TILE_TOKENS # 🧮 按切片估算图片 Token
+
+def map_to_viewport(plan, box):
+    # =============================================================================
+    #  🎉 坐标映射 (动作计划，裁剪框)
+    #
+    #  🎨 代码用途:
+    #      把模型在裁剪后图片上给出的相对坐标换算回整个视口的相对坐标，返回新字典。
+    #
+    #  💡 易懂解释:
+    #      大脑指的是小图上的位置，我们换算成浏览器里真正的位置！
+    #
+    #  ⚠️ 警告:
+    #      [不修改原计划]: 返回副本，不改动模型返回的原计划 (规划缓存保存的是映射后的副本)。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/Gemini.py "plan_next_action" -> map_to_viewport
+    # =============================================================================
+    if not plan or not box or tuple(box) == FULL_BOX: return plan # 🛑 无需映射
+    params = plan.get("params") # 📋 参数
+    if not isinstance(params, dict) or "x" not in params or "y" not in params: return plan # 🛑 无坐标
+    x0, y0, x1, y1 = box # 📐 裁剪框
+    try:
+        x = x0 + float(params["x"]) * (x1 - x0) # ↔️ 映射横坐标
+        y = y0 + float(params["y"]) * (y1 - y0) # ↕️ 映射纵坐标
+    except (TypeError, ValueError): return plan # 🛑 坐标非法
+    return {**plan, "params": {**params, "x": round(x, 4), "y": round(y, 4)}} # 📤 映射后的副本
+
+class PreparedFrame:
+    # =============================================================================
+    #  🎉 预处理后的帧
+    #
+    #  🎨 代码用途:
+    #      保存处理后的 JPEG、裁剪框 (视口比例)、尺寸、质量、估算 Token 以及原图字节与 Token。
+    #
+    #  💡 易懂解释:
+    #      修好的图片和它的 "说明书"！
+    #
+    #  ⚠️ 警告:
+    #      无。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/ImagePrep.py "prepare" -> PreparedFrame
+    # =============================================================================
+    def __init__(self, data, box=FULL_BOX, size=None, quality=None, tokens=0, orig_bytes=0, orig_tokens=0):
+        self.data = data # 📦 JPEG 字节
+        self.box = box # 📐 裁剪框
+        self.size = size # 📏 (宽, 高)
+        self.quality = quality # 🖼️ JPEG 质量 (None 表示原图)
+        self.tokens = tokens # 🧮 估算 Token
+        self.orig_bytes = orig_bytes # 📏 原图字节
+        self.orig_tokens = orig_tokens # 🧮 原图 Token (0 表示未知，不计入压缩比)
+
+    @property
+    def b64(self):
+        return base64.b64encode(self.data).decode("utf-8") # 📜 Base64 编码
+
+    def to_dict(self):
+        return {"box": list(self.box), "size": list(self.size or ()), "quality": self.quality, "tokens": self.tokens, "bytes": len(self.data), "orig_bytes": self.orig_bytes} # 📦 元数据
+
+class ImagePreprocessor:
+    # =============================================================================
+    #  🎉 截图预处理器
+    #
+    #  🎨 代码用途:
+    #      按配置裁剪、缩放、压缩截图，记录每个用户上一帧的缩略图用于变化检测。
+    #
+    #  💡 易懂解释:
+    #      专门给图片 "瘦身" 的小工匠！
+    #
+    #  ⚠️ 警告:
+    #      [线程池]: 解码与编码在 asyncio.to_thread 中执行，不阻塞事件循环。
+    #      [关闭]: IMAGE_PREP_ENABLED 为假时原样返回，按图片头尺寸统计 Token (输入输出相同)。
+    #
+    #  ⚙️ 触发源:
+    #      Through Memory/Interface.py "/think / /agent/step" -> ImagePreprocessor
+    # =============================================================================
+    def __init__(self, enabled=IMAGE_PREP_ENABLED, max_width=IMAGE_PREP_MAX_WIDTH, token_budget=IMAGE_PREP_TOKEN_BUDGET,
+                 crop=IMAGE_PREP_CROP, qualities=IMAGE_PREP_QUALITIES, target_bytes=IMAGE_PREP_TARGET_BYTES):
+        self.enabled = enabled # 🚦 开关
+        self.max_width = max_width # 📏 最大宽度
+        self.token_budget = token_budget # 🧮 Token 预算 (0 不限)
+        self.crop = crop # ✂️ 裁剪模式 (none / changed)
+        self.qualities = tuple(qualities) # 🖼️ 候选质量 (从高到低)
+        self.target_bytes = target_bytes # 🎯 目标字节数
+        self.prev = {} # {user_id: 缩略灰度图} # 🔍 上一帧
+        self.stats = {"frames": 0, "bytes_in": 0, "bytes_out": 0, "tokens_in": 0, "tokens_out": 0, "cropped": 0} # 📊 统计
+
+    async def prepare(self, jpeg_bytes, user_id=None, roi=None):
+        # =============================================================================
+        #  🎉 预处理 (JPEG 字节，用户，感兴趣区域)
+        #
+        #  🎨 代码用途:
+        #      在线程池中执行预处理，返回 PreparedFrame。roi 为视口比例 (x0, y0, x1, y1)，优先于变化检测。
+        #
+        #  💡 易懂解释:
+        #      把截图交给小工匠，拿回修好的图！
+        #
+        #  ⚠️ 警告:
+        #      [失败回退]: 处理失败时返回原图，保证规划流程不中断。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/think / /agent/step" -> prepare
+        # =============================================================================
+        if not self.enabled and roi is None: # 🚦 未开启
+            frame = self._passthrough(jpeg_bytes) # 📦 原图
+        else:
+            try: frame = await asyncio.to_thread(self._prepare_sync, jpeg_bytes, user_id, roi) # 🧵 线程池处理
+            except Exception as e: # 🚨 处理失败
+                print(f"⚠️ [ImagePrep] 预处理失败，使用原图: {e}") # 📢 打印警告
+                frame = self._passthrough(jpeg_bytes) # 📦 原图
+        self.stats["frames"] += 1 # 🔢 帧计数
+        self.stats["bytes_in"] += len(jpeg_bytes) # 📥 输入字节
+        self.stats["bytes_out"] += len(frame.data) # 📤 输出字节
+        if frame.orig_tokens: # 🚦 原图 Token 已知 (未知的帧不计入 Token 压缩比)
+            self.stats["tokens_in"] += frame.orig_tokens # 🧮 原图 Token
+            self.stats["tokens_out"] += frame.tokens # 🧮 输出 Token
+        return frame # 📤 返回结果
+
+    def _passthrough(self, jpeg_bytes):
+        # =============================================================================
+        #  🎉 原图直通 (JPEG 字节)
+        #
+        #  🎨 代码用途:
+        #      不处理原图，只读取图片头中的尺寸来估算 Token (输入与输出相同)。
+        #
+        #  💡 易懂解释:
+        #      图片不修，但也要记下它有多大！
+        #
+        #  ⚠️ 警告:
+        #      [不解码]: 只解析文件头，不读像素，可在事件循环中调用；读不出尺寸时 Token 记为 0 (不计入压缩比)。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/ImagePrep.py "prepare (disabled / failed)" -> _passthrough
+        # =============================================================================
+        try:
+            from PIL import Image # 📦 延迟导入
+            size = Image.open(io.BytesIO(jpeg_bytes)).size # 📏 文件头中的尺寸
+        except Exception: size = None # 🛑 无法识别或缺少 Pillow
+        tokens = image_tokens(*size) if size else 0 # 🧮 估算 Token
+        return PreparedFrame(jpeg_bytes, size=size, tokens=tokens, orig_bytes=len(jpeg_bytes), orig_tokens=tokens) # 📦 原图
+
+    def _prepare_sync(self, jpeg_bytes, user_id, roi):
+        # =============================================================================
+        #  🎉 同步预处理 (JPEG 字节，用户，感兴趣区域)
+        #
+        #  🎨 代码用途:
+        #      解码 -> 确定裁剪框 -> 裁剪 -> 缩放到宽度/Token 预算 -> 逐级降低质量直到不超过目标字节数。
+        #
+        #  💡 易懂解释:
+        #      剪、缩、压，三步走！
+        #
+        #  ⚠️ 警告:
+        #      [线程]: 在线程池中执行，只读写 self.prev 中当前用户的条目。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/ImagePrep.py "prepare" -> _prepare_sync
+        # =============================================================================
+        from PIL import Image # 📦 延迟导入
+        img = Image.open(io.BytesIO(jpeg_bytes)) # 🖼️ 解码
+        img.load() # 📥 读入像素
+        w, h = img.size # 📏 原图尺寸
+
+        box = self._crop_box(img, user_id) if roi is None else tuple(max(0.0, min(1.0, float(v))) for v in roi) # 📐 裁剪框
+        if box[2] - box[0] <= 0 or box[3] - box[1] <= 0: box = FULL_BOX # 🛑 非法裁剪框
+        if box != FULL_BOX: # 🚦 需要裁剪
+            img = img.crop((round(box[0] * w), round(box[1] * h), round(box[2] * w), round(box[3] * h))) # ✂️ 裁剪
+            self.stats["cropped"] += 1 # 📈 裁剪计数
+
+        scale = min(1.0, self.max_width / img.width) if self.max_width else 1.0 # 📏 宽度限制
+        if self.token_budget: # 🚦 限制 Token 预算
+            tiles = max(1, self.token_budget // IMAGE_TILE_TOKENS) # 🧮 允许的切片数
+            fit = max(min(c * IMAGE_TILE_PX / img.width, (tiles // c) * IMAGE_TILE_PX / img.height) for c in range(1, tiles + 1)) # 📏 最大可用缩放
+            scale = min(scale, fit) # 📉 取更小者
+        if scale < 1.0: img = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))), Image.LANCZOS) # 🔽 缩放
+
+        if img.mode != "RGB": img = img.convert("RGB") # 🎨 统一色彩模式
+        data, quality = jpeg_bytes, None # 📦 默认原图
+        if box != FULL_BOX or scale < 1.0 or len(jpeg_bytes) > self.target_bytes: # 🚦 需要重新编码
+            for quality in self.qualities: # 🔄 从高到低尝试
+                buf = io.BytesIO() # 📦 输出缓冲
+                img.save(buf, format="JPEG", quality=quality, optimize=True) # 💾 编码
+                data = buf.getvalue() # 📦 编码结果
+                if len(data) <= self.target_bytes: break # ✅ 达到目标
+        return PreparedFrame(data, box, img.size, quality, image_tokens(*img.size), len(jpeg_bytes), image_tokens(w, h)) # 📤 返回结果
+
+    def _crop_box(self, img, user_id):
+        # =============================================================================
+        #  🎉 变化区域 (图片，用户)
+        #
+        #  🎨 代码用途:
+        #      与该用户上一帧缩略图做差，取变化像素外接框，加边距并保证最小边长；无变化或首帧返回整帧。
+        #
+        #  💡 易懂解释:
+        #      找找这次画面哪里变了！
+        #
+        #  ⚠️ 警告:
+        #      [模式]: 仅在 crop=changed 且提供 user_id 时生效。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/ImagePrep.py "_prepare_sync" -> _crop_box
+        # =============================================================================
+        if self.crop != "changed" or user_id is None: return FULL_BOX # 🛑 未开启
+        from PIL import ImageChops # 📦 延迟导入
+        small = img.convert("L").resize(DIFF_SIZE) # 🔍 缩略灰度图
+        prev = self.prev.get(user_id) # 📜 上一帧
+        self.prev[user_id] = small # 💾 记住本帧
+        if prev is None: return FULL_BOX # 🛑 首帧
+        bbox = ImageChops.difference(small, prev).point(lambda p: 255 if p > DIFF_THRESHOLD else 0).getbbox() # 📐 变化外接框
+        if not bbox: return FULL_BOX # 🛑 无变化
+        box = [] # 📐 视口比例裁剪框
+        for lo, hi, total in ((bbox[0], bbox[2], DIFF_SIZE[0]), (bbox[1], bbox[3], DIFF_SIZE[1])): # 🔄 横纵两轴
+            lo, hi = lo / total - CROP_PADDING, hi / total + CROP_PADDING # ➕ 加边距
+            grow = max(0.0, CROP_MIN_RATIO - (hi - lo)) / 2 # 📏 补足最小边长
+            lo, hi = lo - grow, hi + grow # ↔️ 两侧扩展
+            shift = max(0.0, -lo) - max(0.0, hi - 1.0) # ↩️ 越界平移
+            box.append((max(0.0, lo + shift), min(1.0, hi + shift))) # 📥 记录
+        return (round(box[0][0], 4), round(box[1][0], 4), round(box[0][1], 4), round(box[1][1], 4)) # 📤 裁剪框
+
+    def forget(self, user_id):
+        self.prev.pop(user_id, None) # 🧹 清理上一帧
+
+    def get_stats(self):
+        s = self.stats # 📊 统计
+        return {"enabled": self.enabled, "crop": self.crop, "max_width": self.max_width, "token_budget": self.token_budget, **s,
+                "byte_ratio": round(s["bytes_out"] / max(1, s["bytes_in"]), 4), "token_ratio": round(s["tokens_out"] / max(1, s["tokens_in"]), 4)} # 📦 统计结果
+
+angel_image_prep = ImagePreprocessor()
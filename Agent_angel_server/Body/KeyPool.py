@@ -0,0 +1,254 @@
+# ==========================================================================
+#  📃 文件功能 : Gemini API 密钥池
+#  ⚡ 逻辑摘要 : 每个密钥一对令牌桶 (请求数/分钟、Token/分钟)，按观测延迟与并发挑选密钥；
+#               429/503 后指数退避 + 抖动冷却，调用方自动切换到下一个密钥。
+#  💡 易懂解释 : 一串钥匙轮流用，哪把被门卫拦了就先放一边歇会儿，换一把接着开门！
+#  🔋 未来扩展 : 支持按用户绑定专属密钥，支持从响应头读取服务端配额。
+#  📊 当前状态 : 活跃 (更新: 2026-10-17)
+#  🧱 Body/KeyPool.py 踩坑记录 (累积，勿覆盖) :
+#     1. [2026-10-17] [待验证] [Token 预估]: 调用前只能预估 Token 数。 -> 拿到 usageMetadata 后用 charge() 补扣差额。
+# ==========================================================================
+
+import asyncio
+import random
+import sys
+import os
+import time
+
+# 🛠️ 确保能导入 Memory 模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Memory.Config import get_gemini_api_keys, GEMINI_KEY_RPM, GEMINI_KEY_TPM, GEMINI_KEY_COOLDOWN_S, GEMINI_KEY_COOLDOWN_MAX_S
+
+THROTTLE_STATUSES = (429, 503) # 🚦 触发冷却的状态码
+
+class TokenBucket:
+    # =============================================================================
+    #  🎉 令牌桶
+    #
+    #  🎨 代码用途:
+    #      按每分钟配额匀速补充令牌，容量等于一分钟配额。
+    #
+    #  💡 易懂解释:
+    #      一个慢慢加水的水桶，用水前先看看够不够！
+    #
+    #  ⚠️ 警告:
+    #      [允许透支]: force() 可以把余额扣成负数，用于事后补扣实际用量。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/KeyPool.py "ApiKey" -> TokenBucket
+    # =============================================================================
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute) # 🧮 桶容量
+        self.rate = per_minute / 60.0 # 💧 每秒补充
+        self.tokens = self.capacity # 🪙 当前余额
+        self.updated = time.monotonic() # ⏱️ 上次补充时间
+
+    def _refill(self):
+        now = time.monotonic() # ⏱️ 当前时间
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate) # 💧 补充令牌
+        self.updated = now # ⏱️ 更新时间
+
+    def wait_time(self, n):
+        self._refill() # 💧 补充令牌
+        return max(0.0, (min(n, self.capacity) - self.tokens) / self.rate) # ⏳ 距离足额的秒数
+
+    def take(self, n):
+        self._refill() # 💧 补充令牌
+        if self.tokens < min(n, self.capacity): return False # 🛑 余额不足
+        self.tokens -= n # 🪙 扣减
+        return True # ✅ 成功
+
+    def force(self, n):
+        self._refill() # 💧 补充令牌
+        self.tokens -= n # 🪙 强制扣减 (可透支)
+
+    @property
+    def utilization(self):
+        self._refill() # 💧 补充令牌
+        return round(1.0 - max(0.0, self.tokens) / self.capacity, 4) # 📊 已用比例
+
+class ApiKey:
+    # =============================================================================
+    #  🎉 单个密钥
+    #
+    #  🎨 代码用途:
+    #      保存密钥的令牌桶、延迟 EMA、冷却状态与计数器。
+    #
+    #  💡 易懂解释:
+    #      一把钥匙和它的使用记录！
+    #
+    #  ⚠️ 警告:
+    #      [脱敏]: 对外统计只暴露 label (首尾各 4 位)。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/KeyPool.py "KeyPool" -> ApiKey
+    # =============================================================================
+    def __init__(self, key, rpm, tpm):
+        self.key = key # 🔑 密钥
+        self.label = f"{key[:4]}…{key[-4:]}" if len(key) > 8 else "****" # 🏷️ 脱敏标签
+        self.rpm = TokenBucket(rpm) # 🪣 请求数令牌桶
+        self.tpm = TokenBucket(tpm) # 🪣 Token 令牌桶
+        self.latency_ms = 0.0 # ⏱️ 延迟 EMA (0 表示尚无样本)
+        self.inflight = 0 # 🏃 进行中请求
+        self.failures = 0 # 🔁 连续限流次数
+        self.cooldown_until = 0.0 # ⏳ 冷却截止 (monotonic)
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0, "tokens": 0} # 📊 计数器
+
+class KeyPool:
+    # =============================================================================
+    #  🎉 密钥池
+    #
+    #  🎨 代码用途:
+    #      为每次模型调用挑选一个可用密钥，调用结束后回填状态码、延迟与用量。
+    #
+    #  💡 易懂解释:
+    #      管钥匙的人：谁快用谁，谁被拦了先歇着！
+    #
+    #  ⚠️ 警告:
+    #      [评分]: 分数 = 延迟 EMA × (进行中 + 1)，越低越优先；尚无样本的密钥优先试用。
+    #      [全部不可用]: acquire 会等待最早恢复的密钥，而不是直接失败。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/Gemini.py "_post" -> KeyPool
+    # =============================================================================
+    def __init__(self, rpm=GEMINI_KEY_RPM, tpm=GEMINI_KEY_TPM):
+        self.rpm = rpm # 🧮 单密钥请求数配额
+        self.tpm = tpm # 🧮 单密钥 Token 配额
+        self.keys = [] # 🔑 密钥列表
+        self.waits = 0 # ⏳ 因配额等待的次数
+        self.reload() # 📥 加载密钥
+
+    def reload(self):
+        # =============================================================================
+        #  🎉 重新加载 (无参数)
+        #
+        #  🎨 代码用途:
+        #      从 Config 收集密钥，新增的加入池中，已有密钥保留其状态。
+        #
+        #  💡 易懂解释:
+        #      看看保险箱里有没有新钥匙！
+        #
+        #  ⚠️ 警告:
+        #      [不删除]: 已从存储中移除的密钥不会被剔除，重启后生效。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/KeyPool.py "__init__ / acquire" -> reload
+        # =============================================================================
+        known = {k.key for k in self.keys} # 📋 已有密钥
+        for key in get_gemini_api_keys(): # 🔄 遍历存储
+            if key not in known: self.keys.append(ApiKey(key, self.rpm, self.tpm)) # ➕ 新增密钥
+        return len(self.keys) # 📤 密钥数量
+
+    async def acquire(self, est_tokens, exclude=()):
+        # =============================================================================
+        #  🎉 获取密钥 (预估 Token，排除列表)
+        #
+        #  🎨 代码用途:
+        #      在未冷却且两只令牌桶都足额的密钥中挑分数最低的一个并扣减配额；
+        #      没有可用密钥时睡到最早可用的时刻再试。
+        #
+        #  💡 易懂解释:
+        #      挑一把现在能用、又最快的钥匙！
+        #
+        #  ⚠️ 警告:
+        #      [排除]: exclude 中的密钥本次不参与 (用于故障切换)，若只剩被排除的密钥则返回 None。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "_post" -> acquire
+        # =============================================================================
+        if not self.keys and not self.reload(): return None # 🛑 没有任何密钥
+        while True: # 🔄 等待可用
+            pool = [k for k in self.keys if k not in exclude] # 📋 候选密钥
+            if not pool: return None # 🛑 全部被排除
+            now = time.monotonic() # ⏱️ 当前时间
+            ready = [k for k in pool if k.cooldown_until <= now and k.rpm.wait_time(1) == 0 and k.tpm.wait_time(est_tokens) == 0] # ✅ 可用密钥
+            if ready: # 🚦 有可用
+                key = min(ready, key=lambda k: k.latency_ms * (k.inflight + 1)) # 🏆 分数最低
+                key.rpm.take(1) # 🪙 扣请求数
+                key.tpm.take(est_tokens) # 🪙 扣 Token
+                key.inflight += 1 # 🏃 进行中
+                key.stats["requests"] += 1 # 🔢 请求计数
+                return key # 📤 返回密钥
+            self.waits += 1 # ⏳ 等待计数
+            delay = min(max(k.cooldown_until - now, k.rpm.wait_time(1), k.tpm.wait_time(est_tokens)) for k in pool) # ⏳ 最早可用
+            await asyncio.sleep(min(max(delay, 0.05), 5.0)) # 💤 等待后重试
+
+    def release(self, key, status, latency_ms):
+        # =============================================================================
+        #  🎉 归还密钥 (密钥，状态码，延迟)
+        #
+        #  🎨 代码用途:
+        #      更新延迟 EMA；429/503 触发指数退避 + 抖动冷却，成功则清零连续失败。
+        #
+        #  💡 易懂解释:
+        #      钥匙用完放回来，被拦了就让它歇一会儿，歇的时间越来越长！
+        #
+        #  ⚠️ 警告:
+        #      [状态码 0]: 表示网络异常，计入 errors 但不冷却。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "_post" -> release
+        # =============================================================================
+        key.inflight -= 1 # 🏁 结束
+        if status in THROTTLE_STATUSES: # 🚦 被限流
+            key.failures += 1 # 🔁 连续失败
+            key.stats["throttled"] += 1 # 📈 限流计数
+            backoff = min(GEMINI_KEY_COOLDOWN_MAX_S, GEMINI_KEY_COOLDOWN_S * 2 ** (key.failures - 1)) # ⏳ 指数退避
+            key.cooldown_until = time.monotonic() + backoff * random.uniform(0.5, 1.0) # 🎲 加抖动
+            return # 🔙 限流响应不计入延迟
+        if status != 200: key.stats["errors"] += 1 # 🚨 其他失败
+        if status == 200: key.failures = 0 # ✅ 清零连续失败
+        if status: key.latency_ms = latency_ms if key.latency_ms == 0 else key.latency_ms * 0.8 + latency_ms * 0.2 # 📉 延迟 EMA
+
+    def charge(self, key, actual_tokens, est_tokens):
+        # =============================================================================
+        #  🎉 补扣用量 (密钥，实际 Token，预估 Token)
+        #
+        #  🎨 代码用途:
+        #      用 usageMetadata 的实际 Token 数修正 Token 令牌桶。
+        #
+        #  💡 易懂解释:
+        #      实际用多了就再扣一点，用少了就退回去！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "_request / _drain_stream" -> charge
+        # =============================================================================
+        key.tpm.force(actual_tokens - est_tokens) # 🪙 修正差额
+        key.stats["tokens"] += actual_tokens # 📈 Token 计数
+
+    def get_stats(self):
+        # =============================================================================
+        #  🎉 获取统计 (无参数)
+        #
+        #  🎨 代码用途:
+        #      返回每个密钥的利用率、延迟、冷却剩余与计数器 (密钥已脱敏)。
+        #
+        #  💡 易懂解释:
+        #      看看每把钥匙用得怎么样！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/brain/stats" -> get_stats
+        # =============================================================================
+        now = time.monotonic() # ⏱️ 当前时间
+        return {
+            "rpm": self.rpm, # 🧮 请求数配额
+            "tpm": self.tpm, # 🧮 Token 配额
+            "waits": self.waits, # ⏳ 等待次数
+            "keys": [{
+                "key": k.label, # 🏷️ 脱敏标签
+                "rpm_utilization": k.rpm.utilization, # 📊 请求数利用率
+                "tpm_utilization": k.tpm.utilization, # 📊 Token 利用率
+                "latency_ms": round(k.latency_ms, 1), # ⏱️ 延迟 EMA
+                "inflight": k.inflight, # 🏃 进行中
+                "cooldown_s": round(max(0.0, k.cooldown_until - now), 1), # ⏳ 剩余冷却
+                **k.stats, # 📊 计数器
+            } for k in self.keys], # 🔑 分密钥统计
+        } # 📦 统计结果
+
+angel_key_pool = KeyPool()
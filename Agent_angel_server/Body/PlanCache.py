@@ -0,0 +1,168 @@
+# ==========================================================================
+#  📃 文件功能 : 动作规划语义缓存
+#  ⚡ 逻辑摘要 : 以 (模型, 目标, URL, 裁剪框) 分桶，桶内按截图感知哈希 (dHash) 的汉明距离匹配，LRU + TTL 淘汰。
+#  💡 易懂解释 : 画面没变、问题没变，就别再花钱问大脑一遍了，直接用上次的答案！
+#  🔋 未来扩展 : 支持按动作类型设置不同 TTL，支持跨进程共享缓存。
+#  📊 当前状态 : 活跃 (更新: 2026-10-17)
+#  🧱 Body/PlanCache.py 踩坑记录 (累积，勿覆盖) :
+#     1. [2026-10-17] [待验证] [死循环]: 页面对某动作无反应时会反复命中同一计划。 -> 依赖 TTL 过期后重新询问模型。
+# ==========================================================================
+
+import asyncio
+import base64
+import copy
+import hashlib
+import io
+import sys
+import os
+import time
+from collections import OrderedDict
+
+# 🛠️ 确保能导入 Memory 模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Memory.Config import PLAN_CACHE_SIZE, PLAN_CACHE_TTL_S, PLAN_CACHE_MAX_DISTANCE
+
+BUCKET_SIZE = 4 # 🧮 每个 (模型, 目标, URL, 裁剪框) 保留的截图变体数
+
+def dhash(jpeg_bytes, size=8):
+    # =============================================================================
+    #  🎉 差值哈希 (JPEG 字节，边长)
+    #
+    #  🎨 代码用途:
+    #      灰度缩放到 (size+1) x size，比较相邻像素亮度生成 64 位感知哈希。
+    #
+    #  💡 易懂解释:
+    #      把截图缩成一张小小的马赛克，记住它明暗的样子！
+    #
+    #  ⚠️ 警告:
+    #      [CPU]: 需要解码整张 JPEG，调用方应放到线程池执行。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/PlanCache.py "fingerprint" -> dhash
+    # =============================================================================
+    from PIL import Image # 📦 延迟导入
+    img = Image.open(io.BytesIO(jpeg_bytes)) # 🖼️ 打开图片
+    img.draft("L", (size * 16, size * 16)) # ⚡ JPEG 降采样解码
+    px = list(img.convert("L").resize((size + 1, size), Image.BILINEAR).getdata()) # 🔢 灰度像素
+    bits = 0 # 🧮 哈希位
+    for row in range(size): # 🔄 逐行
+        for col in range(size): # 🔄 逐列
+            left = px[row * (size + 1) + col] # ⬅️ 左像素
+            right = px[row * (size + 1) + col + 1] # ➡️ 右像素
+            bits = (bits << 1) | (left > right) # ➕ 写入一位
+    return bits # 📤 返回哈希
+
+class PlanCache:
+    # =============================================================================
+    #  🎉 规划缓存
+    #
+    #  🎨 代码用途:
+    #      缓存 plan_next_action 的结果 (已映射回视口坐标)，画面在汉明距离阈值内视为未变化。
+    #
+    #  💡 易懂解释:
+    #      一本 "问过的问题和答案" 的小本子！
+    #
+    #  ⚠️ 警告:
+    #      [容量]: PLAN_CACHE_SIZE 限制的是桶数 (目标+URL+裁剪框 组合)，每桶最多 BUCKET_SIZE 个截图变体。
+    #      [裁剪框]: 变化区域裁剪每步位置不同，相似的裁剪图 (如近乎空白) 指纹相同，裁剪框必须进键，否则会点到别处。
+    #      [关闭]: PLAN_CACHE_SIZE 为 0 时整体关闭。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/Gemini.py "plan_next_action" -> PlanCache
+    # =============================================================================
+    def __init__(self, max_entries=PLAN_CACHE_SIZE, ttl_s=PLAN_CACHE_TTL_S, max_distance=PLAN_CACHE_MAX_DISTANCE):
+        self.max_entries = max_entries # 🧮 桶数上限
+        self.ttl_s = ttl_s # ⏳ 条目有效期
+        self.max_distance = max_distance # 📏 汉明距离阈值
+        self.buckets = OrderedDict() # {(model, goal, url, box): [(hash, plan, cost, stored_at)]} (LRU 顺序) # 📇 缓存桶
+        self.evictions = 0 # 📈 淘汰次数
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 # 🚦 是否开启
+
+    async def fingerprint(self, screenshot_b64):
+        # =============================================================================
+        #  🎉 截图指纹 (Base64 截图)
+        #
+        #  🎨 代码用途:
+        #      在线程池中解码截图并计算 dHash，失败返回 None (本次不走缓存)。
+        #
+        #  💡 易懂解释:
+        #      给这张截图按个指纹！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "plan_next_action" -> fingerprint
+        # =============================================================================
+        try: return await asyncio.to_thread(lambda: dhash(base64.b64decode(screenshot_b64))) # 🧵 线程池计算
+        except Exception: return None # 🛑 解码失败
+
+    @staticmethod
+    def fingerprint_text(text):
+        return int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "big") # 🖐️ 文本指纹 (仅精确匹配有意义)
+
+    @staticmethod
+    def box_key(box):
+        return tuple(round(float(v), 3) for v in box) if box else None # 📐 裁剪框键 (None 表示整个视口)
+
+    def get(self, model, goal, url, fp, box=None):
+        # =============================================================================
+        #  🎉 查询 (模型，目标，URL，指纹，裁剪框)
+        #
+        #  🎨 代码用途:
+        #      在桶内找汉明距离最小且不超过阈值的未过期条目，返回 (计划副本, 原调用成本)。
+        #
+        #  💡 易懂解释:
+        #      这个问题问过吗？那时候的画面和现在像不像？
+        #
+        #  ⚠️ 警告:
+        #      [副本]: 返回深拷贝，调用方修改不会污染缓存。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "plan_next_action" -> get
+        # =============================================================================
+        key = (model, goal, url, self.box_key(box)) # 🔑 桶键
+        bucket = self.buckets.get(key) # 📦 缓存桶
+        if not bucket: return None # 🛑 无桶
+        now = time.time() # ⏱️ 当前时间
+        bucket[:] = [e for e in bucket if now - e[3] < self.ttl_s] # 🧹 清理过期
+        if not bucket: # 🚦 桶已空
+            del self.buckets[key] # 🗑️ 删除空桶
+            return None # 🛑 未命中
+        dist, entry = min(((bin(fp ^ e[0]).count("1"), e) for e in bucket), key=lambda t: t[0]) # 📏 最近条目
+        if dist > self.max_distance: return None # 🛑 画面已变化
+        self.buckets.move_to_end(key) # 🔝 刷新 LRU
+        return copy.deepcopy(entry[1]), entry[2] # 📤 计划副本与成本
+
+    def put(self, model, goal, url, fp, plan, cost, box=None):
+        # =============================================================================
+        #  🎉 写入 (模型，目标，URL，指纹，计划，成本，裁剪框)
+        #
+        #  🎨 代码用途:
+        #      写入新条目，桶内超过 BUCKET_SIZE 丢弃最旧变体，桶数超过上限按 LRU 淘汰。
+        #
+        #  💡 易懂解释:
+        #      把新的问答记进小本子，本子满了撕掉最旧的一页！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "plan_next_action" -> put
+        # =============================================================================
+        key = (model, goal, url, self.box_key(box)) # 🔑 桶键
+        bucket = self.buckets.setdefault(key, []) # 📦 缓存桶
+        bucket.append((fp, copy.deepcopy(plan), cost, time.time())) # 📥 写入条目
+        del bucket[:-BUCKET_SIZE] # ✂️ 保留最新变体
+        self.buckets.move_to_end(key) # 🔝 刷新 LRU
+        while len(self.buckets) > self.max_entries: # 🚦 超出容量
+            self.buckets.popitem(last=False) # 🗑️ 淘汰最久未用
+            self.evictions += 1 # 📈 淘汰计数
+
+    def get_stats(self):
+        return {"enabled": self.enabled, "buckets": len(self.buckets), "max_entries": self.max_entries, "ttl_s": self.ttl_s, "max_distance": self.max_distance, "evictions": self.evictions} # 📊 缓存统计
+
+angel_plan_cache = PlanCache()
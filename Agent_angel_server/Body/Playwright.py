@@ -3,7 +3,7 @@
 #  ⚡ 逻辑摘要 : 封装 Patchright 浏览器操作，包括鼠标控制、截图、会话管理。
 #  💡 易懂解释 : 机器人的 "躯干" 和 "手眼"，负责实际操作浏览器。
 #  🔋 未来扩展 : 支持多标签页管理，支持文件上传下载。
-#  📊 当前状态 : 活跃 (更新: 2025-12-16)
+#  📊 当前状态 : 活跃 (更新: 2026-10-17)
 #  🧱 Body/Playwright.py 踩坑记录 (累积，勿覆盖) :
 #     1. [2025-12-04] [已修复] [反爬虫]: 某些网站检测到自动化工具。 -> 引入 playwright-stealth 并禁用 blink-features。
 #     2. [2025-12-16] [重构] [Patchright迁移]: 从 Playwright 迁移到 Patchright，获得更强反爬虫能力。
@@ -13,12 +13,25 @@ import asyncio
 import os
 import json
 import sys
+import time
+import weakref
+from collections import OrderedDict
+from urllib.parse import urlsplit
 from patchright.async_api import async_playwright
 
 # 🛠️ 确保能导入 Memory 和 Energy 模块
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from Memory.Config import USER_DATA_DIR, VIEWPORT, BROWSER_CHANNEL, TARGET_SEARCH_URL, PRICING_TABLE
-from Energy.Tasks import global_net_cost
+from Memory.Config import BROWSER_POOL_SIZE, BROWSER_DEBUG_PORT_BASE, BROWSER_LATENCY_WEIGHT_MS
+from Memory.Config import SESSION_IDLE_TTL_S, SESSION_MAX_LIVE
+from Memory.Config import USER_AGENT, BROWSER_LOCALE, CONTEXT_POOL_SIZE
+from Memory.Config import SCREENCAST_ENABLED, SCREENCAST_QUALITY, SCREENCAST_WAIT_S
+from Memory.Config import NET_ACCOUNTING
+from Energy.SessionCost import global_session_cost
+from Energy.NetAccounting import CdpByteMeter, global_traffic
+from Body.Scheduler import angel_scheduler
+from Body.RequestPolicy import global_request_policy, global_size_model
+from Body.HttpCache import global_http_cache, CACHE_HIT_HEADER, HOP_HEADERS
 
 # ==========================================================================
 #  ✋ Hand Section (Input)
@@ -116,23 +129,45 @@ class MouseController:
         try: await self.page.evaluate(js_code, {'id': self.cursor_id, 'x': x, 'y': y}) # 💉 执行 JS
         except: pass # 🤐 忽略错误
 
-    async def click(self, x_ratio, y_ratio):
+    async def locate(self, element):
         # =============================================================================
-        #  🎉 点击 (X比例, Y比例)
+        #  🎉 定位元素 (元素序号)
         #
         #  🎨 代码用途:
-        #      执行点击操作。
+        #      按 data-angel-idx 找到元素，必要时滚动到视口内，返回中心点的视口比例坐标。
+        #
+        #  💡 易懂解释:
+        #      大脑说 "点第 12 号"，小手先找到 12 号在哪里！
+        #
+        #  ⚠️ 警告:
+        #      [序号失效]: 页面跳转后序号重新编号，找不到时抛出 ValueError。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "click" -> locate
+        # =============================================================================
+        pos = await self.page.evaluate(LOCATE_JS, int(element)) # 💉 查询元素位置
+        if not pos: raise ValueError(f"element {element} not found") # 🛑 元素不存在
+        return pos[0], pos[1] # 📤 视口比例坐标
+
+    async def click(self, x_ratio=0.5, y_ratio=0.5, element=None):
+        # =============================================================================
+        #  🎉 点击 (X比例, Y比例, 元素序号)
+        #
+        #  🎨 代码用途:
+        #      执行点击操作；给出元素序号时先解析为坐标。
         #
         #  💡 易懂解释:
         #      用力按下去！点击目标位置！
         #
         #  ⚠️ 警告:
         #      [坐标系]: 坐标是相对比例 (0.0-1.0)。
+        #      [元素序号]: 来自 ScreenshotTool.elements()，优先于坐标。
         #
         #  ⚙️ 触发源:
         #      Through Body/Playwright.py "Action Execution" -> click
         # =============================================================================
         if not self.page: return # 🛑 页面不存在
+        if element is not None: x_ratio, y_ratio = await self.locate(element) # 🔍 序号转坐标
         target_x = x_ratio * VIEWPORT['width'] # 🎯 计算目标 X
         target_y = y_ratio * VIEWPORT['height'] # 🎯 计算目标 Y
         
@@ -149,32 +184,294 @@ class MouseController:
 # ==========================================================================
 
 import base64
+import zlib
+
+OBSERVE_FIELDS = ("frame", "url", "title", "scroll", "viewport", "changed", "elements") # 🧺 观察字段全集
+OBSERVE_DEFAULT_FIELDS = OBSERVE_FIELDS[:-1] # 🧺 默认字段 (元素列表需显式请求)
+MAX_ELEMENTS = 150 # 🧮 元素列表上限
+OBSERVE_JS = """
+() => ({
+    title: document.title,
+    scroll_x: Math.round(window.scrollX),
+    scroll_y: Math.round(window.scrollY),
+    scroll_height: document.documentElement ? document.documentElement.scrollHeight : 0,
+    dom_nodes: document.getElementsByTagName('*').length
+})
+""" # 📜 页面元数据采集脚本
+
+ELEMENTS_JS = """
+(limit) => {
+    const sel = 'a[href],button,input:not([type=hidden]),select,textarea,summary,[contenteditable=""],[contenteditable=true],[onclick],'
+        + '[role=button],[role=link],[role=checkbox],[role=radio],[role=tab],[role=menuitem],[role=option],[role=switch],'
+        + '[role=textbox],[role=combobox],[role=searchbox],[tabindex]:not([tabindex="-1"])';
+    const W = window.innerWidth, H = window.innerHeight, r3 = v => Math.round(v * 1000) / 1000;
+    let next = window.__angelIdx || 0;
+    const out = [];
+    for (const el of document.querySelectorAll(sel)) {
+        const r = el.getBoundingClientRect();
+        if (r.width < 2 || r.height < 2 || r.bottom < 0 || r.right < 0 || r.top > H || r.left > W) continue;
+        const st = getComputedStyle(el);
+        if (st.visibility === 'hidden' || st.display === 'none' || st.opacity === '0') continue;
+        let idx = el.getAttribute('data-angel-idx');
+        if (idx === null) { idx = String(next++); el.setAttribute('data-angel-idx', idx); }
+        const tag = el.tagName.toLowerCase();
+        const role = el.getAttribute('role') || (tag === 'a' ? 'link' : tag === 'input' ? (el.type || 'text') : tag);
+        const value = el.type === 'password' ? '' : (el.value || '');
+        const name = (el.getAttribute('aria-label') || el.innerText || value || el.placeholder || el.title || el.alt || '')
+            .replace(/\\s+/g, ' ').trim().slice(0, 60);
+        out.push([+idx, role, name, r3(r.left / W), r3(r.top / H), r3(r.width / W), r3(r.height / H)]);
+        if (out.length >= limit) break;
+    }
+    window.__angelIdx = next;
+    return out;
+}
+""" # 📜 可交互元素采集脚本 ([序号, 角色, 名称, x, y, w, h]，坐标为视口比例)
+
+LOCATE_JS = """
+(idx) => {
+    const el = document.querySelector(`[data-angel-idx="${idx}"]`);
+    if (!el) return null;
+    let r = el.getBoundingClientRect();
+    if (r.bottom < 0 || r.top > innerHeight || r.right < 0 || r.left > innerWidth) {
+        el.scrollIntoView({block: 'center', inline: 'center'});
+        r = el.getBoundingClientRect();
+    }
+    return [(r.left + r.width / 2) / innerWidth, (r.top + r.height / 2) / innerHeight];
+}
+""" # 📜 元素定位脚本 (返回中心点视口比例)
+
+def serialize_elements(elements):
+    # =============================================================================
+    #  🎉 序列化元素 (元素列表)
+    #
+    #  🎨 代码用途:
+    #      把元素列表压缩成每行一个的紧凑文本: 序号 角色 "名称" x,y,w,h。
+    #
+    #  💡 易懂解释:
+    #      把页面上能点的东西写成一张小清单！
+    #
+    #  ⚠️ 警告:
+    #      无。
+    #
+    #  ⚙️ 触发源:
+    #      Through Memory/Interface.py "/state/observe, /agent/step" -> serialize_elements
+    # =============================================================================
+    return "\n".join(f'{i} {role} "{name.replace(chr(34), chr(39))}" {x},{y},{w},{h}' for i, role, name, x, y, w, h in elements) # 📝 紧凑文本
 
 class ScreenshotTool:
     # =============================================================================
     #  🎉 截图工具
     #
     #  🎨 代码用途:
-    #      捕获页面截图并转换为 Base64。
+    #      捕获页面截图并转换为 Base64，可选维护 CDP 截屏流的最新帧缓冲。
     #
     #  💡 易懂解释:
     #      这是我们的眼睛，负责把屏幕上的画面拍下来！
     #
     #  ⚠️ 警告:
     #      [性能影响]: 截图质量影响 AI 识别准确率和 Token 消耗。
+    #      [帧序号]: frame_seq 对每次截屏流帧和普通截图都递增，可用于等待动作后的新画面。
     #
     #  ⚙️ 触发源:
     #      Through Body/Playwright.py "Session Init" -> ScreenshotTool
     # =============================================================================
-    def __init__(self, page):
+    def __init__(self, page, slot=None):
         self.page = page # 📄 页面对象
+        self.slot = slot # 🖥️ 所属浏览器槽位 (延迟统计)
+        self.last_capture_at = 0.0 # 🕒 最近截图时间 (Unix 秒)
+        self.frame_seq = 0 # 🔢 画面序号
+        self.frame_b64 = None # 🎞️ 截屏流最新帧 (Base64)
+        self.cdp = None # 🔌 CDP 会话 (截屏流)
+        self.screencast_quality = None # 🎚️ 当前推流质量
+        self._frame_event = asyncio.Event() # 🔔 新帧通知
+        self.last_observe_sig = None # ✍️ 上次观察签名
+
+    async def start_screencast(self, quality=SCREENCAST_QUALITY):
+        # =============================================================================
+        #  🎉 开启截屏流 (质量)
+        #
+        #  🎨 代码用途:
+        #      通过 CDP 订阅 Page.startScreencast，把推送的帧缓存在内存中。
+        #
+        #  💡 易懂解释:
+        #      让浏览器一直把画面推给我们，想看随时看！
+        #
+        #  ⚠️ 警告:
+        #      [失败处理]: 订阅失败时保持普通截图模式。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "get_or_create_session" -> start_screencast
+        # =============================================================================
+        if not self.page or self.cdp: return # 🛑 无页面或已开启
+        try:
+            self.cdp = await self.page.context.new_cdp_session(self.page) # 🔌 建立 CDP 会话
+            self.cdp.on("Page.screencastFrame", self._on_frame) # 🎞️ 帧监听
+            await self._send_start(quality) # 🎥 开始推流
+        except Exception as e: # 🚨 订阅失败
+            print(f"⚠️ [Playwright] 截屏流开启失败: {e}") # 📢 打印警告
+            self.cdp = None # 🔙 回退普通截图
+
+    async def _send_start(self, quality):
+        await self.cdp.send("Page.startScreencast", {
+            "format": "jpeg", # 🖼️ 格式
+            "quality": quality, # 🎚️ 质量
+            "maxWidth": VIEWPORT['width'], # 📏 最大宽度
+            "maxHeight": VIEWPORT['height'], # 📏 最大高度
+        }) # 🎥 开始推流
+        self.screencast_quality = quality # 🎚️ 记录质量
+
+    async def _match_quality(self, quality):
+        # =============================================================================
+        #  🎉 调整推流质量 (请求质量)
+        #
+        #  🎨 代码用途:
+        #      推流质量取 min(请求质量, SCREENCAST_QUALITY)，与当前不同时重启推流，返回是否重启。
+        #
+        #  💡 易懂解释:
+        #      要省钱就让浏览器推模糊一点的画面，额度恢复了再推清楚的！
+        #
+        #  ⚠️ 警告:
+        #      [旧帧]: 重启后缓存帧仍是旧质量，调用方需等待新帧。
+        #      [失败处理]: 重启失败时关闭截屏流，回退普通截图 (普通截图本身按请求质量)。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "capture / capture_bytes" -> _match_quality
+        # =============================================================================
+        target = min(quality, SCREENCAST_QUALITY) # 🎚️ 目标质量
+        if self.cdp is None or target == self.screencast_quality: return False # 🛑 无需调整
+        try:
+            await self.cdp.send("Page.stopScreencast") # ⏹️ 停止推流
+            await self._send_start(target) # 🎥 按新质量推流
+            return True # ✅ 已重启
+        except Exception as e: # 🚨 重启失败
+            print(f"⚠️ [Playwright] 截屏流调整质量失败: {e}") # 📢 打印警告
+            self.cdp = None # 🔙 回退普通截图
+            return False # ❌ 未重启
+
+    def _on_frame(self, params):
+        # =============================================================================
+        #  🎉 收到新帧 (帧参数)
+        #
+        #  🎨 代码用途:
+        #      更新最新帧与序号，确认帧 (ACK) 并唤醒等待者。
+        #
+        #  💡 易懂解释:
+        #      新画面到啦！记下来，告诉等着看的朋友！
+        #
+        #  ⚠️ 警告:
+        #      [ACK]: 不确认帧 Chromium 会停止推流。
+        #
+        #  ⚙️ 触发源:
+        #      Through CDP "Page.screencastFrame" -> _on_frame
+        # =============================================================================
+        self.frame_b64 = params["data"] # 🎞️ 最新帧
+        self.frame_seq += 1 # 🔢 序号递增
+        self.last_capture_at = params.get("metadata", {}).get("timestamp") or time.time() # 🕒 帧时间
+        asyncio.create_task(self._ack_frame(params["sessionId"])) # ✅ 确认帧
+        event, self._frame_event = self._frame_event, asyncio.Event() # 🔄 轮换通知
+        event.set() # 🔔 唤醒等待者
+
+    async def _ack_frame(self, session_id):
+        # =============================================================================
+        #  🎉 确认帧 (帧会话ID)
+        #
+        #  🎨 代码用途:
+        #      发送 Page.screencastFrameAck，允许 Chromium 推送下一帧。
+        #
+        #  💡 易懂解释:
+        #      告诉浏览器：这张收到啦，下一张！
+        #
+        #  ⚠️ 警告:
+        #      [页面关闭]: 页面关闭后发送会失败，直接忽略。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "_on_frame" -> _ack_frame
+        # =============================================================================
+        try: await self.cdp.send("Page.screencastFrameAck", {"sessionId": session_id}) # ✅ 确认帧
+        except: pass # 🤐 忽略错误
+
+    async def _latest_frame(self, after_seq=None):
+        # =============================================================================
+        #  🎉 读取最新帧 (最小序号)
+        #
+        #  🎨 代码用途:
+        #      立即返回缓存帧；指定 after_seq 时等待序号大于它的新帧。
+        #
+        #  💡 易懂解释:
+        #      直接拿最新的照片，不够新就等一下下！
+        #
+        #  ⚠️ 警告:
+        #      [超时]: SCREENCAST_WAIT_S 内无新帧返回 None，由调用方回退普通截图。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "capture / capture_bytes" -> _latest_frame
+        # =============================================================================
+        if self.cdp is None: return None # 🛑 未开启截屏流
+        deadline = time.monotonic() + SCREENCAST_WAIT_S # ⏳ 截止时间
+        while self.frame_b64 is None or (after_seq is not None and self.frame_seq <= after_seq): # 🚦 帧不够新
+            remaining = deadline - time.monotonic() # ⏳ 剩余时间
+            if remaining <= 0: return None # 🛑 等待超时
+            try: await asyncio.wait_for(self._frame_event.wait(), remaining) # 🔔 等待新帧
+            except asyncio.TimeoutError: return None # 🛑 等待超时
+        return self.frame_b64 # 📤 最新帧
+
+    async def _screenshot_bytes(self, quality):
+        # =============================================================================
+        #  🎉 普通截图 (质量)
+        #
+        #  🎨 代码用途:
+        #      调用 page.screenshot 截取 JPEG，并更新延迟统计与序号。
+        #
+        #  💡 易懂解释:
+        #      咔嚓！老老实实拍一张！
+        #
+        #  ⚠️ 警告:
+        #      [失败处理]: 返回空字节串表示失败。
+        #      [负载统计]: 成功截图的耗时会计入所属浏览器的延迟均值。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "capture / capture_bytes" -> _screenshot_bytes
+        # =============================================================================
+        if not self.page: return b"" # 🛑 页面不存在
+        try:
+            start_t = time.perf_counter() # ⏱️ 记录开始
+            screenshot_bytes = await self.page.screenshot(type='jpeg', quality=quality) # 📸 截图
+            self.last_capture_at = time.time() # 🕒 记录截图时间
+            self.frame_seq += 1 # 🔢 序号递增
+            if self.slot is not None: # 🚦 槽位存在
+                cost_ms = (time.perf_counter() - start_t) * 1000 # ⏱️ 本次耗时
+                self.slot["latency_ms"] += (cost_ms - self.slot["latency_ms"]) * 0.2 # 📉 指数平均
+                self.slot["screenshots"] += 1 # 📈 截图计数
+            return screenshot_bytes # 📤 原始字节
+        except: return b"" # 🤐 忽略错误
 
-    async def capture(self, quality=50):
+    async def capture_bytes(self, quality=50, after_seq=None):
         # =============================================================================
-        #  🎉 截图 (质量)
+        #  🎉 截图原始字节 (质量，最小序号)
         #
         #  🎨 代码用途:
-        #      截图。
+        #      获取 JPEG 原始字节，不做 Base64 编码，供二进制传输使用。
+        #
+        #  💡 易懂解释:
+        #      咔嚓！直接把照片原样交出去，不用再打包！
+        #
+        #  ⚠️ 警告:
+        #      [失败处理]: 返回空字节串表示失败。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/state/screenshot (image/jpeg)" -> capture_bytes
+        # =============================================================================
+        if await self._match_quality(quality): after_seq = max(after_seq or 0, self.frame_seq) # 🎚️ 质量变化后等待新帧
+        frame = await self._latest_frame(after_seq) # 🎞️ 尝试截屏流
+        if frame is not None: return base64.b64decode(frame) # 📤 解码缓存帧
+        return await self._screenshot_bytes(quality) # 📸 普通截图
+
+    async def capture(self, quality=50, after_seq=None):
+        # =============================================================================
+        #  🎉 截图 (质量，最小序号)
+        #
+        #  🎨 代码用途:
+        #      截图并转换为 Base64 字符串 (JSON 兼容格式)，截屏流模式下零等待返回最新帧。
         #
         #  💡 易懂解释:
         #      咔嚓！拍一张照片发给大脑！
@@ -185,11 +482,88 @@ class ScreenshotTool:
         #  ⚙️ 触发源:
         #      Through Body/Playwright.py "Observation" -> capture
         # =============================================================================
-        if not self.page: return "" # 🛑 页面不存在
-        try:
-            screenshot_bytes = await self.page.screenshot(type='jpeg', quality=quality) # 📸 截图
-            return base64.b64encode(screenshot_bytes).decode('utf-8') # 📦 转 Base64
-        except: return "" # 🤐 忽略错误
+        if await self._match_quality(quality): after_seq = max(after_seq or 0, self.frame_seq) # 🎚️ 质量变化后等待新帧
+        frame = await self._latest_frame(after_seq) # 🎞️ 尝试截屏流
+        if frame is not None: return frame # 📤 缓存帧 (已是 Base64)
+        screenshot_bytes = await self._screenshot_bytes(quality) # 📸 普通截图
+        if not screenshot_bytes: return "" # 🛑 截图失败
+        return base64.b64encode(screenshot_bytes).decode('utf-8') # 📦 转 Base64
+
+    async def elements(self, limit=MAX_ELEMENTS):
+        # =============================================================================
+        #  🎉 可交互元素 (数量上限)
+        #
+        #  🎨 代码用途:
+        #      一次 evaluate 取回视口内可见的可交互元素: 序号、角色、名称和包围盒 (视口比例)。
+        #      序号写入 data-angel-idx，同一文档内保持稳定。
+        #
+        #  💡 易懂解释:
+        #      不看图，直接数一数页面上有哪些按钮和输入框！
+        #
+        #  ⚠️ 警告:
+        #      [隐私]: 密码框的值不会被采集。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "observe" -> elements
+        # =============================================================================
+        if not self.page: return [] # 🛑 页面不存在
+        try: return await self.page.evaluate(ELEMENTS_JS, limit) # 💉 一次取回
+        except: return [] # 🤐 忽略错误
+
+    async def observe(self, fields=None, quality=50, after_seq=None):
+        # =============================================================================
+        #  🎉 综合观察 (字段集合，质量，最小序号)
+        #
+        #  🎨 代码用途:
+        #      一次调用返回画面、URL、标题、滚动位置、视口和 "页面是否变化" 标记；
+        #      画面与页面元数据并行获取，可按字段跳过昂贵部分；elements 需显式请求。
+        #
+        #  💡 易懂解释:
+        #      看一眼就把想知道的都告诉你！
+        #
+        #  ⚠️ 警告:
+        #      [变化判定]: 基于 URL、标题、滚动、DOM 节点数和画面 CRC 的签名，
+        #      只比较本次与上次观察中都请求过的部分。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/state/observe" -> observe
+        # =============================================================================
+        fields = set(fields or OBSERVE_DEFAULT_FIELDS) # 🧺 请求字段
+        want_meta = bool(fields & {"title", "scroll", "changed"}) # 🚦 需要页面元数据
+        want_frame = "frame" in fields # 🚦 需要画面
+        want_elements = "elements" in fields # 🚦 需要元素列表
+
+        async def read_meta():
+            if not (want_meta and self.page): return {} # 🛑 跳过元数据
+            try: return await self.page.evaluate(OBSERVE_JS) # 💉 一次取回元数据
+            except: return {} # 🤐 忽略错误
+
+        async def read_frame():
+            if not want_frame: return "" # 🛑 跳过画面
+            return await self.capture(quality, after_seq) # 📸 截图
+
+        meta, frame, elements = await asyncio.gather(read_meta(), read_frame(), self.elements() if want_elements else asyncio.sleep(0, [])) # ⚡ 并行获取
+        url = self.page.url if self.page else "" # 🔗 当前地址
+        result = {} # 📦 观察结果
+        if "url" in fields: result["url"] = url # 🔗 地址
+        if "title" in fields: result["title"] = meta.get("title", "") # 🏷️ 标题
+        if "scroll" in fields: result["scroll"] = {"x": meta.get("scroll_x", 0), "y": meta.get("scroll_y", 0), "height": meta.get("scroll_height", 0)} # 📜 滚动位置
+        if "viewport" in fields: result["viewport"] = dict(VIEWPORT) # 📏 视口
+        if want_frame: # 🚦 包含画面
+            result["frame"] = frame # 🖼️ 画面
+            result["seq"] = self.frame_seq # 🔢 画面序号
+            result["captured_at"] = self.last_capture_at # 🕒 截图时间
+        if want_elements: # 🚦 包含元素列表
+            result["elements"] = elements # 🧩 元素列表
+            result["elements_text"] = serialize_elements(elements) # 📝 紧凑文本
+        if "changed" in fields: # 🚦 需要变化标记
+            sig = {"url": url, **meta} # ✍️ 元数据签名
+            if want_frame: sig["frame_crc"] = zlib.crc32(frame.encode("ascii")) # ✍️ 画面签名
+            prev = self.last_observe_sig # 📜 上次签名
+            shared = sig.keys() & prev.keys() if prev is not None else set() # 🔍 可比较部分
+            result["changed"] = prev is None or not shared or any(sig[k] != prev[k] for k in shared) # 🔄 变化判定
+            self.last_observe_sig = sig # 💾 保存签名
+        return result # 📤 返回结果
 
 # ==========================================================================
 #  🧠 Browser Manager (The Core)
@@ -203,13 +577,16 @@ class BrowserManager:
     #  🎉 浏览器管理器
     #
     #  🎨 代码用途:
-    #      单例模式管理 Playwright 实例和多用户会话。
+    #      单例模式管理 Playwright 实例、Chromium 进程池和多用户会话。
     #
     #  💡 易懂解释:
     #      这是网吧老板，负责管理所有的浏览器窗口和用户！
     #
     #  ⚠️ 警告:
     #      [并发安全]: 全局单例，注意线程安全 (使用 asyncio.Lock)。
+    #      [故障隔离]: 单个 Chromium 崩溃只影响该进程上的会话，下次分配时自动重启。
+    #      [内存回收]: 空闲或超出上限的会话会被休眠，下次访问时透明恢复。
+    #      [预热池]: 后台维护 CONTEXT_POOL_SIZE 个空白上下文，新会话直接领取。
     #
     #  ⚙️ 触发源:
     #      Through Body/Playwright.py "Global Init" -> BrowserManager
@@ -226,94 +603,420 @@ class BrowserManager:
         if self.initialized: return # 🛑 防止重复初始化
         self.initialized = True # 🚩 标记已初始化
         self.playwright = None # 🎭 Playwright 实例
-        self.browser = None # 🌐 浏览器实例
-        self.sessions = {} # {user_id: {context, page, eye, hand, cdp}} # 🗂️ 会话存储
+        self.browser = None # 🌐 0 号浏览器 (兼容旧调用)
+        self.pool = [] # [{index, port, browser, contexts, latency_ms, screenshots, crashes, warm}] # 🖥️ 浏览器槽位
+        self.sessions = OrderedDict() # {user_id: {context, page, eye, hand, slot, save_state, last_used}} (LRU 顺序) # 🗂️ 会话存储
+        self.hibernated = {} # {user_id: {url, since}} # 💤 休眠快照
+        self.hibernate_stats = {"hibernations": 0, "restores": 0, "hibernate_ms": 0.0, "restore_ms": 0.0} # 📊 休眠统计
+        self.warm_stats = {"claims": 0, "misses": 0, "created": 0} # 📊 预热统计
+        self.refill_task = None # 🔄 预热补货任务
+        self.policies = {} # {user_id: RequestPolicy} (覆盖全局策略，休眠后保留) # 🚫 会话拦截策略
         self.lock = asyncio.Lock() # 🔒 异步锁
+        self.user_locks = weakref.WeakValueDictionary() # {user_id: asyncio.Lock} 串行化同一用户的创建/关闭 (无人持有或等待时自动回收) # 🔒 用户锁
+
+    async def _launch_browser(self, slot):
+        # =============================================================================
+        #  🎉 启动单个浏览器 (槽位)
+        #
+        #  🎨 代码用途:
+        #      为指定槽位启动一个 Chromium 进程并挂载断线监听。
+        #
+        #  💡 易懂解释:
+        #      给这个座位开一台新电脑！
+        #
+        #  ⚠️ 警告:
+        #      [端口占用]: 每个槽位使用独立的远程调试端口 (BASE + 序号)。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "Pool Start / Slot Recover" -> _launch_browser
+        # =============================================================================
+        # 🎯 Patchright 优化的启动参数
+        # Patchright 已自动处理大部分反检测，保持参数简洁
+        launch_args = [
+            f"--remote-debugging-port={slot['port']}", # 🔌 开启远程调试 (CDP 需要)
+            "--disable-gpu", # 🚫 禁用 GPU (服务器环境)
+            "--disable-dev-shm-usage", # 🚫 禁用 /dev/shm (Docker 兼容)
+            "--no-sandbox", # 🚫 禁用沙箱 (Docker 兼容)
+            # Patchright 已自动隐藏 AutomationControlled，无需手动禁用
+            "--disable-extensions", # 🚫 禁用扩展 (加速启动)
+            "--disable-background-networking", # 🚫 禁用后台网络 (加速启动)
+            "--disable-default-apps", # 🚫 禁用默认应用 (加速启动)
+            "--disable-sync", # 🚫 禁用同步 (加速启动)
+            "--disable-translate", # 🚫 禁用翻译 (加速启动)
+            "--metrics-recording-only", # 📊 仅记录指标 (加速启动)
+            "--mute-audio", # 🔇 静音 (加速启动)
+            "--no-first-run", # 🚫 跳过首次运行 (加速启动)
+            "--disable-background-timer-throttling", # 🚫 禁用后台定时器限制
+            "--disable-backgrounding-occluded-windows", # 🚫 禁用后台窗口
+            "--disable-renderer-backgrounding", # 🚫 禁用渲染器后台
+        ] # 🚀 启动参数 (已优化启动速度 + Patchright 反检测)
+        browser = await self.playwright.chromium.launch(
+            headless=True, # 👻 无头模式
+            args=launch_args, # ⚙️ 参数
+            channel=BROWSER_CHANNEL, # 📺 浏览器通道 (推荐使用 "chrome" 而非 "chromium")
+            # Patchright 已自动处理 automation 标志，无需手动忽略
+            timeout=30000 # ⏱️ 启动超时30秒
+        ) # 🌐 启动浏览器 (Patchright 增强版)
+        browser.on("disconnected", lambda b: self._on_browser_disconnected(slot, b)) # 💥 崩溃监听
+        slot["browser"] = browser # 📥 装入槽位
+        slot["contexts"] = 0 # 🧹 上下文归零
+        slot["warm"] = [] # 🧹 预热清空
+        slot["latency_ms"] = 0.0 # 🧹 延迟归零
+        if slot["index"] == 0: self.browser = browser # 🔗 兼容旧引用
+
+    def _on_browser_disconnected(self, slot, browser):
+        # =============================================================================
+        #  🎉 浏览器断线处理 (槽位，浏览器)
+        #
+        #  🎨 代码用途:
+        #      清空崩溃槽位，并移除挂在该进程上的所有会话。
+        #
+        #  💡 易懂解释:
+        #      这台电脑坏掉了，把坐在上面的朋友先请下来，下次换台好的！
+        #
+        #  ⚠️ 警告:
+        #      [状态丢失]: 进程已死，无法再保存 storage_state，恢复时使用上次落盘的 state.json。
+        #
+        #  ⚙️ 触发源:
+        #      Through Patchright "disconnected" event -> _on_browser_disconnected
+        # =============================================================================
+        if slot["browser"] is not browser: return # 🛑 旧进程事件
+        slot["browser"] = None # 🗑️ 清空槽位
+        slot["contexts"] = 0 # 🧹 上下文归零
+        slot["warm"] = [] # 🧹 预热清空
+        slot["crashes"] += 1 # 📈 崩溃计数
+        if slot["index"] == 0: self.browser = None # 🔗 兼容旧引用
+        lost = [uid for uid, s in self.sessions.items() if s.get("slot") is slot] # 🔍 受影响会话
+        for uid in lost: # 🔄 遍历受影响会话
+            session = self.sessions.pop(uid) # 🗑️ 移除会话
+            self.hibernated[uid] = {"url": session["page"].url, "since": time.time()} # 💤 按休眠快照恢复
+        print(f"💥 [Playwright] 浏览器 #{slot['index']} 断开，丢弃会话 {len(lost)} 个") # 📢 打印日志
 
     async def start_global_browser(self):
         # =============================================================================
         #  🎉 启动全局浏览器()
         #
         #  🎨 代码用途:
-        #      启动全局浏览器实例。
+        #      启动 Playwright 并并行拉起 BROWSER_POOL_SIZE 个 Chromium 进程。
         #
         #  💡 易懂解释:
         #      启动浏览器引擎，准备开始工作啦！
         #
         #  ⚠️ 警告:
-        #      [端口占用]: 开启了远程调试端口 9222，用于 CDP 连接。
+        #      [端口占用]: 0 号进程占用远程调试端口 9222，用于 Rust CDP 连接。
         #
         #  ⚙️ 触发源:
         #      Through Body/Playwright.py "Lazy Load" -> start_global_browser
         # =============================================================================
         async with self.lock: # 🔒 加锁
-            if self.browser: return # 🛑 已启动
-            print("🚀 [Playwright] 启动浏览器引擎...") # 📢 打印日志
+            if self.pool: return # 🛑 已启动
+            print(f"🚀 [Playwright] 启动浏览器引擎 x{BROWSER_POOL_SIZE}...") # 📢 打印日志
             self.playwright = await async_playwright().start() # 🎭 启动 Playwright
-            # 🎯 Patchright 优化的启动参数
-            # Patchright 已自动处理大部分反检测，保持参数简洁
-            launch_args = [
-                "--remote-debugging-port=9222", # 🔌 开启远程调试 (CDP 需要)
-                "--disable-gpu", # 🚫 禁用 GPU (服务器环境)
-                "--disable-dev-shm-usage", # 🚫 禁用 /dev/shm (Docker 兼容)
-                "--no-sandbox", # 🚫 禁用沙箱 (Docker 兼容)
-                # Patchright 已自动隐藏 AutomationControlled，无需手动禁用
-                "--disable-extensions", # 🚫 禁用扩展 (加速启动)
-                "--disable-background-networking", # 🚫 禁用后台网络 (加速启动)
-                "--disable-default-apps", # 🚫 禁用默认应用 (加速启动)
-                "--disable-sync", # 🚫 禁用同步 (加速启动)
-                "--disable-translate", # 🚫 禁用翻译 (加速启动)
-                "--metrics-recording-only", # 📊 仅记录指标 (加速启动)
-                "--mute-audio", # 🔇 静音 (加速启动)
-                "--no-first-run", # 🚫 跳过首次运行 (加速启动)
-                "--disable-background-timer-throttling", # 🚫 禁用后台定时器限制
-                "--disable-backgrounding-occluded-windows", # 🚫 禁用后台窗口
-                "--disable-renderer-backgrounding", # 🚫 禁用渲染器后台
-            ] # 🚀 启动参数 (已优化启动速度 + Patchright 反检测)
-            self.browser = await self.playwright.chromium.launch(
-                headless=True, # 👻 无头模式
-                args=launch_args, # ⚙️ 参数
-                channel=BROWSER_CHANNEL, # 📺 浏览器通道 (推荐使用 "chrome" 而非 "chromium")
-                # Patchright 已自动处理 automation 标志，无需手动忽略
-                timeout=30000 # ⏱️ 启动超时30秒
-            ) # 🌐 启动浏览器 (Patchright 增强版)
+            pool = [{
+                "index": i, # 🔢 槽位序号
+                "port": BROWSER_DEBUG_PORT_BASE + i, # 🔌 调试端口
+                "browser": None, # 🌐 浏览器实例
+                "contexts": 0, # 🧮 上下文数量
+                "latency_ms": 0.0, # ⏱️ 截图延迟均值
+                "screenshots": 0, # 📸 截图次数
+                "crashes": 0, # 💥 崩溃次数
+                "warm": [], # 🔥 预热上下文 [(context, page)]
+            } for i in range(BROWSER_POOL_SIZE)] # 🖥️ 初始化槽位
+            await asyncio.gather(*(self._launch_browser(slot) for slot in pool)) # 🚀 并行启动
+            self.pool = pool # 📥 发布进程池
+        self._schedule_refill() # 🔥 开始预热
+
+    async def warm_up(self):
+        # =============================================================================
+        #  🎉 预热()
+        #
+        #  🎨 代码用途:
+        #      服务启动时提前拉起浏览器进程并填满预热池，把冷启动移出请求路径。
+        #
+        #  💡 易懂解释:
+        #      开门前先把电脑都打开，客人来了马上就能用！
+        #
+        #  ⚠️ 警告:
+        #      [启动失败]: 仅打印日志，首个请求会再次尝试启动。
+        #
+        #  ⚙️ 触发源:
+        #      Through Brain/main.py "Server Startup" -> warm_up
+        # =============================================================================
+        try: await self.start_global_browser() # 🚀 启动浏览器
+        except Exception as e: print(f"❌ [Playwright] 预热启动失败: {e}") # 📢 打印错误
+
+    def _context_options(self, storage_state=None):
+        # =============================================================================
+        #  🎉 上下文参数 (存储状态)
+        #
+        #  🎨 代码用途:
+        #      统一生成 new_context 参数 (视口、UA、语言、存储状态)。
+        #
+        #  💡 易懂解释:
+        #      每个新窗口都用同一套出厂设置！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "Context Create / Prewarm" -> _context_options
+        # =============================================================================
+        return {
+            "viewport": VIEWPORT, # 📏 视口大小
+            "user_agent": USER_AGENT, # 🕵️ UA
+            "locale": BROWSER_LOCALE, # 🇨🇳 语言
+            "storage_state": storage_state, # 💾 状态
+        } # 📦 参数字典
+
+    def _schedule_refill(self):
+        # =============================================================================
+        #  🎉 安排补货()
+        #
+        #  🎨 代码用途:
+        #      确保至多一个后台补货任务在运行。
+        #
+        #  💡 易懂解释:
+        #      空窗口被领走了，叫后台再补几个！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "Pool Start / Warm Claim" -> _schedule_refill
+        # =============================================================================
+        if CONTEXT_POOL_SIZE <= 0: return # 🛑 预热关闭
+        if self.refill_task and not self.refill_task.done(): return # 🛑 补货进行中
+        self.refill_task = asyncio.create_task(self._refill_warm_pool()) # 🔄 启动补货
+
+    async def _refill_warm_pool(self):
+        # =============================================================================
+        #  🎉 补充预热池()
+        #
+        #  🎨 代码用途:
+        #      在后台逐个创建空白上下文和页面，直到总数达到 CONTEXT_POOL_SIZE。
+        #
+        #  💡 易懂解释:
+        #      慢慢把空窗口补满，不打扰正在干活的朋友！
+        #
+        #  ⚠️ 警告:
+        #      [失败处理]: 创建失败时停止本轮补货，等待下次领取或崩溃重启后再触发。
+        #      [0 号槽位]: 从不在 0 号进程 (端口 9222) 上预热，避免空白页成为 Rust CDPstream 附着的第一个页面；单进程时预热实际关闭。
+        #      [崩溃重启]: 可预热的进程全部崩溃时先重启一个再补货 (分配时崩溃槽位排在最后，不会被顺带重启)。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "_schedule_refill" -> _refill_warm_pool
+        # =============================================================================
+        while sum(len(s["warm"]) for s in self.pool) < CONTEXT_POOL_SIZE: # 🚦 预热不足
+            alive = [s for s in self.pool if s["browser"] is not None and self._warmable(s)] # 🔍 存活且可预热的槽位
+            if not alive: # 🚦 可预热的进程都已崩溃
+                dead = next((s for s in self.pool if self._warmable(s)), None) # 🎯 第一个可预热槽位
+                if dead is None: return # 🛑 无可用浏览器
+                try:
+                    async with self.lock: # 🔒 与分配互斥
+                        if dead["browser"] is None: # 🚦 仍未被重启
+                            print(f"♻️ [Playwright] 重启浏览器 #{dead['index']} (预热)") # 📢 打印日志
+                            await self._launch_browser(dead) # 🚀 重新启动
+                except Exception as e: # 🚨 启动失败
+                    print(f"❌ [Playwright] 预热失败: {e}") # 📢 打印错误
+                    return # 🛑 停止补货
+                continue # 🔄 重新挑选
+            slot = min(alive, key=lambda s: (len(s["warm"]), self._score(s))) # 🎯 最缺货槽位
+            browser = slot["browser"] # 🌐 目标浏览器
+            try:
+                context = await browser.new_context(**self._context_options()) # 🌐 创建空白上下文
+                page = await context.new_page() # 📄 创建页面
+            except Exception as e: # 🚨 创建失败
+                print(f"❌ [Playwright] 预热失败: {e}") # 📢 打印错误
+                return # 🛑 停止补货
+            if slot["browser"] is not browser: # 💥 期间浏览器已崩溃
+                continue # 🔄 重新挑选
+            slot["warm"].append((context, page)) # 🔥 放入预热池
+            self.warm_stats["created"] += 1 # 📈 预热计数
+
+    def _warmable(self, slot):
+        return slot["index"] != 0 # 🔥 跳过 0 号 (CDP 端口 9222)
+
+    async def _claim_warm(self, slot, state_path):
+        # =============================================================================
+        #  🎉 领取预热上下文 (槽位，状态文件路径)
+        #
+        #  🎨 代码用途:
+        #      从槽位取出空白上下文，并补写用户的 Cookies 与 localStorage。
+        #
+        #  💡 易懂解释:
+        #      拿一台现成的空电脑，把朋友的登录信息装进去！
+        #
+        #  ⚠️ 警告:
+        #      [localStorage]: 通过 init script 在对应源首次加载时写入，不覆盖已有值。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "get_or_create_session" -> _claim_warm
+        # =============================================================================
+        self._schedule_refill() # 🔄 后台补货
+        if not self._warmable(slot): return None # 🛑 该槽位不预热 (不计未命中)
+        if not slot["warm"]: # 🚦 预热池为空
+            self.warm_stats["misses"] += 1 # 📈 未命中计数
+            return None # 🔙 走冷启动
+        context, page = slot["warm"].pop() # 🔥 取出预热
+        self.warm_stats["claims"] += 1 # 📈 命中计数
+        if os.path.exists(state_path): # 🚦 存在历史状态
+            try:
+                with open(state_path, "r", encoding="utf-8") as f: state = json.load(f) # 📖 读取状态
+                if state.get("cookies"): await context.add_cookies(state["cookies"]) # 🍪 写入 Cookies
+                origins = {o["origin"]: [[i["name"], i["value"]] for i in o.get("localStorage", [])] for o in state.get("origins", [])} # 🗂️ 按源整理
+                if origins: # 🚦 存在 localStorage
+                    await context.add_init_script(
+                        "(() => { const items = (%s)[location.origin]; if (!items) return;"
+                        " for (const [k, v] of items) { try { if (localStorage.getItem(k) === null) localStorage.setItem(k, v); } catch (e) {} } })();"
+                        % json.dumps(origins)
+                    ) # 💉 注入 localStorage
+            except Exception as e: # 🚨 状态损坏
+                print(f"⚠️ [Playwright] 状态恢复失败: {e}") # 📢 打印警告
+        return context, page # 🔙 返回上下文
+
+    def _score(self, slot):
+        # =============================================================================
+        #  🎉 负载评分 (槽位)
+        #
+        #  🎨 代码用途:
+        #      上下文数量 + 截图延迟折算值，分数越低越空闲。
+        #
+        #  💡 易懂解释:
+        #      看看这台电脑有多忙！
+        #
+        #  ⚠️ 警告:
+        #      [权重]: BROWSER_LATENCY_WEIGHT_MS 毫秒延迟约等于一个上下文的负担。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "Placement" -> _score
+        # =============================================================================
+        return slot["contexts"] + slot["latency_ms"] / BROWSER_LATENCY_WEIGHT_MS # ⚖️ 综合负载
+
+    async def _acquire_slot(self):
+        # =============================================================================
+        #  🎉 分配浏览器槽位()
+        #
+        #  🎨 代码用途:
+        #      选出负载最低的槽位，必要时重启已崩溃的进程，并预占一个上下文名额。
+        #
+        #  💡 易懂解释:
+        #      找一台最空的电脑给新朋友用！
+        #
+        #  ⚠️ 警告:
+        #      [预占]: 调用方创建上下文失败时必须归还名额 (contexts -= 1)。
+        #      [预热]: 重启崩溃进程后重新安排补货，否则要等下次领取才会补。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "Session Create" -> _acquire_slot
+        # =============================================================================
+        if not self.pool: # 🚦 检查进程池
+            await self.start_global_browser() # 🚀 启动浏览器
+        async with self.lock: # 🔒 加锁
+            slot = min(self.pool, key=lambda s: (s["browser"] is None, self._score(s))) # 🎯 最空闲槽位
+            if slot["browser"] is None: # 💥 进程已崩溃
+                print(f"♻️ [Playwright] 重启浏览器 #{slot['index']}") # 📢 打印日志
+                await self._launch_browser(slot) # 🚀 重新启动
+                self._schedule_refill() # 🔥 补回崩溃丢失的预热
+            slot["contexts"] += 1 # 📈 预占名额
+            return slot # 🔙 返回槽位
+
+    def get_pool_stats(self):
+        # =============================================================================
+        #  🎉 获取进程池统计()
+        #
+        #  🎨 代码用途:
+        #      导出每个 Chromium 进程的上下文数、延迟和崩溃次数。
+        #
+        #  💡 易懂解释:
+        #      看看每台电脑坐了几个人、跑得快不快！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/browser/stats" -> get_pool_stats
+        # =============================================================================
+        return [{
+            "index": slot["index"], # 🔢 槽位序号
+            "port": slot["port"], # 🔌 调试端口
+            "alive": slot["browser"] is not None, # 💓 存活状态
+            "contexts": slot["contexts"], # 🧮 上下文数量
+            "latency_ms": round(slot["latency_ms"], 1), # ⏱️ 截图延迟均值
+            "screenshots": slot["screenshots"], # 📸 截图次数
+            "crashes": slot["crashes"], # 💥 崩溃次数
+            "warm": len(slot["warm"]), # 🔥 预热数量
+            "score": round(self._score(slot), 3), # ⚖️ 负载评分
+        } for slot in self.pool] # 📦 统计列表
 
     async def get_or_create_session(self, user_id: str):
         # =============================================================================
         #  🎉 获取或创建会话 (用户ID)
         #
         #  🎨 代码用途:
-        #      获取或创建用户会话。
+        #      获取或创建用户会话，新会话放置在负载最低的浏览器进程上。
         #
         #  💡 易懂解释:
         #      给新来的朋友开一台电脑，准备好环境！
         #
         #  ⚠️ 警告:
         #      [状态加载]: 会加载用户的 storage_state (Cookies 等)。
+        #      [并发创建]: 部分接口不经过调度器，同一用户的并发请求在用户锁内重新检查，只创建一个上下文。
         #
         #  ⚙️ 触发源:
         #      Through Brain/Main.py "User Request" -> get_or_create_session
         # =============================================================================
-        if not self.browser: # 🚦 检查浏览器
-            await self.start_global_browser() # 🚀 启动浏览器
+        session = self._touch(user_id) # 🔍 现有会话
+        if session: return session # 🔙 返回现有会话
+        async with self.user_locks.setdefault(user_id, asyncio.Lock()): # 🔒 同一用户串行创建
+            session = self._touch(user_id) # 🔍 等锁期间可能已被创建
+            if session: return session # 🔙 返回现有会话
+            return await self._create_session(user_id) # 🆕 创建会话
 
-        if user_id in self.sessions: # 🚦 检查会话
-            return self.sessions[user_id] # 🔙 返回现有会话
+    def _touch(self, user_id):
+        session = self.sessions.get(user_id) # 🗂️ 现有会话
+        if session: # 🚦 存在
+            session["last_used"] = time.monotonic() # ⏱️ 刷新活跃时间
+            self.sessions.move_to_end(user_id) # 🔝 移到 LRU 尾部
+        return session # 🔙 返回会话 (或 None)
 
-        print(f"🆕 [Playwright] 创建会话: {user_id}") # 📢 打印日志
+    async def _create_session(self, user_id):
+        # =============================================================================
+        #  🎉 创建会话 (用户ID)
+        #
+        #  🎨 代码用途:
+        #      腾出存活名额、分配浏览器、创建或领取上下文，挂载监听后登记会话并按休眠快照恢复。
+        #
+        #  💡 易懂解释:
+        #      真正动手开电脑的地方！
+        #
+        #  ⚠️ 警告:
+        #      [用户锁]: 调用方必须持有该用户的 user_locks 锁。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "get_or_create_session" -> _create_session
+        # =============================================================================
+        start_t = time.perf_counter() # ⏱️ 记录开始
+        while len(self.sessions) >= SESSION_MAX_LIVE: # 🚦 超出存活上限
+            victim = next((uid for uid in self.sessions if not angel_scheduler.is_busy(uid)), None) # 🎯 最久未用且空闲
+            if victim is None: break # 🛑 全部忙碌
+            await self.hibernate_session(victim) # 💤 休眠
+        slot = await self._acquire_slot() # 🎯 分配浏览器
+        print(f"🆕 [Playwright] 创建会话: {user_id} -> 浏览器 #{slot['index']}") # 📢 打印日志
         user_dir = os.path.join(USER_DATA_DIR, user_id) # 📂 用户目录
         os.makedirs(user_dir, exist_ok=True) # 📁 创建目录
         state_path = os.path.join(user_dir, "state.json") # 📄 状态文件路径
         storage_state = state_path if os.path.exists(state_path) else None # 💾 加载状态
 
-        context = await self.browser.new_context(
-            viewport=VIEWPORT, # 📏 视口大小
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36", # 🕵️ UA
-            locale="zh-CN", # 🇨🇳 语言
-            storage_state=storage_state # 💾 状态
-        ) # 🌐 创建上下文
-
-        page = await context.new_page() # 📄 创建页面
+        try:
+            warm = await self._claim_warm(slot, state_path) # 🔥 尝试领取预热
+            if warm: # 🚦 命中预热
+                context, page = warm # 📦 预热上下文
+            else:
+                context = await slot["browser"].new_context(**self._context_options(storage_state)) # 🌐 创建上下文
+                page = await context.new_page() # 📄 创建页面
+        except Exception: # 🚨 创建失败
+            slot["contexts"] = max(0, slot["contexts"] - 1) # 🔙 归还名额
+            raise # 📤 继续抛出
         
         # ✅ Patchright 已自动隐藏 webdriver 和其他自动化特征
         # 无需手动注入脚本或使用 stealth 插件
@@ -324,8 +1027,20 @@ class BrowserManager:
         # except: pass # 🤐 忽略错误
 
         # 📡 流量监听
-        page.on("response", lambda r: global_net_cost.track_browser(rx=int(r.headers.get('content-length', 0) or 0))) # 📥 监听响应流量
-        page.on("request", lambda r: global_net_cost.track_browser(tx=len(r.url))) # 📤 监听请求流量
+        meter = CdpByteMeter(user_id) if NET_ACCOUNTING == "cdp" else None # 🔌 CDP 字节计量器
+        if meter and not await meter.attach(page): meter = None # 🔙 挂载失败回退到响应头计量
+        if meter is None: # 🚦 响应头计量 (近似)
+            def on_response(r):
+                if CACHE_HIT_HEADER in r.headers: return # 🛑 缓存路由已自行计量
+                size = int(r.headers.get('content-length', 0) or 0) # 📏 响应大小
+                global_session_cost.track_browser(user_id, rx=size) # 📥 记录响应流量 (按用户)
+                global_size_model.observe(r.request.resource_type, size) # 📊 更新类型平均大小
+                global_traffic.add(r.request.resource_type, urlsplit(r.url).hostname or "", rx=size) # 🗂️ 分类汇总
+            def on_request(r):
+                global_session_cost.track_browser(user_id, tx=len(r.url)) # 📤 记录请求流量 (按用户)
+                global_traffic.add(r.resource_type, urlsplit(r.url).hostname or "", tx=len(r.url), requests=1) # 🗂️ 分类汇总
+            page.on("response", on_response) # 📥 监听响应流量
+            page.on("request", on_request) # 📤 监听请求流量
 
         # 💾 自动保存
         async def save_state():
@@ -339,33 +1054,266 @@ class BrowserManager:
         session = {
             "context": context, # 🌐 上下文
             "page": page, # 📄 页面
-            "eye": ScreenshotTool(page), # 👁️ 截图工具
+            "eye": ScreenshotTool(page, slot), # 👁️ 截图工具
             "hand": MouseController(page), # ✋ 鼠标控制器
-            "save_state": save_state # 💾 保存函数
+            "slot": slot, # 🖥️ 所属浏览器
+            "save_state": save_state, # 💾 保存函数
+            "meter": meter, # 🔌 CDP 字节计量器 (响应头计量时为 None)
+            "last_used": time.monotonic() # ⏱️ 最近活跃
         } # 📦 会话对象
         self.sessions[user_id] = session # 🗂️ 存储会话
+        await self._ensure_route(user_id, session) # 🚫 挂载请求拦截
+        if SCREENCAST_ENABLED: await session["eye"].start_screencast() # 🎥 开启截屏流
+
+        snapshot = self.hibernated.pop(user_id, None) # 💤 休眠快照
+        if snapshot: # 🚦 需要恢复
+            if snapshot["url"] and snapshot["url"] != "about:blank": # 🚦 有效地址
+                try: await page.goto(snapshot["url"], timeout=15000) # 🔗 回到原页面
+                except: pass # 🤐 忽略错误
+            self.hibernate_stats["restores"] += 1 # 📈 恢复计数
+            self.hibernate_stats["restore_ms"] += (time.perf_counter() - start_t) * 1000 # ⏱️ 恢复耗时
+            print(f"🌅 [Playwright] 会话恢复: {user_id}") # 📢 打印日志
         return session # 🔙 返回会话
 
+    async def _ensure_route(self, user_id, session):
+        # =============================================================================
+        #  🎉 挂载请求路由 (用户ID，会话)
+        #
+        #  🎨 代码用途:
+        #      仅在存在生效的拦截策略或开启共享缓存时为上下文注册路由，避免无谓的逐请求 IPC 开销。
+        #
+        #  💡 易懂解释:
+        #      需要拦东西的时候才派门卫站岗！
+        #
+        #  ⚠️ 警告:
+        #      [一次性]: 每个上下文只注册一次，之后策略变化由处理函数动态读取。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "get_or_create_session / set_request_policy" -> _ensure_route
+        # =============================================================================
+        if session.get("routed"): return # 🛑 已挂载
+        if not (global_http_cache.enabled or self.policies.get(user_id, global_request_policy).active): return # 🛑 无需路由
+        await session["context"].route("**/*", lambda route: self._route_request(user_id, route)) # 🚦 注册路由
+        session["routed"] = True # 🚩 标记已挂载
+
+    async def _route_request(self, user_id, route):
+        # =============================================================================
+        #  🎉 路由请求 (用户ID，路由对象)
+        #
+        #  🎨 代码用途:
+        #      按会话策略 (无则全局策略) 拦截请求，未拦截的静态资源交给共享缓存，其余放行。
+        #
+        #  💡 易懂解释:
+        #      门卫检查：能进就进，不能进就挡住！
+        #
+        #  ⚠️ 警告:
+        #      [页面关闭]: 上下文关闭后 abort/continue 会失败，直接忽略。
+        #
+        #  ⚙️ 触发源:
+        #      Through Patchright "context.route" -> _route_request
+        # =============================================================================
+        request = route.request # 📨 请求对象
+        policy = self.policies.get(user_id, global_request_policy) # 🚫 生效策略
+        try:
+            if policy.should_block(request.resource_type, request.url): # 🚦 命中拦截
+                policy.record_block(request.resource_type) # 📈 记录拦截
+                await route.abort("blockedbyclient") # 🛑 拦截请求
+            elif global_http_cache.eligible(request): # 🚦 可走缓存
+                await self._serve_cached(user_id, route, request) # 📦 缓存处理
+            else:
+                await route.continue_() # ✅ 放行请求
+        except: pass # 🤐 忽略错误
+
+    async def _serve_cached(self, user_id, route, request):
+        # =============================================================================
+        #  🎉 缓存处理 (用户ID，路由对象，请求)
+        #
+        #  🎨 代码用途:
+        #      命中则直接用磁盘内容 fulfill；未命中则 route.fetch 下载、回放给页面，
+        #      并在后台写入缓存。
+        #
+        #  💡 易懂解释:
+        #      仓库有就直接给，没有就去下载一份，顺便存起来！
+        #
+        #  ⚠️ 警告:
+        #      [流量计量]: 经此路由的响应带 x-angel-cache 头，rx 在这里按正文长度计量，命中不计。
+        #      [失败回退]: 下载失败时退回 route.continue_ 交给浏览器自己处理。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "_route_request" -> _serve_cached
+        # =============================================================================
+        cached = await global_http_cache.lookup(request.url) # 🔍 查缓存
+        if cached: # 🚦 命中
+            status, headers, body = cached # 📦 缓存内容
+            await route.fulfill(status=status, headers={**headers, CACHE_HIT_HEADER: "hit"}, body=body) # ⚡ 直接回放
+            return # 🔙 完成
+        try: response = await route.fetch() # 🌐 实际下载
+        except Exception: # 🚨 下载失败
+            await route.continue_() # 🔙 交还浏览器
+            return # 🔙 完成
+        body = await response.body() # 📦 解压后的正文
+        global_session_cost.track_browser(user_id, rx=len(body)) # 📥 记录响应流量 (按用户)
+        global_traffic.add(request.resource_type, urlsplit(request.url).hostname or "", rx=len(body)) # 🗂️ 分类汇总
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in HOP_HEADERS} # 📋 回放头
+        headers[CACHE_HIT_HEADER] = "miss" # 🏷️ 未命中标记
+        await route.fulfill(status=response.status, headers=headers, body=body) # 📤 回放给页面
+        asyncio.create_task(global_http_cache.store(request.url, response.status, response.headers, body)) # 💾 后台写入
+
+    async def set_request_policy(self, user_id, policy):
+        # =============================================================================
+        #  🎉 设置会话拦截策略 (用户ID，策略)
+        #
+        #  🎨 代码用途:
+        #      为用户设置覆盖全局的拦截策略 (None 表示恢复全局)，并按需挂载路由。
+        #
+        #  💡 易懂解释:
+        #      给这位朋友换一张专属的拦截名单！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/session/policy" -> set_request_policy
+        # =============================================================================
+        if policy is None: self.policies.pop(user_id, None) # 🔙 恢复全局
+        else: self.policies[user_id] = policy # 🚫 覆盖策略
+        if user_id in self.sessions: await self._ensure_route(user_id, self.sessions[user_id]) # 🚦 按需挂载
+
+    async def hibernate_session(self, user_id: str):
+        # =============================================================================
+        #  🎉 休眠会话 (用户ID)
+        #
+        #  🎨 代码用途:
+        #      保存 storage_state 和当前 URL 快照后关闭上下文，释放渲染进程内存。
+        #
+        #  💡 易懂解释:
+        #      朋友暂时离开，先帮他存好进度，把电脑收起来！
+        #
+        #  ⚠️ 警告:
+        #      [状态丢失]: 页面内存态 (滚动位置、未提交表单) 不会保留。
+        #      [用户锁]: 持有用户锁直到 state.json 落盘、快照写入，期间到达的请求等锁后按快照恢复，不会读到旧状态。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "LRU Cap / Idle Reap" -> hibernate_session
+        # =============================================================================
+        async with self.user_locks.setdefault(user_id, asyncio.Lock()): # 🔒 与创建/关闭互斥
+            session = self.sessions.pop(user_id, None) # 🗑️ 移出存活表
+            if not session: return False # 🛑 会话不存在 (等锁期间已被关闭或休眠)
+            start_t = time.perf_counter() # ⏱️ 记录开始
+            slot = session["slot"] # 🖥️ 所属浏览器
+            slot["contexts"] = max(0, slot["contexts"] - 1) # 🔙 归还名额
+            url = session["page"].url if session["page"] else "" # 🔗 当前地址
+            self.hibernated[user_id] = {"url": url, "since": time.time()} # 💤 先记录快照
+            await session["save_state"]() # 💾 保存状态
+            try: await session["context"].close() # 🚪 关闭上下文
+            except: pass # 🤐 忽略错误
+            self.hibernate_stats["hibernations"] += 1 # 📈 休眠计数
+            self.hibernate_stats["hibernate_ms"] += (time.perf_counter() - start_t) * 1000 # ⏱️ 休眠耗时
+            print(f"💤 [Playwright] 会话休眠: {user_id}") # 📢 打印日志
+            return True # ✅ 休眠完成
+
+    async def evict_idle_sessions(self):
+        # =============================================================================
+        #  🎉 回收空闲会话()
+        #
+        #  🎨 代码用途:
+        #      休眠空闲超过 SESSION_IDLE_TTL_S 的会话，再按 LRU 把存活数压到上限以内。
+        #
+        #  💡 易懂解释:
+        #      巡视一圈，把很久没人用的电脑收起来！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Energy/Tasks.py "session_reaper_loop" -> evict_idle_sessions
+        # =============================================================================
+        now = time.monotonic() # ⏱️ 当前时间
+        idle = [uid for uid, s in self.sessions.items() if now - s["last_used"] > SESSION_IDLE_TTL_S and not angel_scheduler.is_busy(uid)] # 🔍 空闲会话
+        for uid in idle: await self.hibernate_session(uid) # 💤 逐个休眠
+        count = len(idle) # 🧮 休眠数量
+        while len(self.sessions) > SESSION_MAX_LIVE: # 🚦 超出上限
+            victim = next((uid for uid in self.sessions if not angel_scheduler.is_busy(uid)), None) # 🎯 最久未用且空闲
+            if victim is None: break # 🛑 全部忙碌
+            await self.hibernate_session(victim) # 💤 休眠
+            count += 1 # 📈 累加数量
+        return count # 🔙 返回数量
+
+    def get_warm_stats(self):
+        # =============================================================================
+        #  🎉 获取预热统计()
+        #
+        #  🎨 代码用途:
+        #      导出预热池目标容量、当前库存与命中/未命中次数。
+        #
+        #  💡 易懂解释:
+        #      看看空窗口够不够用！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/browser/stats" -> get_warm_stats
+        # =============================================================================
+        return {
+            "target": CONTEXT_POOL_SIZE, # 🎯 目标容量
+            "ready": sum(len(s["warm"]) for s in self.pool), # 🔥 当前库存
+            **self.warm_stats, # 📊 命中统计
+        } # 📦 统计结果
+
+    def get_hibernation_stats(self):
+        # =============================================================================
+        #  🎉 获取休眠统计()
+        #
+        #  🎨 代码用途:
+        #      导出休眠/恢复次数与平均耗时，用于按内存调整存活上限。
+        #
+        #  💡 易懂解释:
+        #      看看收起来了几台电脑，恢复得快不快！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/browser/stats" -> get_hibernation_stats
+        # =============================================================================
+        st = self.hibernate_stats # 📊 原始统计
+        return {
+            "live": len(self.sessions), # 🟢 存活会话
+            "hibernated": len(self.hibernated), # 💤 休眠会话
+            "max_live": SESSION_MAX_LIVE, # 🧮 存活上限
+            "idle_ttl_s": SESSION_IDLE_TTL_S, # ⏳ 空闲阈值
+            "hibernations": st["hibernations"], # 📈 休眠次数
+            "restores": st["restores"], # 📈 恢复次数
+            "avg_hibernate_ms": round(st["hibernate_ms"] / st["hibernations"], 1) if st["hibernations"] else 0.0, # ⏱️ 平均休眠耗时
+            "avg_restore_ms": round(st["restore_ms"] / st["restores"], 1) if st["restores"] else 0.0, # ⏱️ 平均恢复耗时
+        } # 📦 统计结果
+
     async def close_session(self, user_id: str):
         # =============================================================================
         #  🎉 关闭会话 (用户ID)
         #
         #  🎨 代码用途:
-        #      关闭用户会话并保存状态。
+        #      关闭用户会话并保存状态，归还所属浏览器的上下文名额。
         #
         #  💡 易懂解释:
         #      下机！把电脑关掉，记得保存进度哦！
         #
         #  ⚠️ 警告:
-        #      无。
+        #      [用户锁]: 与创建共用用户锁，关闭不会与进行中的创建交错。
         #
         #  ⚙️ 触发源:
         #      Through Brain/Main.py "Cleanup" -> close_session
         # =============================================================================
-        if user_id in self.sessions: # 🚦 检查会话
-            session = self.sessions.pop(user_id) # 🗑️ 移除会话
-            await session["save_state"]() # 💾 保存状态
-            await session["context"].close() # 🚪 关闭上下文
-            print(f"👋 [Playwright] 会话关闭: {user_id}") # 📢 打印日志
+        async with self.user_locks.setdefault(user_id, asyncio.Lock()): # 🔒 等待进行中的创建完成
+            self.hibernated.pop(user_id, None) # 🗑️ 清除休眠快照
+            self.policies.pop(user_id, None) # 🗑️ 清除会话策略
+            if user_id in self.sessions: # 🚦 检查会话
+                session = self.sessions.pop(user_id) # 🗑️ 移除会话
+                slot = session["slot"] # 🖥️ 所属浏览器
+                slot["contexts"] = max(0, slot["contexts"] - 1) # 🔙 归还名额
+                await session["save_state"]() # 💾 保存状态
+                await session["context"].close() # 🚪 关闭上下文
+                print(f"👋 [Playwright] 会话关闭: {user_id}") # 📢 打印日志
 
 angel_browser = BrowserManager()
@@ -0,0 +1,224 @@
+# ==========================================================================
+#  📃 文件功能 : 浏览器请求拦截策略
+#  ⚡ 逻辑摘要 : 按资源类型、URL 通配符、域名列表决定是否拦截请求，白名单优先；统计拦截次数与估算节省字节。
+#  💡 易懂解释 : 网页里那些用不上的视频、字体、广告追踪，我们直接不下载，又快又省钱！
+#  🔋 未来扩展 : 支持从远程下发规则，支持按站点自动学习可拦截资源。
+#  📊 当前状态 : 活跃 (更新: 2026-10-17)
+#  🧱 Body/RequestPolicy.py 踩坑记录 (累积，勿覆盖) :
+#     1. [2026-10-17] [待验证] [截图缺图]: 拦截 image 会让截图缺少画面内容。 -> 默认不拦截 image，需显式配置。
+# ==========================================================================
+
+import fnmatch
+import sys
+import os
+from urllib.parse import urlsplit
+
+# 🛠️ 确保能导入 Memory 模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Memory.Config import REQUEST_BLOCK_TYPES, REQUEST_BLOCK_PATTERNS, REQUEST_BLOCK_DOMAINS, REQUEST_ALLOW_DOMAINS
+
+def _match_domain(host, domains):
+    # =============================================================================
+    #  🎉 域名匹配 (主机名，域名集合)
+    #
+    #  🎨 代码用途:
+    #      判断主机名是否等于某个域名或是其子域名。
+    #
+    #  💡 易懂解释:
+    #      看看这个网址是不是名单上的网站！
+    #
+    #  ⚠️ 警告:
+    #      无。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/RequestPolicy.py "should_block" -> _match_domain
+    # =============================================================================
+    while host: # 🔄 逐级剥离子域
+        if host in domains: return True # ✅ 命中
+        _, _, host = host.partition(".") # ✂️ 去掉最左一级
+    return False # ❌ 未命中
+
+class RequestPolicy:
+    # =============================================================================
+    #  🎉 请求拦截策略
+    #
+    #  🎨 代码用途:
+    #      保存一组拦截规则与白名单，并累计拦截计数和估算节省字节。
+    #
+    #  💡 易懂解释:
+    #      一张 "不许进" 名单和一张 "一定放行" 名单！
+    #
+    #  ⚠️ 警告:
+    #      [白名单优先]: 命中 allow_domains 的请求永不拦截。
+    #      [估算]: 被拦截的请求没有真实大小，按同类型已放行响应的平均大小估算。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/Playwright.py "Route Handler" -> RequestPolicy
+    # =============================================================================
+    def __init__(self, block_types=(), block_patterns=(), block_domains=(), allow_domains=()):
+        self.block_types = {t.strip().lower() for t in block_types if t.strip()} # 🚫 拦截资源类型
+        self.block_patterns = [p.strip() for p in block_patterns if p.strip()] # 🚫 拦截 URL 通配符
+        self.block_domains = {d.strip().lower() for d in block_domains if d.strip()} # 🚫 拦截域名
+        self.allow_domains = {d.strip().lower() for d in allow_domains if d.strip()} # ✅ 白名单域名
+        self.blocked = 0 # 📈 拦截次数
+        self.saved_bytes = 0 # 💾 估算节省字节
+        self.blocked_by_type = {} # {resource_type: count} # 📊 分类型拦截
+
+    @classmethod
+    def from_dict(cls, d):
+        # =============================================================================
+        #  🎉 从字典构造 (规则字典)
+        #
+        #  🎨 代码用途:
+        #      把 HTTP 请求体中的规则列表转换为策略对象。
+        #
+        #  💡 易懂解释:
+        #      把名单抄成我们能用的格式！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/session/policy" -> from_dict
+        # =============================================================================
+        return cls(
+            d.get("block_types") or (), # 🚫 资源类型
+            d.get("block_patterns") or (), # 🚫 URL 通配符
+            d.get("block_domains") or (), # 🚫 域名
+            d.get("allow_domains") or (), # ✅ 白名单
+        ) # 📦 策略对象
+
+    @property
+    def active(self):
+        return bool(self.block_types or self.block_patterns or self.block_domains) # 🚦 是否有拦截规则
+
+    def should_block(self, resource_type, url):
+        # =============================================================================
+        #  🎉 是否拦截 (资源类型，URL)
+        #
+        #  🎨 代码用途:
+        #      白名单优先，然后依次检查资源类型、域名和 URL 通配符。
+        #
+        #  💡 易懂解释:
+        #      这个请求能不能放进来？
+        #
+        #  ⚠️ 警告:
+        #      [性能]: 每个请求都会调用，类型与域名检查为集合查找，通配符按列表顺序匹配。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "_route_request" -> should_block
+        # =============================================================================
+        if not self.active: return False # 🛑 无规则
+        host = (urlsplit(url).hostname or "").lower() # 🌐 主机名
+        if self.allow_domains and _match_domain(host, self.allow_domains): return False # ✅ 白名单放行
+        if resource_type in self.block_types: return True # 🚫 类型拦截
+        if self.block_domains and _match_domain(host, self.block_domains): return True # 🚫 域名拦截
+        return any(fnmatch.fnmatchcase(url, p) for p in self.block_patterns) # 🚫 通配符拦截
+
+    def record_block(self, resource_type):
+        # =============================================================================
+        #  🎉 记录拦截 (资源类型)
+        #
+        #  🎨 代码用途:
+        #      累加拦截次数，并按该类型的平均响应大小估算节省字节。
+        #
+        #  💡 易懂解释:
+        #      又帮大家省了一笔流量！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "_route_request" -> record_block
+        # =============================================================================
+        self.blocked += 1 # 📈 拦截计数
+        self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1 # 📊 分类型计数
+        self.saved_bytes += global_size_model.estimate(resource_type) # 💾 估算节省
+
+    def to_dict(self):
+        # =============================================================================
+        #  🎉 导出 (无参数)
+        #
+        #  🎨 代码用途:
+        #      导出规则与统计，用于 HTTP 查询。
+        #
+        #  💡 易懂解释:
+        #      把名单和战绩拿出来看看！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/session/policy" -> to_dict
+        # =============================================================================
+        return {
+            "block_types": sorted(self.block_types), # 🚫 资源类型
+            "block_patterns": list(self.block_patterns), # 🚫 URL 通配符
+            "block_domains": sorted(self.block_domains), # 🚫 域名
+            "allow_domains": sorted(self.allow_domains), # ✅ 白名单
+            "blocked": self.blocked, # 📈 拦截次数
+            "blocked_by_type": dict(self.blocked_by_type), # 📊 分类型拦截
+            "saved_bytes": self.saved_bytes, # 💾 估算节省字节
+        } # 📦 导出结果
+
+class ResourceSizeModel:
+    # =============================================================================
+    #  🎉 资源大小模型
+    #
+    #  🎨 代码用途:
+    #      按资源类型维护已放行响应大小的指数平均，用于估算被拦截请求的体积。
+    #
+    #  💡 易懂解释:
+    #      记住每种文件平时有多大！
+    #
+    #  ⚠️ 警告:
+    #      [冷启动]: 尚无样本的类型使用 DEFAULT_SIZES 兜底。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/Playwright.py "Response Listener" -> ResourceSizeModel
+    # =============================================================================
+    DEFAULT_SIZES = {"image": 30_000, "media": 500_000, "font": 40_000, "script": 50_000, "stylesheet": 20_000} # 📏 默认大小
+
+    def __init__(self):
+        self.avg = {} # {resource_type: avg_bytes} # 📊 平均大小
+
+    def observe(self, resource_type, size):
+        # =============================================================================
+        #  🎉 记录样本 (资源类型，字节数)
+        #
+        #  🎨 代码用途:
+        #      以 0.05 的平滑系数更新该类型的平均响应大小。
+        #
+        #  💡 易懂解释:
+        #      又看到一个文件，记一下它多大！
+        #
+        #  ⚠️ 警告:
+        #      [缺少长度]: content-length 缺失 (0) 的响应不计入。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "on_response" -> observe
+        # =============================================================================
+        if size <= 0: return # 🛑 无有效大小
+        prev = self.avg.get(resource_type) # 📜 历史平均
+        self.avg[resource_type] = size if prev is None else prev + (size - prev) * 0.05 # 📉 指数平均
+
+    def estimate(self, resource_type):
+        # =============================================================================
+        #  🎉 估算大小 (资源类型)
+        #
+        #  🎨 代码用途:
+        #      返回该类型的平均响应大小，无样本时使用默认值。
+        #
+        #  💡 易懂解释:
+        #      猜猜这个没下载的文件有多大！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/RequestPolicy.py "record_block" -> estimate
+        # =============================================================================
+        return int(self.avg.get(resource_type, self.DEFAULT_SIZES.get(resource_type, 5_000))) # 📏 估算大小
+
+global_size_model = ResourceSizeModel()
+global_request_policy = RequestPolicy(REQUEST_BLOCK_TYPES, REQUEST_BLOCK_PATTERNS, REQUEST_BLOCK_DOMAINS, REQUEST_ALLOW_DOMAINS)
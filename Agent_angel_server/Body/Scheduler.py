@@ -0,0 +1,304 @@
+# ==========================================================================
+#  📃 文件功能 : 浏览器操作调度器
+#  ⚡ 逻辑摘要 : 每个会话一条有界队列 (串行执行)，全局按权重的步长调度 (stride scheduling) 限制并发浏览器操作数。
+#  💡 易懂解释 : 大家排好队，一个人一次只做一件事，每个人轮流使用浏览器，谁也不会被饿着。
+#  🔋 未来扩展 : 支持按任务优先级动态调整权重，支持跨进程调度。
+#  📊 当前状态 : 活跃 (更新: 2026-10-17)
+#  🧱 Body/Scheduler.py 踩坑记录 (累积，勿覆盖) :
+#     1. [2026-10-17] [已修复] [动作交错]: 同一用户并发 /action/execute 会交错鼠标键盘事件。 -> 引入会话级串行队列。
+# ==========================================================================
+
+import asyncio
+import time
+import sys
+import os
+from collections import deque
+
+# 🛠️ 确保能导入 Memory 模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Memory.Config import BROWSER_MAX_CONCURRENT_OPS, SESSION_QUEUE_DEPTH
+
+STRIDE_BASE = 1_000_000.0 # 📏 步长基数 (除以权重得到步长)
+
+class QueueFullError(Exception):
+    # =============================================================================
+    #  🎉 队列已满异常
+    #
+    #  🎨 代码用途:
+    #      会话排队数达到 SESSION_QUEUE_DEPTH 时抛出，用于向调用方施加背压。
+    #
+    #  💡 易懂解释:
+    #      排队的人太多啦，请稍后再来！
+    #
+    #  ⚠️ 警告:
+    #      HTTP 层应转换为 429。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/Scheduler.py "run" -> QueueFullError
+    # =============================================================================
+    pass
+
+class FairScheduler:
+    # =============================================================================
+    #  🎉 公平调度器
+    #
+    #  🎨 代码用途:
+    #      会话内严格串行，会话间按权重步长调度，全局最多 max_concurrent 个操作同时运行。
+    #
+    #  💡 易懂解释:
+    #      每个人一次只能用一台机器，空出来的机器轮到用得最少的人！
+    #
+    #  ⚠️ 警告:
+    #      [单事件循环]: 仅在 asyncio 事件循环线程内使用，非线程安全。
+    #
+    #  ⚙️ 触发源:
+    #      Through Memory/Interface.py "Browser Endpoints" -> FairScheduler
+    # =============================================================================
+    def __init__(self, max_concurrent=BROWSER_MAX_CONCURRENT_OPS, max_depth=SESSION_QUEUE_DEPTH):
+        self.max_concurrent = max(1, max_concurrent) # 🧮 全局并发上限
+        self.max_depth = max(1, max_depth) # 🧮 会话队列深度
+        self.running = 0 # 🏃 运行中操作数
+        self.queues = {} # {user_id: deque[Future]} # 🗂️ 会话等待队列
+        self.active = set() # 🟢 正在执行的会话
+        self.weights = {} # {user_id: weight} # ⚖️ 会话权重
+        self.passes = {} # {user_id: pass} # 📏 步长进度
+        self.stats = {"ops": 0, "rejected": 0, "wait_ms": 0.0, "exec_ms": 0.0, "max_wait_ms": 0.0} # 📊 全局统计
+        self.user_stats = {} # {user_id: {ops, wait_ms, exec_ms}} # 📊 会话统计
+
+    def set_weight(self, user_id, weight):
+        # =============================================================================
+        #  🎉 设置权重 (用户ID，权重)
+        #
+        #  🎨 代码用途:
+        #      调整会话的调度权重，权重越大分到的并发份额越多。
+        #
+        #  💡 易懂解释:
+        #      给这位朋友多 (或少) 一点使用机会！
+        #
+        #  ⚠️ 警告:
+        #      [下限]: 权重最小 0.01，避免除零。
+        #
+        #  ⚙️ 触发源:
+        #      External Call -> set_weight
+        # =============================================================================
+        self.weights[user_id] = max(0.01, float(weight)) # ⚖️ 更新权重
+
+    def is_busy(self, user_id):
+        # =============================================================================
+        #  🎉 是否忙碌 (用户ID)
+        #
+        #  🎨 代码用途:
+        #      判断会话是否有执行中或排队中的操作。
+        #
+        #  💡 易懂解释:
+        #      这位朋友还在忙吗？
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "Hibernation" -> is_busy
+        # =============================================================================
+        return user_id in self.active or bool(self.queues.get(user_id)) # 🚦 忙碌判定
+
+    def _dispatch(self):
+        # =============================================================================
+        #  🎉 派发()
+        #
+        #  🎨 代码用途:
+        #      在并发名额内，挑选步长进度最小且空闲的会话，唤醒其队首请求。
+        #
+        #  💡 易懂解释:
+        #      有空位了，叫下一位！
+        #
+        #  ⚠️ 警告:
+        #      [取消]: 已取消的等待者通常已由 _discard 移出，残留的直接丢弃。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Scheduler.py "run / _release" -> _dispatch
+        # =============================================================================
+        while self.running < self.max_concurrent: # 🚦 仍有名额
+            ready = [uid for uid, q in self.queues.items() if q and uid not in self.active] # 🔍 可派发会话
+            if not ready: return # 🛑 无人等待
+            uid = min(ready, key=lambda u: self.passes.get(u, 0.0)) # 🎯 进度最小者
+            fut = self.queues[uid].popleft() # 📤 队首请求
+            if not self.queues[uid]: del self.queues[uid] # 🧹 清理空队列
+            if fut.done(): continue # 🗑️ 已取消
+            self.running += 1 # 📈 占用名额
+            self.active.add(uid) # 🟢 标记执行
+            self.passes[uid] = self.passes.get(uid, 0.0) + STRIDE_BASE / self.weights.get(uid, 1.0) # 📏 推进进度
+            fut.set_result(None) # 🔔 唤醒请求
+
+    def _discard(self, user_id, fut):
+        # =============================================================================
+        #  🎉 作废排队 (用户ID，排队凭证)
+        #
+        #  🎨 代码用途:
+        #      取消凭证并立即移出会话队列，空队列一并删除。
+        #
+        #  💡 易懂解释:
+        #      不排了就离开队伍，别占着位置！
+        #
+        #  ⚠️ 警告:
+        #      [立即移除]: 否则已取消的请求会一直计入队列深度与 is_busy，
+        #                  断开的客户端可能让该用户收到 429 或推迟休眠，直到派发轮到它。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Scheduler.py "run (Cancelled)" -> _discard
+        # =============================================================================
+        fut.cancel() # 🗑️ 作废凭证
+        queue = self.queues.get(user_id) # 🗂️ 会话队列
+        if queue is None: return # 🛑 已被派发清理
+        try: queue.remove(fut) # 📤 移出队列
+        except ValueError: pass # 🛑 已被派发取出
+        if not queue: del self.queues[user_id] # 🧹 清理空队列
+
+    def _release(self, user_id):
+        # =============================================================================
+        #  🎉 释放名额 (用户ID)
+        #
+        #  🎨 代码用途:
+        #      归还全局并发名额并解除会话执行标记，然后继续派发。
+        #
+        #  💡 易懂解释:
+        #      做完啦，把位置让给下一位！
+        #
+        #  ⚠️ 警告:
+        #      [配对]: 每次成功派发必须且只能释放一次。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Scheduler.py "run" -> _release
+        # =============================================================================
+        self.running -= 1 # 📉 归还名额
+        self.active.discard(user_id) # ⚪ 取消执行标记
+        self._dispatch() # 🔄 派发下一位
+
+    async def run(self, user_id, fn):
+        # =============================================================================
+        #  🎉 调度执行 (用户ID，异步函数)
+        #
+        #  🎨 代码用途:
+        #      排队等待名额后执行 fn()，返回 (结果, 排队毫秒, 执行毫秒)。
+        #
+        #  💡 易懂解释:
+        #      排队 -> 轮到你 -> 干活 -> 让位！
+        #
+        #  ⚠️ 警告:
+        #      [背压]: 队列满时立即抛出 QueueFullError。
+        #      [新会话]: 空闲会话重新排队时进度对齐到当前竞争者的最小进度，避免攒下的份额突发抢占。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "Browser Endpoints" -> run
+        # =============================================================================
+        queue = self.queues.get(user_id) # 🗂️ 会话队列
+        depth = (len(queue) if queue else 0) + (1 if user_id in self.active else 0) # 🧮 当前深度
+        if depth >= self.max_depth: # 🚦 队列已满
+            self.stats["rejected"] += 1 # 📈 拒绝计数
+            raise QueueFullError(f"session {user_id} queue full ({depth})") # 🛑 背压
+        if not self.is_busy(user_id): # 🆕 会话重新加入竞争
+            floor = min((self.passes[u] for u in self.active | self.queues.keys() if u in self.passes), default=self.passes.get(user_id, 0.0)) # 📏 当前竞争者最小进度
+            self.passes[user_id] = max(self.passes.get(user_id, floor), floor) # 📏 对齐进度
+        fut = asyncio.get_running_loop().create_future() # 🎫 排队凭证
+        self.queues.setdefault(user_id, deque()).append(fut) # 📥 入队
+        enqueue_t = time.perf_counter() # ⏱️ 入队时间
+        self._dispatch() # 🔄 尝试派发
+        try:
+            await fut # ⏳ 等待名额
+        except asyncio.CancelledError: # 🚨 调用方取消
+            if fut.done() and not fut.cancelled(): self._release(user_id) # 🔙 已获名额则归还
+            else: self._discard(user_id, fut) # 🗑️ 作废凭证并移出队列
+            raise # 📤 继续抛出
+        wait_ms = (time.perf_counter() - enqueue_t) * 1000 # ⏱️ 排队耗时
+        start_t = time.perf_counter() # ⏱️ 执行开始
+        try:
+            result = await fn() # 🏃 执行操作
+        finally:
+            exec_ms = (time.perf_counter() - start_t) * 1000 # ⏱️ 执行耗时
+            self._release(user_id) # 🔙 归还名额
+            self._record(user_id, wait_ms, exec_ms) # 📊 记录统计
+        return result, wait_ms, exec_ms # 📤 返回结果
+
+    def _record(self, user_id, wait_ms, exec_ms):
+        # =============================================================================
+        #  🎉 记录耗时 (用户ID，排队毫秒，执行毫秒)
+        #
+        #  🎨 代码用途:
+        #      分别累计全局与会话级的排队耗时和执行耗时。
+        #
+        #  💡 易懂解释:
+        #      记下这次排了多久、干了多久！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Scheduler.py "run" -> _record
+        # =============================================================================
+        st = self.stats # 📊 全局统计
+        st["ops"] += 1 # 📈 操作计数
+        st["wait_ms"] += wait_ms # ⏱️ 累计排队
+        st["exec_ms"] += exec_ms # ⏱️ 累计执行
+        st["max_wait_ms"] = max(st["max_wait_ms"], wait_ms) # 🔝 最大排队
+        us = self.user_stats.setdefault(user_id, {"ops": 0, "wait_ms": 0.0, "exec_ms": 0.0}) # 📊 会话统计
+        us["ops"] += 1 # 📈 操作计数
+        us["wait_ms"] += wait_ms # ⏱️ 累计排队
+        us["exec_ms"] += exec_ms # ⏱️ 累计执行
+
+    def forget(self, user_id):
+        # =============================================================================
+        #  🎉 遗忘会话 (用户ID)
+        #
+        #  🎨 代码用途:
+        #      会话关闭后清理权重、进度和统计，防止字典无限增长。
+        #
+        #  💡 易懂解释:
+        #      朋友走了，把他的排队记录擦掉！
+        #
+        #  ⚠️ 警告:
+        #      [忙碌]: 仍有排队或执行中的操作时不清理。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/session/close" -> forget
+        # =============================================================================
+        if self.is_busy(user_id): return # 🛑 仍在使用
+        self.passes.pop(user_id, None) # 🧹 清理进度
+        self.weights.pop(user_id, None) # 🧹 清理权重
+        self.user_stats.pop(user_id, None) # 🧹 清理统计
+
+    def get_stats(self):
+        # =============================================================================
+        #  🎉 获取调度统计()
+        #
+        #  🎨 代码用途:
+        #      导出并发占用、排队深度，以及分开统计的排队耗时与执行耗时。
+        #
+        #  💡 易懂解释:
+        #      看看大家排了多久、干了多久！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/scheduler/stats" -> get_stats
+        # =============================================================================
+        st = self.stats # 📊 全局统计
+        ops = st["ops"] or 1 # 🧮 防止除零
+        return {
+            "max_concurrent": self.max_concurrent, # 🧮 并发上限
+            "running": self.running, # 🏃 运行中
+            "queued": sum(len(q) for q in self.queues.values()), # 📥 排队中
+            "ops": st["ops"], # 📈 已完成
+            "rejected": st["rejected"], # 🚫 已拒绝
+            "avg_wait_ms": round(st["wait_ms"] / ops, 1), # ⏱️ 平均排队
+            "max_wait_ms": round(st["max_wait_ms"], 1), # 🔝 最大排队
+            "avg_exec_ms": round(st["exec_ms"] / ops, 1), # ⏱️ 平均执行
+            "sessions": {uid: {
+                "ops": us["ops"], # 📈 已完成
+                "queued": len(self.queues.get(uid, ())), # 📥 排队中
+                "weight": self.weights.get(uid, 1.0), # ⚖️ 权重
+                "avg_wait_ms": round(us["wait_ms"] / (us["ops"] or 1), 1), # ⏱️ 平均排队
+                "avg_exec_ms": round(us["exec_ms"] / (us["ops"] or 1), 1), # ⏱️ 平均执行
+            } for uid, us in self.user_stats.items()}, # 📦 会话明细
+        } # 📦 统计结果
+
+angel_scheduler = FairScheduler()
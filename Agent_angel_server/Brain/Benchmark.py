@@ -0,0 +1,424 @@
+# ==========================================================================
+#  📃 文件功能 : 智能体决策循环基准测试
+#  ⚡ 逻辑摘要 : 本地启动模拟 generateContent 服务 (可配延迟、脚本动作、429 注入、usageMetadata) 和静态假站点，
+#               N 个并发用户通过 BrowserManager / ScreenshotTool / MouseController / GeminiClient 跑完整的
+#               截图 -> 预处理 -> 规划 -> 执行 循环，输出吞吐量、步骤延迟分位数和分阶段耗时 (JSON)。
+#  💡 易懂解释 : 不花一分钱、不访问真网站，在家里搭个假考场，看看机器人一分钟能做几道题！
+#  🔋 未来扩展 : 支持录制真实响应回放，支持与上一次报告自动对比并标出退化。
+#  📊 当前状态 : 活跃 (更新: 2026-10-17)
+#  🧱 Brain/Benchmark.py 踩坑记录 (累积，勿覆盖) :
+#     1. [2026-10-17] [已修复] [配置时机]: Config 在导入时读取环境变量。 -> 先起模拟服务、写好环境变量，再导入项目模块。
+#
+#  用法:
+#     python Brain/Benchmark.py --users 8 --steps 20 --latency-ms 400 --throttle-rate 0.05 --out bench.json
+# ==========================================================================
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import shutil
+import sys
+import time
+
+from aiohttp import web
+
+# 🛠️ 确保能导入同级模块 (Body, Memory, Energy)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # 📂 添加父目录
+
+BUTTON_Y = 0.347 # 📐 假页面主按钮中心 (视口比例，对应 1280x720)
+INPUT_Y = 0.5 # 📐 假页面输入框中心
+DEFAULT_SCRIPT = [
+    {"action": "click", "reason": "press the main button", "confidence": 0.95, "params": {"x": 0.5, "y": BUTTON_Y, "element": "button"}},
+    {"action": "click", "reason": "focus the search box", "confidence": 0.95, "params": {"x": 0.5, "y": INPUT_Y, "element": "text"}},
+    {"action": "type", "reason": "enter the query", "confidence": 0.95, "params": {"text": "angel benchmark"}},
+    {"action": "scroll", "reason": "read further", "confidence": 0.95, "params": {"delta_y": 600}},
+    {"action": "navigate", "reason": "open the next page", "confidence": 0.95, "params": {"url": "{next_url}"}},
+] # 📜 默认脚本 (element 填角色名，元素模式下替换为序号；{next_url} 替换为下一页)
+
+PAGE_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Angel Bench {n}</title>
+<link rel="stylesheet" href="/asset/site.css"></head>
+<body>
+<nav><a href="/page/{prev}">Previous</a> <a href="/page/{next}">Next</a></nav>
+<h1>Fake page {n}</h1>
+<button id="go" onclick="this.textContent='Clicked ' + (++window.clicks || (window.clicks = 1))">Start task</button>
+<input id="q" type="text" placeholder="Search">
+<img src="/asset/pic.svg?v={n}" alt="banner">
+{paragraphs}
+</body></html>""" # 📄 假页面模板
+
+SITE_CSS = """
+body { margin: 0; font: 16px sans-serif; height: 3000px; }
+nav { height: 40px; padding: 10px; }
+h1 { margin: 20px; }
+#go { position: absolute; left: 520px; top: 220px; width: 240px; height: 60px; }
+#q { position: absolute; left: 440px; top: 340px; width: 400px; height: 40px; }
+img { position: absolute; left: 40px; top: 420px; width: 1200px; height: 200px; }
+p { position: relative; top: 600px; margin: 20px; }
+""" # 🎨 假站点样式 (按钮与输入框固定在 BUTTON_Y / INPUT_Y)
+
+PIC_SVG = """<svg xmlns="http://www.w3.org/2000/svg" width="1200" height="200">
+<rect width="1200" height="200" fill="#{color}"/><text x="40" y="120" font-size="64">banner {n}</text></svg>""" # 🖼️ 假图片
+
+def percentiles(samples):
+    # =============================================================================
+    #  🎉 分位数统计 (样本列表)
+    #
+    #  🎨 代码用途:
+    #      按最近秩法计算 p50/p95/p99，并附带均值、最大值和样本数 (毫秒，保留 1 位小数)。
+    #
+    #  💡 易懂解释:
+    #      一半的步骤比这快，只有 1% 比这慢！
+    #
+    #  ⚠️ 警告:
+    #      无。
+    #
+    #  ⚙️ 触发源:
+    #      Through Brain/Benchmark.py "build_report" -> percentiles
+    # =============================================================================
+    if not samples: return {"count": 0} # 🛑 无样本
+    s = sorted(samples) # 📊 排序
+    rank = lambda p: s[min(len(s) - 1, max(0, math.ceil(p / 100 * len(s)) - 1))] # 📏 最近秩
+    return {"count": len(s), "p50": round(rank(50), 1), "p95": round(rank(95), 1), "p99": round(rank(99), 1),
+            "mean": round(sum(s) / len(s), 1), "max": round(s[-1], 1)} # 📦 统计结果
+
+class MockGemini:
+    # =============================================================================
+    #  🎉 模拟模型服务
+    #
+    #  🎨 代码用途:
+    #      实现 generateContent 与 streamGenerateContent (SSE)，按目标逐条返回脚本动作，
+    #      按概率注入 429，并按请求内容估算 usageMetadata。
+    #
+    #  💡 易懂解释:
+    #      一个假大脑，慢吞吞地按剧本回答，偶尔还会说 "太忙了，等会儿"！
+    #
+    #  ⚠️ 警告:
+    #      [确定性]: 脚本按目标 (每个用户一个) 独立推进，429 使用固定种子的随机数。
+    #
+    #  ⚙️ 触发源:
+    #      Through Brain/Benchmark.py "main" -> MockGemini
+    # =============================================================================
+    def __init__(self, site, pages, script, latency_ms, jitter_ms, chunk_ms, throttle_rate, seed):
+        self.site = site # 🌐 假站点地址
+        self.pages = pages # 🧮 假页面数量
+        self.script = script # 📜 脚本动作
+        self.latency_ms = latency_ms # ⏱️ 基础延迟
+        self.jitter_ms = jitter_ms # 🎲 延迟抖动
+        self.chunk_ms = chunk_ms # 🌊 流式片段间隔
+        self.throttle_rate = throttle_rate # 🚦 429 注入概率
+        self.rng = random.Random(seed) # 🎲 固定种子
+        self.cursor = {} # {goal: 下一条脚本序号} # 📍 脚本进度
+        self.stats = {"requests": 0, "stream_requests": 0, "throttled": 0, "prompt_tokens": 0, "output_tokens": 0} # 📊 统计
+
+    def app(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024) # 🏗️ 应用 (截图负载较大)
+        app.router.add_post("/v1beta/models/{call}", self.handle) # 🛣️ model:method 路由
+        return app # 📤 返回应用
+
+    def _next_plan(self, prompt):
+        # =============================================================================
+        #  🎉 下一条计划 (提示词)
+        #
+        #  🎨 代码用途:
+        #      从提示词中取出目标与当前 URL，推进该目标的脚本，替换 {next_url} 与元素角色占位。
+        #
+        #  💡 易懂解释:
+        #      翻到剧本的下一页，照着念！
+        #
+        #  ⚠️ 警告:
+        #      [元素占位]: 提示词里没有元素清单或找不到该角色时去掉 element，只保留坐标。
+        #
+        #  ⚙️ 触发源:
+        #      Through Brain/Benchmark.py "handle" -> _next_plan
+        # =============================================================================
+        goal = (re.search(r'User Goal: "(.*?)"', prompt) or [None, ""])[1] # 🎯 目标
+        url = (re.search(r'Current URL: "(.*?)"', prompt) or [None, ""])[1] # 🔗 当前 URL
+        page = re.search(r"/page/(\d+)", url) # 📄 当前页号
+        next_url = f"{self.site}/page/{(int(page[1]) + 1 if page else 0) % self.pages}" # ➡️ 下一页
+        i = self.cursor.get(goal, 0) # 📍 脚本进度
+        self.cursor[goal] = i + 1 # ➕ 推进
+        plan = json.loads(json.dumps(self.script[i % len(self.script)]).replace("{next_url}", next_url)) # 📋 脚本副本
+        params = plan.get("params") or {} # ⚙️ 参数
+        if isinstance(params.get("element"), str): # 🧩 角色占位
+            hit = re.search(rf'^(\d+) {re.escape(params["element"])} "', prompt, re.M) # 🔍 找第一个该角色的元素
+            if hit: params["element"] = int(hit[1]) # 🔢 换成序号
+            else: del params["element"] # 🗑️ 仅用坐标
+        return plan # 📤 返回计划
+
+    def _usage(self, payload, text):
+        parts = payload["contents"][0]["parts"] # 📦 请求片段
+        text_tok = sum(len(p.get("text", "")) for p in parts) // 4 # 🧮 文本 Token
+        image_tok = 258 * sum(1 for p in parts if "inline_data" in p) # 🧮 图片 Token
+        out_tok = max(1, len(text) // 4) # 🧮 输出 Token
+        self.stats["prompt_tokens"] += text_tok + image_tok # 📈 输入累计
+        self.stats["output_tokens"] += out_tok # 📈 输出累计
+        return {
+            "promptTokenCount": text_tok + image_tok, # 📥 输入
+            "candidatesTokenCount": out_tok, # 📤 输出
+            "totalTokenCount": text_tok + image_tok + out_tok, # 🧮 合计
+            "promptTokensDetails": [{"modality": "TEXT", "tokenCount": text_tok}] + ([{"modality": "IMAGE", "tokenCount": image_tok}] if image_tok else []), # 🧩 分模态
+        } # 🧾 用量
+
+    async def handle(self, request):
+        # =============================================================================
+        #  🎉 处理请求 (HTTP 请求)
+        #
+        #  🎨 代码用途:
+        #      先按概率返回 429；否则等待设定延迟后返回脚本计划，流式请求按 SSE 分片发送。
+        #
+        #  💡 易懂解释:
+        #      假大脑接电话：偶尔占线，平时想一会儿再回答！
+        #
+        #  ⚠️ 警告:
+        #      [429]: 被限流的请求不推进脚本。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "_post" -> handle
+        # =============================================================================
+        stream = request.match_info["call"].endswith(":streamGenerateContent") # 🌊 是否流式
+        payload = await request.json() # 📦 请求负载
+        self.stats["requests"] += 1 # 🔢 请求计数
+        if stream: self.stats["stream_requests"] += 1 # 🌊 流式计数
+        if self.rng.random() < self.throttle_rate: # 🎲 注入限流
+            self.stats["throttled"] += 1 # 📈 限流计数
+            return web.json_response({"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}}, status=429) # 🚦 429
+        prompt = "".join(p.get("text", "") for p in payload["contents"][0]["parts"]) # 📝 提示词
+        text = json.dumps(self._next_plan(prompt)) # 📋 计划文本
+        usage = self._usage(payload, text) # 🧾 用量
+        await asyncio.sleep((self.latency_ms + self.rng.uniform(0, self.jitter_ms)) / 1000) # 💤 模拟思考
+        if not stream: # 🚦 阻塞模式
+            return web.json_response({"candidates": [{"content": {"parts": [{"text": text}]}}], "usageMetadata": usage}) # 📤 完整响应
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"}) # 🌊 SSE 响应
+        await resp.prepare(request) # 📮 发送响应头
+        cut = [0, len(text) // 3, 2 * len(text) // 3, len(text)] # ✂️ 三段切分
+        for i in range(3): # 🔄 逐段发送
+            event = {"candidates": [{"content": {"parts": [{"text": text[cut[i]:cut[i + 1]]}]}}]} # 📦 事件
+            if i == 2: event["usageMetadata"] = usage # 🧾 最后一段带用量
+            await resp.write(f"data: {json.dumps(event)}\r\n\r\n".encode("utf-8")) # 📤 写出事件
+            if i < 2: await asyncio.sleep(self.chunk_ms / 1000) # 💤 片段间隔
+        await resp.write_eof() # 🏁 结束
+        return resp # 📤 返回响应
+
+def site_app(pages):
+    # =============================================================================
+    #  🎉 假站点 (页面数量)
+    #
+    #  🎨 代码用途:
+    #      提供 /page/{n} 静态页面及其样式与图片，内容只由页号决定；资源带长缓存头。
+    #
+    #  💡 易懂解释:
+    #      搭几间一模一样的样板房给机器人练手！
+    #
+    #  ⚠️ 警告:
+    #      无。
+    #
+    #  ⚙️ 触发源:
+    #      Through Brain/Benchmark.py "main" -> site_app
+    # =============================================================================
+    async def page(request):
+        n = int(request.match_info["n"]) % pages # 📄 页号
+        paragraphs = "\n".join(f"<p>Paragraph {i} of page {n}: " + "lorem ipsum dolor sit amet " * 8 + "</p>" for i in range(30)) # 📝 正文
+        html = PAGE_HTML.format(n=n, prev=(n - 1) % pages, next=(n + 1) % pages, paragraphs=paragraphs) # 📄 渲染页面
+        return web.Response(text=html, content_type="text/html") # 📤 页面
+
+    async def css(request):
+        return web.Response(text=SITE_CSS, content_type="text/css", headers={"Cache-Control": "max-age=3600"}) # 🎨 样式
+
+    async def pic(request):
+        n = int(request.query.get("v", "0")) # 🔢 图片版本
+        svg = PIC_SVG.format(n=n, color=f"{(n * 2654435761) & 0xFFFFFF:06x}") # 🖼️ 按页号着色
+        return web.Response(text=svg, content_type="image/svg+xml", headers={"Cache-Control": "max-age=3600"}) # 📤 图片
+
+    app = web.Application() # 🏗️ 应用
+    app.router.add_get("/page/{n}", page) # 🛣️ 页面
+    app.router.add_get("/asset/site.css", css) # 🛣️ 样式
+    app.router.add_get("/asset/pic.svg", pic) # 🛣️ 图片
+    return app # 📤 返回应用
+
+async def serve(app):
+    runner = web.AppRunner(app, access_log=None) # 🏃 运行器
+    await runner.setup() # ⚙️ 初始化
+    site = web.TCPSite(runner, "127.0.0.1", 0) # 🔌 随机端口
+    await site.start() # 🚀 启动
+    host, port = runner.addresses[0][:2] # 🔍 实际端口
+    return runner, f"http://{host}:{port}" # 📤 运行器与地址
+
+async def run_user(user_id, start_url, args, samples, errors):
+    # =============================================================================
+    #  🎉 单用户循环 (用户ID，起始页，参数，样本表，错误表)
+    #
+    #  🎨 代码用途:
+    #      与 /agent/step 相同的阶段划分: 截图 (调度器内) -> 预处理 -> 规划 -> 执行 (调度器内)，
+    #      每一步把各阶段耗时写入样本表。
+    #
+    #  💡 易懂解释:
+    #      一个假用户老老实实地做完每一步，边做边掐表！
+    #
+    #  ⚠️ 警告:
+    #      [错误不中断]: 某一步失败只计数，下一步继续。
+    #
+    #  ⚙️ 触发源:
+    #      Through Brain/Benchmark.py "run" -> run_user
+    # =============================================================================
+    from Body.Playwright import angel_browser, serialize_elements
+    from Body.Scheduler import angel_scheduler
+    from Body.ImagePrep import angel_image_prep
+    from Body.Gemini import angel_brain
+    from Memory.Interface import run_actions
+    want_image = args.observe in ("image", "both") # 🖼️ 需要截图
+    want_elements = args.observe in ("elements", "both") # 🧩 需要元素
+    goal = f"Benchmark task for {user_id}" # 🎯 每用户独立目标 (独立脚本进度)
+
+    for _ in range(args.steps): # 🔄 逐步执行
+        step_t = time.perf_counter() # ⏱️ 步骤开始
+
+        async def capture():
+            session = await angel_browser.get_or_create_session(user_id) # 🗂️ 会话
+            shot = await session["eye"].capture_bytes() if want_image else b"" # 📸 截图
+            elements = await session["eye"].elements() if want_elements else [] # 🧩 元素
+            return shot, elements, session["page"].url # 📤 观察结果
+
+        (shot, elements, url), wait_ms, exec_ms = await angel_scheduler.run(user_id, capture) # 📸 调度截图
+        samples["capture_queue"].append(wait_ms) # ⏳ 截图排队
+        samples["capture"].append(exec_ms) # ⏱️ 截图耗时
+        if want_image and not shot: # 🚨 截图失败
+            errors["capture"] += 1 # 📈 错误计数
+            continue # ⏭️ 下一步
+
+        t = time.perf_counter() # ⏱️ 预处理开始
+        frame = await angel_image_prep.prepare(shot, user_id) if shot else None # 🖼️ 预处理
+        samples["prep"].append((time.perf_counter() - t) * 1000) # ⏱️ 预处理耗时
+
+        t = time.perf_counter() # ⏱️ 规划开始
+        plan = await angel_brain.plan_next_action(
+            frame.b64 if frame else "", goal, url, user_id, use_cache=args.plan_cache, stream=args.stream,
+            frame_box=frame.box if frame else None, elements=serialize_elements(elements) if want_elements else None) # 🧠 规划
+        samples["plan"].append((time.perf_counter() - t) * 1000) # ⏱️ 规划耗时
+        if plan is None: # 🚨 规划失败
+            errors["plan"] += 1 # 📈 错误计数
+            continue # ⏭️ 下一步
+
+        action = {"action_type": plan.get("action", ""), "params": plan.get("params") or {}} # 🎬 动作
+        if action["action_type"] != "done": # 🚦 需要执行
+            async def execute():
+                return await run_actions(await angel_browser.get_or_create_session(user_id), [action]) # 🎬 执行动作
+
+            (ok, _), wait_ms, exec_ms = await angel_scheduler.run(user_id, execute) # 🎬 调度执行
+            samples["execute_queue"].append(wait_ms) # ⏳ 执行排队
+            samples["execute"].append(exec_ms) # ⏱️ 执行耗时
+            if not ok: errors["execute"] += 1 # 📈 错误计数
+        samples["step"].append((time.perf_counter() - step_t) * 1000) # ⏱️ 步骤总耗时
+
+async def run(args):
+    # =============================================================================
+    #  🎉 运行基准 (命令行参数)
+    #
+    #  🎨 代码用途:
+    #      启动假站点与模拟模型 -> 写入环境变量 -> 导入项目模块 -> 创建会话并打开起始页 (不计时)
+    #      -> 并发跑完所有用户 -> 汇总报告 -> 关闭会话并清理基准用户目录。
+    #
+    #  💡 易懂解释:
+    #      布置考场、发卷、收卷、算分，一条龙！
+    #
+    #  ⚠️ 警告:
+    #      [密钥]: 使用 --keys 个假密钥替换密钥池，真实密钥不会发往模拟服务。
+    #      [限速]: 默认把单密钥 RPM 调高，避免本地令牌桶成为瓶颈；可通过环境变量覆盖。
+    #
+    #  ⚙️ 触发源:
+    #      Through Brain/Benchmark.py "main" -> run
+    # =============================================================================
+    script = DEFAULT_SCRIPT # 📜 默认脚本
+    if args.script: # 🚦 自定义脚本
+        with open(args.script, "r", encoding="utf-8") as f: script = json.load(f) # 📥 读取脚本
+    site_runner, site = await serve(site_app(args.pages)) # 🌐 启动假站点
+    mock = MockGemini(site, args.pages, script, args.latency_ms, args.jitter_ms, args.chunk_ms, args.throttle_rate, args.seed) # 🧠 模拟模型
+    mock_runner, mock_url = await serve(mock.app()) # 🚀 启动模拟模型
+
+    # ⚠️ 必须在导入项目模块之前写入 (Config 在导入时读取)
+    os.environ["ANGEL_GEMINI_API_BASE"] = mock_url # 🔗 指向模拟服务
+    os.environ["ANGEL_PLAN_CACHE_SIZE"] = os.environ.get("ANGEL_PLAN_CACHE_SIZE", "512") if args.plan_cache else "0" # 💾 规划缓存
+    os.environ.setdefault("ANGEL_GEMINI_KEY_RPM", "100000") # 🧮 放开请求数配额
+    from Memory.Config import USER_DATA_DIR, GEMINI_KEY_RPM, GEMINI_KEY_TPM
+    from Body.Playwright import angel_browser
+    from Body.Scheduler import angel_scheduler
+    from Body.ImagePrep import angel_image_prep
+    from Body.KeyPool import angel_key_pool, ApiKey
+    from Body.Gemini import angel_brain, global_ai_cost
+    angel_key_pool.keys = [ApiKey(f"bench-key-{i:04d}", GEMINI_KEY_RPM, GEMINI_KEY_TPM) for i in range(max(1, args.keys))] # 🔑 假密钥
+
+    users = [f"bench-{i}" for i in range(args.users)] # 👥 基准用户
+    fresh = [u for u in users if not os.path.exists(os.path.join(USER_DATA_DIR, u))] # 🧹 本次新建的用户目录
+    samples = {k: [] for k in ("step", "capture_queue", "capture", "prep", "plan", "execute_queue", "execute")} # 📊 样本表
+    errors = {"capture": 0, "plan": 0, "execute": 0} # 🚨 错误表
+    try:
+        setup_t = time.perf_counter() # ⏱️ 准备开始
+        async def open_start(i, user_id):
+            session = await angel_browser.get_or_create_session(user_id) # 🗂️ 创建会话
+            await session["page"].goto(f"{site}/page/{i % args.pages}") # 🔗 打开起始页
+        await asyncio.gather(*(open_start(i, u) for i, u in enumerate(users))) # 🚀 并行准备
+        setup_ms = (time.perf_counter() - setup_t) * 1000 # ⏱️ 准备耗时
+
+        run_t = time.perf_counter() # ⏱️ 计时开始
+        await asyncio.gather(*(run_user(u, site, args, samples, errors) for u in users)) # 🏃 并发执行
+        wall_s = time.perf_counter() - run_t # ⏱️ 总耗时
+
+        report = {
+            "config": {k: v for k, v in vars(args).items() if k != "out"}, # ⚙️ 参数
+            "setup_ms": round(setup_ms, 1), # ⏱️ 准备耗时 (不计入吞吐)
+            "wall_s": round(wall_s, 3), # ⏱️ 总耗时
+            "steps": len(samples["step"]), # 🔢 完成步数
+            "errors": errors, # 🚨 错误
+            "throughput_steps_per_s": round(len(samples["step"]) / wall_s, 3) if wall_s else 0.0, # 🚀 吞吐量
+            "step_ms": percentiles(samples["step"]), # ⏱️ 步骤延迟
+            "phases_ms": {k: percentiles(v) for k, v in samples.items() if k != "step"}, # 🧩 分阶段延迟
+            "mock": mock.stats, # 🧠 模拟服务统计
+            "brain": angel_brain.get_stats(), # 🧠 模型客户端统计
+            "key_pool": angel_key_pool.get_stats(), # 🔑 密钥池统计
+            "scheduler": angel_scheduler.get_stats(), # 🚦 调度统计
+            "image_prep": angel_image_prep.get_stats(), # 🖼️ 预处理统计
+            "ai_cost": global_ai_cost.get_stats(), # 💰 模型成本
+        } # 📦 报告
+    finally:
+        for u in users: # 🔄 关闭会话
+            try: await angel_browser.close_session(u) # 🚪 关闭
+            except Exception: pass # 🤐 忽略错误
+        for u in fresh: shutil.rmtree(os.path.join(USER_DATA_DIR, u), ignore_errors=True) # 🧹 清理基准用户目录
+        for slot in angel_browser.pool: # 🔄 关闭浏览器
+            if slot["browser"]: await slot["browser"].close() # 🚪 关闭进程
+        if angel_browser.playwright: await angel_browser.playwright.stop() # 🛑 停止 Playwright
+        await angel_brain.close() # 🔌 关闭连接池
+        await mock_runner.cleanup() # 🛑 停止模拟模型
+        await site_runner.cleanup() # 🛑 停止假站点
+    return report # 📤 返回报告
+
+def main():
+    parser = argparse.ArgumentParser(description="Agent loop benchmark against a mock model and a fake site") # 🧾 命令行
+    parser.add_argument("--users", type=int, default=4, help="concurrent users") # 👥 并发用户
+    parser.add_argument("--steps", type=int, default=10, help="steps per user") # 🔢 每用户步数
+    parser.add_argument("--pages", type=int, default=5, help="fake pages") # 📄 假页面数
+    parser.add_argument("--observe", choices=("image", "elements", "both"), default="image", help="observation mode") # 👁️ 观察模式
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="mock model base latency") # ⏱️ 基础延迟
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="mock model latency jitter") # 🎲 延迟抖动
+    parser.add_argument("--chunk-ms", type=float, default=20.0, help="gap between streamed chunks") # 🌊 片段间隔
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="probability of an injected 429") # 🚦 429 概率
+    parser.add_argument("--keys", type=int, default=2, help="fake API keys in the pool") # 🔑 假密钥数
+    parser.add_argument("--stream", action="store_true", help="use streamGenerateContent") # 🌊 流式
+    parser.add_argument("--plan-cache", action="store_true", help="keep the plan cache enabled") # 💾 规划缓存
+    parser.add_argument("--script", default="", help="JSON list of plans to cycle through") # 📜 自定义脚本
+    parser.add_argument("--seed", type=int, default=1, help="seed for latency jitter and 429 injection") # 🎲 随机种子
+    parser.add_argument("--out", default="", help="also write the report to this file") # 📄 输出文件
+    args = parser.parse_args() # 📥 解析参数
+
+    report = asyncio.run(run(args)) # 🏃 运行基准
+    text = json.dumps(report, indent=2, ensure_ascii=False) # 📦 序列化
+    print(text) # 📢 输出报告
+    if args.out: # 🚦 写文件
+        with open(args.out, "w", encoding="utf-8") as f: f.write(text) # 💾 保存报告
+
+if __name__ == "__main__":
+    main()
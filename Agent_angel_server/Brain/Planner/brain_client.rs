@@ -6,6 +6,7 @@
    📊 当前状态 : 活跃 (更新: 2025-12-06)
    🧱 Brain/Planner/brain_client.rs 踩坑记录 (累积，勿覆盖) :
       1. [2025-12-04] [已修复] [超时问题]: Python 处理图片较慢，需增加超时时间。 -> 暂未处理，依赖默认超时。
+      2. [2026-10-17] [已修复] [端口错误]: /think 指向 8002，没有任何服务监听。 -> 改为 Python Worker 的 8001。
    ========================================================================== */
 
 use reqwest::Client;
@@ -41,7 +42,7 @@ pub async fn call_python_brain(
     };
 
     // 🚀 发送请求
-    let resp = client.post("http://127.0.0.1:8002/think")
+    let resp = client.post("http://127.0.0.1:8001/think") // 🔗 Python Worker (与 BodyClient 同一端口，截图在那边经过预处理)
         .json(&req) // 📦 序列化 JSON
         .send()
         .await
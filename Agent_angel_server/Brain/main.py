@@ -3,7 +3,7 @@
 #  ⚡ 逻辑摘要 : 启动 FastAPI 服务器，挂载路由，启动后台任务。
 #  💡 易懂解释 : Python 侧的 "main 函数"，程序的起点。
 #  🔋 未来扩展 : 支持命令行参数配置端口，支持多进程启动。
-#  📊 当前状态 : 活跃 (更新: 2025-12-06)
+#  📊 当前状态 : 活跃 (更新: 2026-10-17)
 #  🧱 Brain/Main.py 踩坑记录 (累积，勿覆盖) :
 #     1. [2025-12-04] [已修复] [模块导入]: 找不到 Memory 模块。 -> 使用 sys.path.append 添加父目录。
 # ==========================================================================
@@ -18,7 +18,9 @@ from fastapi import FastAPI
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # 📂 添加父目录
 
 from Memory.Interface import router
-from Energy.Tasks import cost_sync_loop
+from Energy.Tasks import cost_sync_loop, cost_history_loop, session_reaper_loop, global_cost_reporter
+from Body.Playwright import angel_browser
+from Body.Gemini import angel_brain
 
 # =============================================================================
 #  🎉 应用实例
@@ -56,6 +58,29 @@ async def start_background_tasks():
     #      Through Brain/Main.py "Server Startup" -> start_background_tasks
     # =============================================================================
     asyncio.create_task(cost_sync_loop()) # 🔄 启动成本同步
+    asyncio.create_task(cost_history_loop()) # 📈 启动成本历史采样
+    asyncio.create_task(session_reaper_loop()) # 💤 启动会话回收
+    asyncio.create_task(angel_browser.warm_up()) # 🔥 预热浏览器
+
+@app.on_event("shutdown")
+async def close_clients():
+    # =============================================================================
+    #  🎉 关闭客户端
+    #
+    #  🎨 代码用途:
+    #      服务器退出时关闭长连接客户端。
+    #
+    #  💡 易懂解释:
+    #      关门啦！把电话线都挂好再走！
+    #
+    #  ⚠️ 警告:
+    #      无。
+    #
+    #  ⚙️ 触发源:
+    #      Through Brain/Main.py "Server Shutdown" -> close_clients
+    # =============================================================================
+    await angel_brain.close() # 🔒 关闭 Gemini 连接池
+    await global_cost_reporter.flush() # 📮 交最后一次账 (失败的留在落盘文件)
 
 if __name__ == "__main__":
     print("🐍 [Main] Python Service 启动中 (Port 8001)...") # 📢 打印启动信息
@@ -0,0 +1,307 @@
+# ==========================================================================
+#  📃 文件功能 : 成本预算与降级
+#  ⚡ 逻辑摘要 : 分用户与全局各维护三个滑动窗口计数器 (每小时美元、每天美元、每小时字节)，记账 O(1)；
+#               按用量占上限的最大比例逐级降级: 降低截图质量 -> 降低调度权重并放慢步频 -> 拒绝执行。
+#  💡 易懂解释 : 给每个人和整个机器人都发一张 "额度卡"，快刷爆时先省着花，刷爆了就停下！
+#  🔋 未来扩展 : 支持按用户单独配置额度，支持预算耗尽时的 Webhook 通知。
+#  📊 当前状态 : 活跃 (更新: 2026-10-17)
+#  🧱 Energy/Budget.py 踩坑记录 (累积，勿覆盖) :
+#     1. [2026-10-17] [待验证] [滞后]: 流式规划的剩余输出在后台记账，判定可能比实际花费晚一步。 -> 降级阈值留出余量。
+# ==========================================================================
+
+import asyncio
+import math
+import sys
+import os
+import time
+from collections import OrderedDict
+
+# 🛠️ 确保能导入 Memory 和 Body 模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Memory.Config import BUDGET_USER_USD_HOUR, BUDGET_USER_USD_DAY, BUDGET_USER_BYTES_HOUR
+from Memory.Config import BUDGET_GLOBAL_USD_HOUR, BUDGET_GLOBAL_USD_DAY, BUDGET_GLOBAL_BYTES_HOUR
+from Memory.Config import BUDGET_DEGRADE_AT, BUDGET_SLOW_AT, BUDGET_DEGRADED_QUALITY, BUDGET_SLOW_WEIGHT, BUDGET_SLOW_DELAY_S
+from Memory.Config import COST_SESSIONS_MAX
+from Body.Scheduler import angel_scheduler
+
+LIMITS = (("usd_hour", 3600), ("usd_day", 86400), ("bytes_hour", 3600)) # 🧾 (指标, 窗口秒数)
+LEVELS = ("ok", "degraded", "slowed", "stopped") # 🚦 降级等级
+OK, DEGRADED, SLOWED, STOPPED = range(len(LEVELS)) # 🚦 等级编号
+
+def to_level(ratio):
+    return STOPPED if ratio >= 1 else SLOWED if ratio >= BUDGET_SLOW_AT else DEGRADED if ratio >= BUDGET_DEGRADE_AT else OK # 🚦 用量比例 -> 等级
+
+class BudgetExceededError(Exception):
+    def __init__(self, scope, limit, retry_after):
+        super().__init__(f"{scope} budget exceeded: {limit} (retry after {retry_after}s)") # 📝 错误信息
+        self.scope = scope # 🏷️ user / global
+        self.limit = limit # 🧾 超出的指标
+        self.retry_after = retry_after # ⏳ 预计恢复秒数
+
+class WindowCounter:
+    # =============================================================================
+    #  🎉 滑动窗口计数器
+    #
+    #  🎨 代码用途:
+    #      只保存当前窗口与上一窗口的合计，估算值 = 上一窗口 × 当前窗口剩余比例 + 当前窗口。
+    #
+    #  💡 易懂解释:
+    #      不记每一笔，只记 "上一小时" 和 "这一小时"，照样能估出 "最近一小时" 花了多少！
+    #
+    #  ⚠️ 警告:
+    #      [精度]: 假设上一窗口内花费均匀分布，突发花费会被平滑。
+    #
+    #  ⚙️ 触发源:
+    #      Through Energy/Budget.py "BudgetTracker" -> WindowCounter
+    # =============================================================================
+    __slots__ = ("window", "index", "cur", "prev")
+
+    def __init__(self, window):
+        self.window = window # ⏱️ 窗口秒数
+        self.index = 0 # 🏷️ 当前窗口编号
+        self.cur = 0.0 # ➕ 当前窗口合计
+        self.prev = 0.0 # ➕ 上一窗口合计
+
+    def _roll(self, now):
+        index = int(now // self.window) # 🏷️ 所在窗口
+        if index != self.index: # 🚦 进入新窗口
+            self.prev = self.cur if index == self.index + 1 else 0.0 # 🔄 相邻窗口保留，否则清零
+            self.cur = 0.0 # 🧹 清零
+            self.index = index # 🏷️ 更新编号
+
+    def add(self, amount, now):
+        self._roll(now) # 🔄 滚动窗口
+        self.cur += amount # ➕ 累加
+
+    def value(self, now):
+        self._roll(now) # 🔄 滚动窗口
+        return self.prev * (1 - (now % self.window) / self.window) + self.cur # 🧮 滑动估算
+
+    def retry_after(self, limit, now):
+        # =============================================================================
+        #  🎉 预计恢复秒数 (上限，时间)
+        #
+        #  🎨 代码用途:
+        #      按滑动估算公式反解估算值回落到上限以下的最早时间 (假设期间不再花费)。
+        #
+        #  💡 易懂解释:
+        #      "还要等多久额度才会回来？"
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Energy/Budget.py "check" -> retry_after
+        # =============================================================================
+        self._roll(now) # 🔄 滚动窗口
+        frac = (now % self.window) / self.window # 📏 当前窗口已过比例
+        if self.cur < limit: # 🚦 本窗口内上一窗口的折算部分衰减即可恢复
+            target = 1 - (limit - self.cur) / self.prev if self.prev else frac # 📏 需要到达的比例
+            wait = (target - frac) * self.window # ⏳ 本窗口内等待
+        else: # 🚦 需要等到下一窗口，本窗口合计再衰减
+            wait = (1 - frac) * self.window + (1 - limit / self.cur) * self.window # ⏳ 跨窗口等待
+        return max(1, math.ceil(wait)) # 📤 至少 1 秒
+
+class BudgetTracker:
+    # =============================================================================
+    #  🎉 预算追踪器
+    #
+    #  🎨 代码用途:
+    #      charge() 由分用户账本在每笔网络/模型记账时调用；admit() / check() 在执行与规划前判定等级，
+    #      等级变化时调整调度权重；quality() 给出截图质量。
+    #
+    #  💡 易懂解释:
+    #      记账的同时看一眼额度，快用完了就提醒大家省着点！
+    #
+    #  ⚠️ 警告:
+    #      [复杂度]: 记账与判定都是 O(1) (每个用户固定 3 个计数器，全局 3 个)。
+    #      [容量]: 用户数超过 COST_SESSIONS_MAX 时淘汰最久未记账的用户，其额度随之重置，等级回到 ok (恢复调度权重)。
+    #      [关闭]: 所有上限为 0 时 charge() 直接返回，判定恒为 ok。
+    #
+    #  ⚙️ 触发源:
+    #      Through Energy/SessionCost.py "track_browser / track_ai" / Memory/Interface.py "/action/execute" -> BudgetTracker
+    # =============================================================================
+    def __init__(self, user_limits=(BUDGET_USER_USD_HOUR, BUDGET_USER_USD_DAY, BUDGET_USER_BYTES_HOUR),
+                 global_limits=(BUDGET_GLOBAL_USD_HOUR, BUDGET_GLOBAL_USD_DAY, BUDGET_GLOBAL_BYTES_HOUR), max_users=COST_SESSIONS_MAX):
+        self.user_limits = tuple(user_limits) # 👤 分用户上限 (顺序同 LIMITS)
+        self.global_limits = tuple(global_limits) # 🌐 全局上限 (顺序同 LIMITS)
+        self.max_users = max_users # 🧮 用户数上限
+        self.users = OrderedDict() # {user_id: [WindowCounter × 3]} (最近记账在后) # 👤 分用户计数器
+        self.totals = self._counters() # 🌐 全局计数器
+        self.levels = {} # {user_id: level} 已生效的非 ok 等级 # 🚦 当前等级
+        self.saved_weights = {} # {user_id: weight | None} 放慢前的调度权重 # ⚖️ 原权重
+        self.stats = {"rejected": 0, "delayed": 0, "degraded_events": 0, "slowed_events": 0, "stopped_events": 0, "evictions": 0} # 📊 计数器
+
+    @property
+    def enabled(self):
+        return any(self.user_limits) or any(self.global_limits) # 🚦 是否开启
+
+    @staticmethod
+    def _counters():
+        return [WindowCounter(window) for _, window in LIMITS] # 🧮 一组计数器
+
+    def charge(self, user_id, usd=0.0, nbytes=0):
+        # =============================================================================
+        #  🎉 记账 (用户ID，美元，字节)
+        #
+        #  🎨 代码用途:
+        #      累加到该用户与全局的三个窗口计数器。
+        #
+        #  💡 易懂解释:
+        #      刷一下额度卡！
+        #
+        #  ⚠️ 警告:
+        #      [热路径]: 每个浏览器请求/响应与每次模型调用都会调用。
+        #
+        #  ⚙️ 触发源:
+        #      Through Energy/SessionCost.py "track_browser / track_ai" -> charge
+        # =============================================================================
+        if not self.enabled: return # 🛑 未开启
+        now = time.time() # ⏱️ 当前时间
+        counters = self.users.get(user_id) # 👤 用户计数器
+        if counters is None: # 🚦 新用户
+            if len(self.users) >= self.max_users: # 🚦 已满
+                evicted, _ = self.users.popitem(last=False) # 🗑️ 淘汰最久未记账
+                self._apply(evicted, OK) # 🔙 恢复调度权重、清除等级
+                self.stats["evictions"] += 1 # 📈 淘汰计数
+            counters = self.users[user_id] = self._counters() # 📝 新建计数器
+        else:
+            self.users.move_to_end(user_id) # 🔝 刷新顺序
+        for group in (counters, self.totals): # 🔄 用户与全局
+            group[0].add(usd, now) # 💰 每小时美元
+            group[1].add(usd, now) # 💰 每天美元
+            group[2].add(nbytes, now) # 📏 每小时字节
+
+    def _evaluate(self, user_id, now):
+        worst = (0.0, None, None) # 📊 (比例, 范围, 指标下标)
+        for scope, counters, limits in (("user", self.users.get(user_id), self.user_limits), ("global", self.totals, self.global_limits)): # 🔄 用户与全局
+            if counters is None: continue # 🛑 无记录
+            for i, limit in enumerate(limits): # 🔄 三个指标
+                if limit <= 0: continue # 🛑 不限制
+                ratio = counters[i].value(now) / limit # 📏 用量比例
+                if ratio > worst[0]: worst = (ratio, scope, i) # 🎯 最紧的一项
+        return worst # 📤 返回结果
+
+    def level(self, user_id):
+        if not self.enabled: return OK # 🛑 未开启
+        ratio = self._evaluate(user_id, time.time())[0] # 📏 最大比例
+        return to_level(ratio) # 🚦 等级
+
+    def _apply(self, user_id, level):
+        # =============================================================================
+        #  🎉 生效等级 (用户ID，等级)
+        #
+        #  🎨 代码用途:
+        #      等级变化时进出 "放慢" 状态: 进入时保存原调度权重并降为 BUDGET_SLOW_WEIGHT，离开时恢复。
+        #
+        #  💡 易懂解释:
+        #      额度紧张就让这位朋友排队时让一让，额度恢复了再还回来！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Energy/Budget.py "admit / check" -> _apply
+        # =============================================================================
+        prev = self.levels.get(user_id, OK) # 🚦 原等级
+        if level == prev: return # 🛑 无变化
+        if level >= SLOWED > prev: # 🐢 进入放慢
+            self.saved_weights[user_id] = angel_scheduler.weights.get(user_id) # 💾 保存原权重
+            angel_scheduler.set_weight(user_id, BUDGET_SLOW_WEIGHT) # ⚖️ 降低权重
+        elif prev >= SLOWED > level: # 🐇 离开放慢
+            weight = self.saved_weights.pop(user_id, None) # ⚖️ 原权重
+            if weight is None: angel_scheduler.weights.pop(user_id, None) # 🔙 恢复默认
+            else: angel_scheduler.set_weight(user_id, weight) # 🔙 恢复原值
+        if level > prev: self.stats[f"{LEVELS[level]}_events"] += 1 # 📈 升级计数
+        if level == OK: self.levels.pop(user_id, None) # 🧹 恢复正常
+        else: self.levels[user_id] = level # 🚦 记录等级
+        print(f"💳 [Budget] {user_id}: {LEVELS[prev]} -> {LEVELS[level]}") # 📢 打印日志
+
+    def check(self, user_id):
+        # =============================================================================
+        #  🎉 判定 (用户ID)
+        #
+        #  🎨 代码用途:
+        #      计算并生效当前等级，stopped 时抛出 BudgetExceededError，否则返回等级。
+        #
+        #  💡 易懂解释:
+        #      刷卡前先看看还有没有额度！
+        #
+        #  ⚠️ 警告:
+        #      [不等待]: 不做放慢等待，供规划路径 (plan_next_action) 使用。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "plan_next_action" / Energy/Budget.py "admit" -> check
+        # =============================================================================
+        if not self.enabled: return OK # 🛑 未开启
+        now = time.time() # ⏱️ 当前时间
+        ratio, scope, index = self._evaluate(user_id, now) # 📏 最紧的一项
+        level = to_level(ratio) # 🚦 等级
+        self._apply(user_id, level) # ⚙️ 生效
+        if level == STOPPED: # 🛑 额度耗尽
+            self.stats["rejected"] += 1 # 📈 拒绝计数
+            counters, limits = (self.users[user_id], self.user_limits) if scope == "user" else (self.totals, self.global_limits) # 📦 超限的一组
+            raise BudgetExceededError(scope, LIMITS[index][0], counters[index].retry_after(limits[index], now)) # 📤 抛出
+        return level # 📤 返回等级
+
+    async def admit(self, user_id):
+        # =============================================================================
+        #  🎉 准入 (用户ID)
+        #
+        #  🎨 代码用途:
+        #      check() 之后，slowed 等级额外等待 BUDGET_SLOW_DELAY_S 再放行，拉长该用户的步频。
+        #
+        #  💡 易懂解释:
+        #      额度快用完了？先歇两秒再走！
+        #
+        #  ⚠️ 警告:
+        #      [调度权重]: 权重只在争抢浏览器名额时起作用，等待保证空闲时步频同样放慢。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/action/execute / /agent/step" -> admit
+        # =============================================================================
+        level = self.check(user_id) # 🚦 判定
+        if level == SLOWED and BUDGET_SLOW_DELAY_S > 0: # 🐢 放慢
+            self.stats["delayed"] += 1 # 📈 等待计数
+            await asyncio.sleep(BUDGET_SLOW_DELAY_S) # 💤 拉长步频
+        return level # 📤 返回等级
+
+    def quality(self, user_id, normal=50):
+        return min(normal, BUDGET_DEGRADED_QUALITY) if self.level(user_id) >= DEGRADED else normal # 🖼️ 截图质量
+
+    def status(self, user_id):
+        # =============================================================================
+        #  🎉 额度状态 (用户ID)
+        #
+        #  🎨 代码用途:
+        #      返回该用户与全局各指标的当前用量、上限和比例，以及综合等级。
+        #
+        #  💡 易懂解释:
+        #      查一下额度卡余额！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/cost/budget" -> status
+        # =============================================================================
+        now = time.time() # ⏱️ 当前时间
+        result = {"user_id": user_id, "level": LEVELS[self.level(user_id)]} # 📦 结果
+        for scope, counters, limits in (("user", self.users.get(user_id), self.user_limits), ("global", self.totals, self.global_limits)): # 🔄 用户与全局
+            result[scope] = {name: {"used": round(counters[i].value(now), 6) if counters else 0, "limit": limits[i],
+                                    "ratio": round(counters[i].value(now) / limits[i], 4) if counters and limits[i] > 0 else None}
+                             for i, (name, _) in enumerate(LIMITS)} # 📊 各指标
+        return result # 📤 返回状态
+
+    def get_stats(self):
+        return {
+            "enabled": self.enabled, # 🚦 是否开启
+            "user_limits": dict(zip((n for n, _ in LIMITS), self.user_limits)), # 👤 分用户上限
+            "global_limits": dict(zip((n for n, _ in LIMITS), self.global_limits)), # 🌐 全局上限
+            "thresholds": {"degrade_at": BUDGET_DEGRADE_AT, "slow_at": BUDGET_SLOW_AT}, # 🚦 降级阈值
+            "tracked": len(self.users), # 👤 追踪用户数
+            "levels": {LEVELS[lv]: sum(1 for v in self.levels.values() if v == lv) for lv in (DEGRADED, SLOWED, STOPPED)}, # 🚦 各等级用户数
+            **self.stats, # 📈 计数器
+        } # 📊 预算统计
+
+global_budget = BudgetTracker()
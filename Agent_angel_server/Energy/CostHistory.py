@@ -0,0 +1,200 @@
+# ==========================================================================
+#  📃 文件功能 : 成本时间序列
+#  ⚡ 逻辑摘要 : 定长数组实现的分级环形缓冲；每秒采样一次累计计数器的差值，同时写入秒/分钟/小时三级桶，
+#               查询时选择覆盖时间范围且分辨率不超过步长的最粗一级，按步长聚合返回。
+#  💡 易懂解释 : 不用再让仪表盘自己一点点攒数据了，账本自己就带着 "历史曲线"！
+#  🔋 未来扩展 : 支持分用户历史，支持持久化到磁盘以跨重启保留。
+#  📊 当前状态 : 活跃 (更新: 2026-10-17)
+#  🧱 Energy/CostHistory.py 踩坑记录 (累积，勿覆盖) :
+#     1. [2026-10-17] [待验证] [采样延迟]: 事件循环卡顿时一次采样会覆盖多秒。 -> 差值整体记入当前秒，总量不丢，只是曲线略尖。
+# ==========================================================================
+
+import math
+import sys
+import os
+import time
+from array import array
+
+# 🛠️ 确保能导入 Memory 模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Memory.Config import COST_HISTORY_TIERS, COST_HISTORY_MAX_POINTS
+
+FIELDS = ("browser_tx", "browser_rx", "ws_tx", "ws_rx", "input_tokens", "output_tokens", "cost_usd") # 🧾 序列字段
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400} # ⏱️ 时长单位
+
+def parse_duration(text):
+    # =============================================================================
+    #  🎉 解析时长 (文本)
+    #
+    #  🎨 代码用途:
+    #      把 "90" / "90s" / "15m" / "6h" / "7d" 解析为秒数，格式错误或非正数抛出 ValueError。
+    #
+    #  💡 易懂解释:
+    #      "6h" 就是六个小时！
+    #
+    #  ⚠️ 警告:
+    #      无。
+    #
+    #  ⚙️ 触发源:
+    #      Through Memory/Interface.py "/cost/history" -> parse_duration
+    # =============================================================================
+    text = str(text).strip().lower() # 🧹 规整
+    unit = DURATION_UNITS.get(text[-1:]) # ⏱️ 单位
+    number = text[:-1] if unit else text # 🔢 数值部分
+    try: seconds = float(number) * (unit or 1) # 🧮 换算秒数
+    except ValueError: raise ValueError(f"invalid duration: {text!r} (expected e.g. 90, 30s, 15m, 6h, 7d)") # 🛑 格式错误
+    if not seconds > 0 or math.isinf(seconds): raise ValueError(f"duration must be positive: {text!r}") # 🛑 非正数
+    return seconds # 📤 返回秒数
+
+class RingTier:
+    # =============================================================================
+    #  🎉 单级环形缓冲
+    #
+    #  🎨 代码用途:
+    #      slots 个槽位，每槽 len(FIELDS) 个 double，stamps 记录槽位当前对应的桶号 (时间 // 分辨率)。
+    #
+    #  💡 易懂解释:
+    #      一圈格子，转一圈就覆盖掉最旧的那格！
+    #
+    #  ⚠️ 警告:
+    #      [惰性清零]: 写入时发现桶号不符才清零该槽；读取时桶号不符视为 0，过期数据不会被误读。
+    #
+    #  ⚙️ 触发源:
+    #      Through Energy/CostHistory.py "CostHistory" -> RingTier
+    # =============================================================================
+    def __init__(self, resolution_s, slots):
+        self.resolution_s = resolution_s # ⏱️ 每槽秒数
+        self.slots = slots # 🧮 槽位数
+        self.stamps = array("q", [-1]) * slots # 🏷️ 槽位桶号
+        self.values = array("d", [0.0]) * (slots * len(FIELDS)) # 🔢 槽位数值 (按槽连续存放)
+
+    @property
+    def span_s(self):
+        return self.resolution_s * self.slots # 📏 覆盖时长
+
+    def add(self, bucket, deltas):
+        slot = bucket % self.slots # 🎯 槽位
+        base = slot * len(FIELDS) # 📍 起始下标
+        if self.stamps[slot] != bucket: # 🚦 槽位属于旧桶
+            self.stamps[slot] = bucket # 🏷️ 换新桶号
+            for i in range(len(FIELDS)): self.values[base + i] = 0.0 # 🧹 清零
+        for i, v in enumerate(deltas): self.values[base + i] += v # ➕ 累加
+
+    def sum_range(self, first, last, out):
+        for bucket in range(first, last + 1): # 🔄 遍历桶
+            slot = bucket % self.slots # 🎯 槽位
+            if self.stamps[slot] != bucket: continue # 🛑 空桶或已被覆盖
+            base = slot * len(FIELDS) # 📍 起始下标
+            for i in range(len(FIELDS)): out[i] += self.values[base + i] # ➕ 累加
+
+class CostHistory:
+    # =============================================================================
+    #  🎉 成本历史
+    #
+    #  🎨 代码用途:
+    #      sample() 接收各累计计数器的当前值，与上次的差值同时写入每一级 (O(级数))；
+    #      query() 按 (范围, 步长) 返回聚合后的点序列。
+    #
+    #  💡 易懂解释:
+    #      每秒抄一次表，算出这一秒用了多少，分别记到 "秒本"、"分钟本"、"小时本" 上！
+    #
+    #  ⚠️ 警告:
+    #      [降采样]: 粗粒度级与细粒度级同时写入，无需后台合并任务。
+    #      [计数器回退]: 累计值变小 (如 Netstat.reset) 时该字段差值按 0 处理。
+    #      [单事件循环]: 仅在事件循环线程内调用。
+    #
+    #  ⚙️ 触发源:
+    #      Through Energy/Tasks.py "cost_history_loop" / Memory/Interface.py "/cost/history" -> CostHistory
+    # =============================================================================
+    def __init__(self, tiers=COST_HISTORY_TIERS, max_points=COST_HISTORY_MAX_POINTS):
+        self.tiers = [RingTier(res, slots) for res, slots in sorted(tiers)] # 🗂️ 从细到粗
+        self.max_points = max_points # 🧮 单次查询点数上限
+        self.last = None # 🔢 上次累计值
+        self.samples = 0 # 📈 采样次数
+
+    def sample(self, totals, now=None):
+        # =============================================================================
+        #  🎉 采样 (累计值，时间)
+        #
+        #  🎨 代码用途:
+        #      计算与上次累计值的差，写入各级当前桶；首次调用只记录基线。
+        #
+        #  💡 易懂解释:
+        #      抄表，记下这段时间走了多少字！
+        #
+        #  ⚠️ 警告:
+        #      totals 顺序必须与 FIELDS 一致。
+        #
+        #  ⚙️ 触发源:
+        #      Through Energy/Tasks.py "cost_history_loop" -> sample
+        # =============================================================================
+        now = time.time() if now is None else now # ⏱️ 当前时间
+        last, self.last = self.last, tuple(totals) # 🔄 交换基线
+        if last is None: return # 🛑 首次采样只定基线
+        deltas = [max(0, cur - prev) for cur, prev in zip(self.last, last)] # ➖ 差值 (回退按 0)
+        if not any(deltas): return # 🛑 无变化 (空桶读作 0，无需写入)
+        for tier in self.tiers: tier.add(int(now // tier.resolution_s), deltas) # 📥 写入每一级
+        self.samples += 1 # 📈 采样计数
+
+    def _pick(self, range_s, step_s):
+        covering = [t for t in self.tiers if t.span_s >= range_s] or self.tiers[-1:] # 🗂️ 能覆盖范围的级 (都不够则用最粗级)
+        finer = [t for t in covering if t.resolution_s <= step_s] # 🗂️ 分辨率不超过步长的级
+        return finer[-1] if finer else covering[0] # 🎯 最粗的合格级 (每点遍历的桶最少)
+
+    def query(self, range_s, step_s=None, now=None):
+        # =============================================================================
+        #  🎉 查询 (范围秒数，步长秒数，时间)
+        #
+        #  🎨 代码用途:
+        #      选级后把步长取整为分辨率的倍数，从当前桶往前返回 ceil(范围/步长) 个点及区间合计。
+        #
+        #  💡 易懂解释:
+        #      "最近 6 小时，每 5 分钟一个点" —— 直接从账本里翻出来！
+        #
+        #  ⚠️ 警告:
+        #      [复杂度]: O(点数 × 步长/分辨率)；选级保证步长/分辨率小于相邻两级的分辨率之比 (默认 60)。
+        #      [截断]: 范围超过最粗级覆盖时长时截断；点数超过上限时放大步长。
+        #      [当前桶]: 最后一个点包含尚未结束的当前桶。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/cost/history" -> query
+        # =============================================================================
+        now = time.time() if now is None else now # ⏱️ 当前时间
+        step_s = step_s or range_s / 60 # 📏 默认约 60 个点
+        tier = self._pick(range_s, step_s) # 🎯 选级
+        res = tier.resolution_s # ⏱️ 分辨率
+        range_s = min(range_s, tier.span_s) # ✂️ 截断到覆盖时长
+        step_s = max(step_s, range_s / self.max_points) # 📏 点数上限
+        per_point = max(1, math.ceil(step_s / res)) # 🧮 每点桶数
+        points = math.ceil(range_s / (per_point * res)) # 🔢 点数
+        points = min(points, tier.slots // per_point) or 1 # ✂️ 不超过环长
+        last = int(now // res) # 🏷️ 当前桶号
+        first = last - points * per_point + 1 # 🏷️ 最早桶号
+        series, totals = [], [0.0] * len(FIELDS) # 📦 结果
+        for start in range(first, last + 1, per_point): # 🔄 逐点
+            acc = [0.0] * len(FIELDS) # 🔢 本点累加
+            tier.sum_range(start, start + per_point - 1, acc) # ➕ 汇总本点的桶
+            for i, v in enumerate(acc): totals[i] += v # ➕ 区间合计
+            series.append({"t": start * res, **self._fields(acc)}) # 📍 点
+        return {
+            "range_s": points * per_point * res, # 📏 实际范围
+            "step_s": per_point * res, # 📏 实际步长
+            "resolution_s": res, # ⏱️ 所用级分辨率
+            "fields": FIELDS, # 🧾 字段
+            "points": series, # 📈 点序列
+            "totals": self._fields(totals), # 🧮 区间合计
+        } # 📦 查询结果
+
+    @staticmethod
+    def _fields(values):
+        return {name: (round(v, 6) if name == "cost_usd" else int(v)) for name, v in zip(FIELDS, values)} # 📦 数值转字段
+
+    def get_stats(self):
+        return {
+            "tiers": [{"resolution_s": t.resolution_s, "slots": t.slots, "span_s": t.span_s} for t in self.tiers], # 🗂️ 分级
+            "memory_bytes": sum(t.stamps.itemsize * t.slots + t.values.itemsize * len(t.values) for t in self.tiers), # 📏 固定内存
+            "samples": self.samples, # 📈 采样次数
+            "max_points": self.max_points, # 🧮 点数上限
+        } # 📊 历史统计
+
+global_cost_history = CostHistory()
@@ -10,6 +10,7 @@
    ========================================================================== */
 
 // 📦 引入依赖
+use std::sync::Mutex;
 use std::sync::atomic::{AtomicU64, AtomicUsize, Ordering};
 use serde::Serialize;
 
@@ -43,6 +44,7 @@ pub struct CostMonitor {
     ai_input_tokens: AtomicU64, // 🧠 AI 输入 Token
     ai_output_tokens: AtomicU64, // 🧠 AI 输出 Token
     ai_cost_usd: AtomicU64, // 💰 AI 成本 (微美元)
+    last_batch: Mutex<(String, u64)>, // 🔢 最近记账的批次 (epoch, batch_id)
 }
 
 impl CostMonitor {
@@ -70,9 +72,32 @@ impl CostMonitor {
             ai_input_tokens: AtomicU64::new(0), // 🔢 初始化 AI 输入
             ai_output_tokens: AtomicU64::new(0), // 🔢 初始化 AI 输出
             ai_cost_usd: AtomicU64::new(0), // 🔢 初始化 AI 成本
+            last_batch: Mutex::new((String::new(), 0)), // 🔢 尚无批次
         }
     }
 
+    pub fn accept_batch(&self, epoch: &str, batch_id: u64) -> bool {
+        // =============================================================================
+        //  🎉 批次去重 (命名空间，批次号)
+        //
+        //  🎨 代码用途:
+        //      同一 epoch 内批次号单调递增，不大于已记账批次号的视为重发。
+        //
+        //  💡 易懂解释:
+        //      "这张单子交过了吗？"
+        //
+        //  ⚠️ 警告:
+        //      [内存]: 只记住最近一个批次；Rust 重启后计数器本身也清零，不会重复记账。
+        //
+        //  ⚙️ 触发源:
+        //      Through Energy/Gateway.rs "cost_handler" -> accept_batch
+        // =============================================================================
+        let mut last = self.last_batch.lock().unwrap(); // 🔒 加锁
+        if last.0 == epoch && batch_id <= last.1 { return false; } // 🔁 重发
+        *last = (epoch.to_string(), batch_id); // 📝 记录批次
+        true // ✅ 首次
+    }
+
     pub fn track_ws(&self, tx: usize, rx: usize) {
         // =============================================================================
         //  🎉 记录 WebSocket 流量 (发送量，接收量)
@@ -144,32 +144,33 @@ pub async fn broadcast_handler(
 
 #[derive(Deserialize)]
 pub struct CostUpdateReq {
-    pub kind: String, // 🏷️ 类型 (browser, ws, ai)
+    pub kind: String, // 🏷️ 类型 (browser, ws, ai, batch)
     pub tx: Option<usize>, // 📤 发送字节数
     pub rx: Option<usize>, // 📥 接收字节数
     pub input_tokens: Option<u64>, // 📥 输入 Token 数
     pub output_tokens: Option<u64>, // 📤 输出 Token 数
     pub cost_usd: Option<f64>, // 💰 产生费用 (USD)
+    pub epoch: Option<String>, // 🏷️ 批次命名空间 (batch)
+    pub batch_id: Option<u64>, // 🔢 批次号 (batch，用于去重)
+    #[serde(default)]
+    pub items: Vec<CostUpdateReq>, // 📦 批次条目 (batch)
 }
 
-pub async fn cost_handler(
-    State(state): State<Arc<AppState>>,
-    Json(req): Json<CostUpdateReq>,
-) -> Json<serde_json::Value> {
+fn apply_cost(state: &AppState, req: &CostUpdateReq) {
     // =============================================================================
-    //  🎉 成本更新 (状态, 请求)
+    //  🎉 记录单条成本 (状态, 条目)
     //
     //  🎨 代码用途:
-    //      接收来自 Python 端的成本报告。
+    //      按类型把一条成本记入 CostMonitor。
     //
     //  💡 易懂解释:
-    //      Python 汇报："刚才用了多少流量，花了多少钱。"
+    //      一笔一笔地记账。
     //
     //  ⚠️ 警告:
-    //      无。
+    //      嵌套的 batch 条目会被忽略。
     //
     //  ⚙️ 触发源:
-    //      Through Brain/Main.rs "Route Def" -> cost_handler
+    //      Through Energy/Gateway.rs "cost_handler" -> apply_cost
     // =============================================================================
     match req.kind.as_str() { // 🚦 匹配类型
         "browser" => { // 🌐 浏览器流量
@@ -187,7 +188,40 @@ pub async fn cost_handler(
         },
         _ => {} // 🤐 忽略其他
     }
-    Json(serde_json::json!({"status": "ok"})) // ✅ 返回成功
+}
+
+pub async fn cost_handler(
+    State(state): State<Arc<AppState>>,
+    Json(req): Json<CostUpdateReq>,
+) -> Json<serde_json::Value> {
+    // =============================================================================
+    //  🎉 成本更新 (状态, 请求)
+    //
+    //  🎨 代码用途:
+    //      接收来自 Python 端的成本报告。
+    //
+    //  💡 易懂解释:
+    //      Python 汇报："刚才用了多少流量，花了多少钱。"
+    //
+    //  ⚠️ 警告:
+    //      [批次]: kind=batch 时逐条记录 items；带 epoch + batch_id 的批次只记一次，重发返回 duplicate。
+    //
+    //  ⚙️ 触发源:
+    //      Through Brain/Main.rs "Route Def" -> cost_handler
+    // =============================================================================
+    if req.kind != "batch" { // 🚦 单条报告 (旧格式)
+        apply_cost(&state, &req); // 🧾 记录
+        return Json(serde_json::json!({"status": "ok"})); // ✅ 返回成功
+    }
+    if let (Some(epoch), Some(batch_id)) = (req.epoch.as_deref(), req.batch_id) { // 🏷️ 带批次号
+        if !state.cost_monitor.accept_batch(epoch, batch_id) { // 🔁 已记过账
+            return Json(serde_json::json!({"status": "duplicate"})); // ✅ 幂等返回
+        }
+    }
+    for item in &req.items { // 🔄 逐条记录
+        apply_cost(&state, item); // 🧾 记录
+    }
+    Json(serde_json::json!({"status": "ok", "items": req.items.len()})) // ✅ 返回成功
 }
 
 #[derive(Deserialize)]
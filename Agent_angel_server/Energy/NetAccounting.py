@@ -0,0 +1,236 @@
+# ==========================================================================
+#  📃 文件功能 : 浏览器流量精确计量
+#  ⚡ 逻辑摘要 : 通过页面级 CDP 会话订阅 Network 事件，按请求行 + 实际请求头 (requestWillBeSentExtraInfo) 计发送字节，
+#               按 Network.loadingFinished.encodedDataLength 计接收字节；分资源类型、分域名汇总到有界聚合表。
+#  💡 易懂解释 : 不再看 "快递单上写的重量"，而是让浏览器告诉我们实际过秤的重量！
+#  🔋 未来扩展 : 支持 WebSocket 帧计量 (Network.webSocketFrameSent/Received)，支持按用户的分域名统计。
+#  📊 当前状态 : 活跃 (更新: 2026-10-17)
+#  🧱 Energy/NetAccounting.py 踩坑记录 (累积，勿覆盖) :
+#     1. [2026-10-17] [待验证] [HTTP/2]: 请求头按 HTTP/1.1 文本大小计算，HTTP/2 的 HPACK 压缩会让实际发送更小。 -> 作为上界使用。
+# ==========================================================================
+
+import sys
+import os
+from urllib.parse import urlsplit
+
+# 🛠️ 确保能导入 Memory 和 Body 模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Memory.Config import NET_BREAKDOWN_MAX_DOMAINS, NET_PENDING_MAX
+from Energy.SessionCost import global_session_cost
+from Body.RequestPolicy import global_size_model
+
+OTHER_DOMAIN = "(other)" # 🗂️ 超出上限的域名归并桶
+CACHE_HEADER = "x-angel-cache" # 🏷️ 共享缓存路由标记 (与 Body/HttpCache.py CACHE_HIT_HEADER 一致)
+
+class TrafficBreakdown:
+    # =============================================================================
+    #  🎉 流量分类汇总
+    #
+    #  🎨 代码用途:
+    #      按资源类型和域名累计 [请求数, 发送字节, 接收字节]，域名条目数有上限，超出的并入 "(other)"。
+    #
+    #  💡 易懂解释:
+    #      看看流量都花在了哪种文件、哪个网站上！
+    #
+    #  ⚠️ 警告:
+    #      [有界]: 资源类型本身有限；域名最多 NET_BREAKDOWN_MAX_DOMAINS 个，先到先得。
+    #
+    #  ⚙️ 触发源:
+    #      Through Energy/NetAccounting.py "CdpByteMeter" / Body/Playwright.py "Network Event" -> TrafficBreakdown
+    # =============================================================================
+    def __init__(self, max_domains=NET_BREAKDOWN_MAX_DOMAINS):
+        self.max_domains = max_domains # 🧮 域名上限
+        self.by_type = {} # {resource_type: [requests, tx, rx]} # 🗂️ 分类型
+        self.by_domain = {} # {host: [requests, tx, rx]} # 🌐 分域名
+        self.overflow = 0 # 📈 并入 (other) 的次数
+
+    def add(self, resource_type, host, tx=0, rx=0, requests=0):
+        # =============================================================================
+        #  🎉 累加 (资源类型，主机名，发送，接收，请求数)
+        #
+        #  🎨 代码用途:
+        #      同时累加到分类型和分域名两张表。
+        #
+        #  💡 易懂解释:
+        #      记一笔，分别记到 "文件种类" 和 "网站" 两页上！
+        #
+        #  ⚠️ 警告:
+        #      [热路径]: 每个请求调用一到两次，只做字典查找与整数加法。
+        #
+        #  ⚙️ 触发源:
+        #      Through Energy/NetAccounting.py "_finish" -> add
+        # =============================================================================
+        row = self.by_type.get(resource_type) # 🗂️ 类型行
+        if row is None: row = self.by_type[resource_type] = [0, 0, 0] # 📝 新类型
+        row[0] += requests; row[1] += tx; row[2] += rx # ➕ 累加
+        row = self.by_domain.get(host) # 🌐 域名行
+        if row is None: # 🚦 新域名
+            if len(self.by_domain) >= self.max_domains: # 🚦 已满
+                self.overflow += 1 # 📈 溢出计数
+                host = OTHER_DOMAIN # 🗂️ 并入其他
+                row = self.by_domain.get(host) # 🌐 其他行
+            if row is None: row = self.by_domain[host] = [0, 0, 0] # 📝 新行
+        row[0] += requests; row[1] += tx; row[2] += rx # ➕ 累加
+
+    def get_stats(self, top=20):
+        # =============================================================================
+        #  🎉 获取统计 (域名前 N)
+        #
+        #  🎨 代码用途:
+        #      返回全部资源类型与接收字节最多的前 N 个域名。
+        #
+        #  💡 易懂解释:
+        #      流量排行榜！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/cost/traffic" -> get_stats
+        # =============================================================================
+        as_dict = lambda r: {"requests": r[0], "tx": r[1], "rx": r[2]} # 📦 行转字典
+        domains = sorted(self.by_domain.items(), key=lambda kv: kv[1][2], reverse=True)[:max(0, top)] # 🏆 接收最多的域名
+        return {
+            "by_type": {k: as_dict(r) for k, r in sorted(self.by_type.items(), key=lambda kv: kv[1][2], reverse=True)}, # 🗂️ 分类型
+            "by_domain": {k: as_dict(r) for k, r in domains}, # 🌐 分域名
+            "domains": len(self.by_domain), # 🔢 域名数
+            "max_domains": self.max_domains, # 🧮 域名上限
+            "overflow": self.overflow, # 📈 溢出次数
+        } # 📦 统计结果
+
+global_traffic = TrafficBreakdown()
+
+def header_bytes(headers):
+    return sum(len(k) + len(v) + 4 for k, v in headers.items()) + 2 # 📏 "Name: Value\r\n" 逐行 + 空行
+
+class CdpByteMeter:
+    # =============================================================================
+    #  🎉 CDP 字节计量器
+    #
+    #  🎨 代码用途:
+    #      在页面的 CDP 会话上开启 Network 域 (不缓存响应体)，以 requestId 关联各事件，
+    #      请求结束时把真实字节数记入用户账本、分类汇总和资源大小模型。
+    #
+    #  💡 易懂解释:
+    #      给每个页面装一块电表，每个请求走完才抄一次数！
+    #
+    #  ⚠️ 警告:
+    #      [共享缓存]: 带 x-angel-cache 头的响应由路由自行计量: hit 不计，miss 只计发送。
+    #      [被拦截]: 被请求策略拦截 (blockedReason) 的请求没有发出，不计。
+    #      [重定向]: 每一跳的响应字节取 redirectResponse.encodedDataLength。
+    #      [有界]: 未完成请求超过 NET_PENDING_MAX 时丢弃最早的条目 (计入 evicted)。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/Playwright.py "get_or_create_session (cdp 模式)" -> CdpByteMeter
+    # =============================================================================
+    def __init__(self, user_id):
+        self.user_id = user_id # 👤 所属用户
+        self.cdp = None # 🔌 CDP 会话
+        self.pending = {} # {requestId: [resource_type, host, tx, cache_flag]} # ⏳ 未完成请求
+        self.stats = {"finished": 0, "failed": 0, "blocked": 0, "cached": 0, "evicted": 0, "tx": 0, "rx": 0} # 📊 计数器
+
+    async def attach(self, page):
+        # =============================================================================
+        #  🎉 挂载 (页面)
+        #
+        #  🎨 代码用途:
+        #      建立 CDP 会话、订阅事件并开启 Network 域，返回是否成功。
+        #
+        #  💡 易懂解释:
+        #      把电表接上！
+        #
+        #  ⚠️ 警告:
+        #      [缓冲]: maxTotalBufferSize / maxResourceBufferSize 设为 0，Chromium 不为我们保留响应体。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "get_or_create_session" -> attach
+        # =============================================================================
+        try:
+            self.cdp = await page.context.new_cdp_session(page) # 🔌 建立 CDP 会话
+            self.cdp.on("Network.requestWillBeSent", self._on_request) # 📤 请求行
+            self.cdp.on("Network.requestWillBeSentExtraInfo", self._on_request_extra) # 📤 实际请求头
+            self.cdp.on("Network.responseReceived", self._on_response) # 📥 响应头 (缓存标记)
+            self.cdp.on("Network.loadingFinished", self._on_finished) # ✅ 完成
+            self.cdp.on("Network.loadingFailed", self._on_failed) # ❌ 失败
+            await self.cdp.send("Network.enable", {"maxTotalBufferSize": 0, "maxResourceBufferSize": 0, "maxPostDataSize": 0}) # 📡 开启 Network 域
+            return True # ✅ 成功
+        except Exception as e: # 🚨 挂载失败
+            print(f"⚠️ [NetAccounting] CDP 计量开启失败，回退到响应头计量: {e}") # 📢 打印警告
+            self.cdp = None # 🔙 清空
+            return False # ❌ 失败
+
+    def _entry(self, rid):
+        entry = self.pending.get(rid) # ⏳ 查找条目
+        if entry is None: # 🚦 新请求 (两类请求事件顺序不固定)
+            if len(self.pending) >= NET_PENDING_MAX: # 🚦 已满
+                self.pending.pop(next(iter(self.pending))) # 🗑️ 丢弃最早
+                self.stats["evicted"] += 1 # 📈 丢弃计数
+            entry = self.pending[rid] = ["other", "", 0, None] # 📝 新条目
+        return entry # 📤 返回条目
+
+    def _on_request(self, params):
+        rid = params["requestId"] # 🔑 请求 ID
+        redirect = params.get("redirectResponse") # ↪️ 上一跳响应
+        if redirect and rid in self.pending: # 🚦 重定向
+            prev = self.pending.pop(rid) # ⏳ 上一跳
+            self._account(prev, int(redirect.get("encodedDataLength", 0) or 0)) # 🧾 结算上一跳
+        request = params.get("request") or {} # 📨 请求
+        parts = urlsplit(request.get("url", "")) # ✂️ 拆分 URL
+        if parts.scheme not in ("http", "https"): return # 🛑 data: / blob: 等不走网络
+        entry = self._entry(rid) # ⏳ 条目
+        entry[0] = (params.get("type") or "Other").lower() # 🗂️ 资源类型 (与 Playwright resource_type 同名)
+        entry[1] = (parts.hostname or "").lower() # 🌐 主机名
+        entry[2] += len(request.get("method", "GET")) + len(parts.path or "/") + len(parts.query) + 12 # 📏 请求行 "METHOD path?query HTTP/1.1\r\n"
+
+    def _on_request_extra(self, params):
+        headers = params.get("headers") or {} # 📋 实际请求头
+        entry = self._entry(params["requestId"]) # ⏳ 条目
+        length = next((v for k, v in headers.items() if k.lower() == "content-length"), 0) # 📏 请求体长度
+        entry[2] += header_bytes(headers) + (int(length) if str(length).isdigit() else 0) # 📏 请求头 + 请求体
+
+    def _on_response(self, params):
+        headers = (params.get("response") or {}).get("headers") or {} # 📋 响应头
+        flag = next((v for k, v in headers.items() if k.lower() == CACHE_HEADER), None) # 🏷️ 缓存标记
+        if flag and params["requestId"] in self.pending: self.pending[params["requestId"]][3] = flag # 🏷️ 记录标记
+
+    def _on_finished(self, params):
+        entry = self.pending.pop(params["requestId"], None) # ⏳ 取出条目
+        if entry is None: return # 🛑 未知请求
+        self.stats["finished"] += 1 # 📈 完成计数
+        self._account(entry, int(params.get("encodedDataLength", 0) or 0)) # 🧾 结算
+
+    def _on_failed(self, params):
+        entry = self.pending.pop(params["requestId"], None) # ⏳ 取出条目
+        if entry is None: return # 🛑 未知请求
+        if params.get("blockedReason") or params.get("errorText") == "net::ERR_BLOCKED_BY_CLIENT": # 🚦 被拦截
+            self.stats["blocked"] += 1 # 📈 拦截计数
+            return # 🔙 没有发出
+        self.stats["failed"] += 1 # 📈 失败计数
+        self._account(entry, 0) # 🧾 只计发送
+
+    def _account(self, entry, rx):
+        # =============================================================================
+        #  🎉 结算 (条目，接收字节)
+        #
+        #  🎨 代码用途:
+        #      按缓存标记修正后写入用户账本、分类汇总和资源大小模型。
+        #
+        #  💡 易懂解释:
+        #      抄表入账！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Energy/NetAccounting.py "_on_finished / _on_failed / _on_request (重定向)" -> _account
+        # =============================================================================
+        rtype, host, tx, flag = entry # 📦 条目
+        if flag == "hit": # 🚦 共享缓存命中
+            self.stats["cached"] += 1 # 📈 命中计数
+            return # 🔙 没有网络流量
+        if flag == "miss": rx = 0 # 📥 接收已由缓存路由计量
+        elif rx: global_size_model.observe(rtype, rx) # 📊 更新类型平均大小
+        global_session_cost.track_browser(self.user_id, tx=tx, rx=rx) # 👤 用户账本
+        global_traffic.add(rtype, host, tx, rx, 1) # 🗂️ 分类汇总
+        self.stats["tx"] += tx # 📤 发送累计
+        self.stats["rx"] += rx # 📥 接收累计
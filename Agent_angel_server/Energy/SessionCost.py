@@ -0,0 +1,245 @@
+# ==========================================================================
+#  📃 文件功能 : 分用户成本账本
+#  ⚡ 逻辑摘要 : 每个 user_id 一条 __slots__ 紧凑记录，浏览器请求/响应钩子和模型记账直接写入；
+#               网络增量在每次成本上报前汇总 (rollup) 到全局 Netstat 增量，支持按指标取 Top-N。
+#  💡 易懂解释 : 以前只知道全家一共花了多少钱，现在每个人的账单都分开记！
+#  🔋 未来扩展 : 支持按租户聚合，支持账本持久化。
+#  📊 当前状态 : 活跃 (更新: 2026-10-17)
+#  🧱 Energy/SessionCost.py 踩坑记录 (累积，勿覆盖) :
+#     1. [2026-10-17] [待验证] [循环导入]: Tasks 导入 Gemini，Gemini 需要记分用户账。 -> 账本独立成模块，只依赖 Config (及同样只依赖 Config/Scheduler 的 Budget)。
+# ==========================================================================
+
+import heapq
+import sys
+import os
+import time
+
+# 🛠️ 确保能导入 Memory 和 Energy 模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Memory.Config import COST_SESSIONS_MAX, PRICING_TABLE
+from Energy.Budget import global_budget
+
+GB = 1_073_741_824 # 📏 1 GB 字节数
+
+class SessionCost:
+    # =============================================================================
+    #  🎉 单用户账目
+    #
+    #  🎨 代码用途:
+    #      保存一个用户的流量、请求数、模型用量与成本，pending_* 为尚未汇总到全局的网络增量。
+    #
+    #  💡 易懂解释:
+    #      每个人一张小账单！
+    #
+    #  ⚠️ 警告:
+    #      [紧凑]: 使用 __slots__，不带 __dict__，一万个用户也只占很少内存。
+    #
+    #  ⚙️ 触发源:
+    #      Through Energy/SessionCost.py "SessionCostLedger" -> SessionCost
+    # =============================================================================
+    __slots__ = ("browser_tx", "browser_rx", "requests", "responses", "ai_calls", "input_tokens", "output_tokens",
+                 "cached_tokens", "ai_cost_usd", "cache_hits", "saved_usd", "pending_tx", "pending_rx", "first_seen", "last_seen")
+
+    def __init__(self, now):
+        self.browser_tx = self.browser_rx = self.requests = self.responses = 0 # 🌐 流量与请求数
+        self.ai_calls = self.input_tokens = self.output_tokens = self.cached_tokens = self.cache_hits = 0 # 🧠 模型用量
+        self.ai_cost_usd = self.saved_usd = 0.0 # 💰 模型成本与缓存节省
+        self.pending_tx = self.pending_rx = 0 # ➕ 待汇总网络增量
+        self.first_seen = self.last_seen = now # ⏱️ 首次/最近活跃
+
+    @property
+    def net_cost_usd(self):
+        return self.browser_tx / GB * PRICING_TABLE["network_egress"] # 💸 网络成本 (与 Rust CostMonitor 一致，按发送字节计)
+
+    @property
+    def cost_usd(self):
+        return self.ai_cost_usd + self.net_cost_usd # 💰 总成本
+
+    def to_dict(self):
+        return {
+            "browser_tx": self.browser_tx, # 📤 浏览器发送
+            "browser_rx": self.browser_rx, # 📥 浏览器接收
+            "bytes": self.browser_tx + self.browser_rx, # 📏 总字节
+            "requests": self.requests, # 🔢 请求数
+            "responses": self.responses, # 🔢 响应数
+            "ai_calls": self.ai_calls, # 🧠 模型调用
+            "input_tokens": self.input_tokens, # 📥 输入 Token
+            "output_tokens": self.output_tokens, # 📤 输出 Token
+            "cached_tokens": self.cached_tokens, # 🗃️ 缓存 Token
+            "cache_hits": self.cache_hits, # 🎯 规划缓存命中
+            "saved_usd": round(self.saved_usd, 6), # 💰 缓存节省
+            "ai_cost_usd": round(self.ai_cost_usd, 6), # 🧠 模型成本
+            "net_cost_usd": round(self.net_cost_usd, 6), # 🌐 网络成本
+            "cost_usd": round(self.cost_usd, 6), # 💰 总成本
+            "first_seen": round(self.first_seen, 3), # ⏱️ 首次活跃
+            "last_seen": round(self.last_seen, 3), # ⏱️ 最近活跃
+        } # 📦 账目
+
+RANK_KEYS = {
+    "cost_usd": lambda c: c.cost_usd, # 💰 总成本
+    "ai_cost_usd": lambda c: c.ai_cost_usd, # 🧠 模型成本
+    "bytes": lambda c: c.browser_tx + c.browser_rx, # 📏 总字节
+    "tokens": lambda c: c.input_tokens + c.output_tokens, # 🧮 总 Token
+    "requests": lambda c: c.requests, # 🔢 请求数
+    "ai_calls": lambda c: c.ai_calls, # 🧠 模型调用
+} # 🏆 可排序指标
+
+class SessionCostLedger:
+    # =============================================================================
+    #  🎉 分用户账本
+    #
+    #  🎨 代码用途:
+    #      按 user_id 记账；rollup() 把各用户待汇总的网络增量合计后写入全局 Netstat；top() 按指标取前 N 名。
+    #
+    #  💡 易懂解释:
+    #      一本按人分页的账本，随时能看出谁花得最多！
+    #
+    #  ⚠️ 警告:
+    #      [容量]: 超过 COST_SESSIONS_MAX 时淘汰最久未活跃的用户，其待汇总增量先并入 orphan 再汇总，全局总数不丢。
+    #      [单事件循环]: 仅在事件循环线程内调用。
+    #
+    #  ⚙️ 触发源:
+    #      Through Body/Playwright.py "Network Event" / Body/Gemini.py "_record" -> SessionCostLedger
+    # =============================================================================
+    def __init__(self, max_sessions=COST_SESSIONS_MAX):
+        self.max_sessions = max_sessions # 🧮 账本上限
+        self.sessions = {} # {user_id: SessionCost} (插入顺序近似活跃顺序) # 📒 分用户账目
+        self.dirty = set() # {user_id} 有待汇总网络增量的用户 # 🚩 待汇总
+        self.orphan_tx = 0 # ➕ 已淘汰用户的待汇总发送
+        self.orphan_rx = 0 # ➕ 已淘汰用户的待汇总接收
+        self.evictions = 0 # 📈 淘汰次数
+        self.total_tx = 0 # 📤 全部用户累计发送 (含未汇总)
+        self.total_rx = 0 # 📥 全部用户累计接收 (含未汇总)
+
+    def _get(self, user_id):
+        user_id = user_id or "anonymous" # 🏷️ 匿名归类
+        now = time.time() # ⏱️ 当前时间
+        entry = self.sessions.get(user_id) # 🔍 查找账目
+        if entry is None: # 🚦 新用户
+            if len(self.sessions) >= self.max_sessions: self._evict() # 🗑️ 腾出位置
+            entry = self.sessions[user_id] = SessionCost(now) # 📝 新建账目
+        entry.last_seen = now # ⏱️ 刷新活跃
+        return user_id, entry # 📤 返回账目
+
+    def _evict(self):
+        uid = min(self.sessions, key=lambda u: self.sessions[u].last_seen) # 🎯 最久未活跃
+        entry = self.sessions.pop(uid) # 🗑️ 移除
+        self.orphan_tx += entry.pending_tx # ➕ 保留待汇总发送
+        self.orphan_rx += entry.pending_rx # ➕ 保留待汇总接收
+        self.dirty.discard(uid) # 🧹 清除标记
+        self.evictions += 1 # 📈 淘汰计数
+
+    def track_browser(self, user_id, tx=0, rx=0):
+        # =============================================================================
+        #  🎉 记录浏览器流量 (用户ID，发送量，接收量)
+        #
+        #  🎨 代码用途:
+        #      累加该用户的流量与请求/响应次数，并记入待汇总增量。
+        #
+        #  💡 易懂解释:
+        #      "这个人刚才上网用了多少流量？"
+        #
+        #  ⚠️ 警告:
+        #      [热路径]: 每个请求与响应都会调用，只做整数加法与一次字典查找。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Playwright.py "page.on(request/response) / _serve_cached" -> track_browser
+        # =============================================================================
+        user_id, entry = self._get(user_id) # 📒 用户账目
+        entry.browser_tx += tx # 📤 发送
+        entry.browser_rx += rx # 📥 接收
+        entry.requests += 1 if tx else 0 # 🔢 请求数
+        entry.responses += 1 if rx else 0 # 🔢 响应数
+        entry.pending_tx += tx # ➕ 待汇总发送
+        entry.pending_rx += rx # ➕ 待汇总接收
+        self.total_tx += tx # 📤 全局累计发送
+        self.total_rx += rx # 📥 全局累计接收
+        self.dirty.add(user_id) # 🚩 标记待汇总
+        global_budget.charge(user_id, tx / GB * PRICING_TABLE["network_egress"], tx + rx) # 💳 计入预算
+
+    def track_ai(self, user_id, in_tok, out_tok, cached, cost):
+        # =============================================================================
+        #  🎉 记录模型用量 (用户ID，输入，输出，缓存，成本)
+        #
+        #  🎨 代码用途:
+        #      累加该用户的模型调用次数、Token 与成本。
+        #
+        #  💡 易懂解释:
+        #      "这个人刚才问大脑花了多少钱？"
+        #
+        #  ⚠️ 警告:
+        #      [全局]: 全局模型增量仍由 AICostTracker 直接维护，这里只做归属。
+        #
+        #  ⚙️ 触发源:
+        #      Through Body/Gemini.py "_record" -> track_ai
+        # =============================================================================
+        user_id, entry = self._get(user_id) # 📒 用户账目
+        entry.ai_calls += 1 # 🔢 调用次数
+        entry.input_tokens += in_tok # 📥 输入
+        entry.output_tokens += out_tok # 📤 输出
+        entry.cached_tokens += cached # 🗃️ 缓存
+        entry.ai_cost_usd += cost # 💰 成本
+        global_budget.charge(user_id, cost) # 💳 计入预算
+
+    def track_cache_hit(self, user_id, saved_usd):
+        _, entry = self._get(user_id) # 📒 用户账目
+        entry.cache_hits += 1 # 🎯 命中次数
+        entry.saved_usd += saved_usd # 💰 节省金额
+
+    def rollup(self, netstat):
+        # =============================================================================
+        #  🎉 汇总到全局 (全局 Netstat)
+        #
+        #  🎨 代码用途:
+        #      只遍历有待汇总增量的用户，把合计一次性写入全局网络增量，返回 (发送, 接收)。
+        #
+        #  💡 易懂解释:
+        #      把每个人的小账单加起来，抄到总账上！
+        #
+        #  ⚠️ 警告:
+        #      [时机]: 成本上报每个周期先调用本方法，再取出全局增量。
+        #
+        #  ⚙️ 触发源:
+        #      Through Energy/Tasks.py "CostReporter.tick" -> rollup
+        # =============================================================================
+        tx, rx = self.orphan_tx, self.orphan_rx # ➕ 已淘汰用户的增量
+        for uid in self.dirty: # 🔄 遍历待汇总
+            entry = self.sessions.get(uid) # 📒 用户账目
+            if entry is None: continue # 🛑 已淘汰
+            tx += entry.pending_tx # ➕ 发送
+            rx += entry.pending_rx # ➕ 接收
+            entry.pending_tx = entry.pending_rx = 0 # 🧹 清零
+        self.dirty.clear() # 🧹 清除标记
+        self.orphan_tx = self.orphan_rx = 0 # 🧹 清零
+        if tx or rx: netstat.track_browser(tx=tx, rx=rx) # 📤 写入全局
+        return tx, rx # 📤 返回合计
+
+    def get(self, user_id):
+        entry = self.sessions.get(user_id) # 🔍 查找账目
+        return entry.to_dict() if entry else None # 📤 返回账目
+
+    def top(self, n=10, by="cost_usd"):
+        # =============================================================================
+        #  🎉 排行榜 (数量，指标)
+        #
+        #  🎨 代码用途:
+        #      按指定指标取前 N 个用户，O(用户数 × log N)。
+        #
+        #  💡 易懂解释:
+        #      看看谁是 "花钱大户"！
+        #
+        #  ⚠️ 警告:
+        #      [指标]: by 必须是 RANK_KEYS 之一，否则抛出 ValueError。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/cost/sessions" -> top
+        # =============================================================================
+        if by not in RANK_KEYS: raise ValueError(f"unknown metric: {by} (expected one of {', '.join(RANK_KEYS)})") # 🛑 未知指标
+        key = RANK_KEYS[by] # 🏆 排序函数
+        best = heapq.nlargest(max(0, n), self.sessions.items(), key=lambda kv: key(kv[1])) # 🏆 前 N 名
+        return [{"user_id": uid, **entry.to_dict()} for uid, entry in best] # 📤 排行结果
+
+    def get_stats(self):
+        return {"tracked": len(self.sessions), "max_sessions": self.max_sessions, "pending_users": len(self.dirty), "evictions": self.evictions} # 📊 账本统计
+
+global_session_cost = SessionCostLedger()
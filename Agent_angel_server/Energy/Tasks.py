@@ -3,19 +3,28 @@
 #  ⚡ 逻辑摘要 : 负责周期性任务，如成本数据同步、状态检查等。
 #  💡 易懂解释 : 机器人的 "心跳"，每隔几秒钟把账单发给总部。
 #  🔋 未来扩展 : 支持更多类型的后台任务，如日志轮转、缓存清理。
-#  📊 当前状态 : 活跃 (更新: 2025-12-06)
+#  📊 当前状态 : 活跃 (更新: 2026-10-17)
 #  🧱 Energy/Tasks.py 踩坑记录 (累积，勿覆盖) :
 #     1. [2025-12-04] [已修复] [连接错误]: 如果 Rust 服务未启动，同步会报错。 -> 增加了 try-except 忽略连接错误。
+#     2. [2026-10-17] [已修复] [账单丢失]: 忽略错误导致 Rust 重启期间的增量被静默丢弃。 -> 批次冻结重试 + 落盘文件 + batch_id 去重。
 # ==========================================================================
 
 import asyncio
 import httpx
+import json
+import random
 import sys
 import os
+import time
+import uuid
 
 # 🛠️ 确保能导入 Body 模块
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from Body.Gemini import global_ai_cost
+from Energy.SessionCost import global_session_cost, GB
+from Energy.CostHistory import global_cost_history
+from Memory.Config import PRICING_TABLE, COST_HISTORY_TIERS
+from Memory.Config import SESSION_REAP_INTERVAL_S, CORE_API_BASE, COST_SYNC_INTERVAL_S, COST_SYNC_BACKOFF_MAX_S, COST_SYNC_TIMEOUT_S, COST_SPOOL_PATH, COST_SPOOL_MAX_BYTES
 
 class Netstat:
     # =============================================================================
@@ -97,7 +106,7 @@ class Netstat:
         #      无。
         #
         #  ⚙️ 触发源:
-        #      Through Body/Playwright.py "Network Event" -> track_browser
+        #      Through Energy/SessionCost.py "rollup" -> track_browser
         # =============================================================================
         self.browser_tx += tx # 📈 累加发送
         self.browser_rx += rx # 📈 累加接收
@@ -132,6 +141,289 @@ class Netstat:
 
 global_net_cost = Netstat()
 
+COST_FIELDS = ("browser_tx", "browser_rx", "ws_tx", "ws_rx", "input_tokens", "output_tokens", "cached_tokens", "cost_usd") # 🧾 账单字段
+RETRYABLE_STATUSES = (0, 408, 429) # 🔁 可重试状态码 (0 表示网络异常，5xx 另行判断)
+
+def _zero_deltas():
+    return dict.fromkeys(COST_FIELDS, 0) # 🧾 空账单
+
+def _merge_deltas(into, d):
+    for k in COST_FIELDS: into[k] += d.get(k, 0) # ➕ 逐字段累加
+    return into # 📤 返回合并结果
+
+def _has_deltas(d):
+    return any(d[k] for k in COST_FIELDS) # 🚦 是否有非零字段
+
+class CostReporter:
+    # =============================================================================
+    #  🎉 成本上报器
+    #
+    #  🎨 代码用途:
+    #      每个周期把网络与 AI 增量合并成一个批次 POST 给 Rust Core；失败时批次保留原样重试 (有上限的指数退避)，
+    #      期间的新增量继续合并到待发账单；所有未确认增量先追加写入落盘文件，进程重启后恢复。
+    #
+    #  💡 易懂解释:
+    #      账单交不上就记在小本子上，总部恢复了再一次补交，一分钱都不丢！
+    #
+    #  ⚠️ 警告:
+    #      [恰好一次]: 批次一旦发出就冻结 (epoch + batch_id 不变)，Rust 端按 batch_id 去重，超时重发不会重复记账。
+    #      [落盘格式]: 首行 {"epoch","next_id"}，之后为 {"d": 增量} 与 {"freeze": 批次号}，freeze 之前的增量属于该批次。
+    #      [丢弃]: 只有 Rust 明确拒绝 (4xx，408/429 除外) 的批次会被丢弃，并计入 dropped_* 计数。
+    #
+    #  ⚙️ 触发源:
+    #      Through Energy/Tasks.py "cost_sync_loop" -> CostReporter
+    # =============================================================================
+    def __init__(self, url=f"{CORE_API_BASE}/internal/cost", spool_path=COST_SPOOL_PATH, max_spool_bytes=COST_SPOOL_MAX_BYTES):
+        self.url = url # 🔗 上报地址
+        self.spool_path = spool_path # 📒 落盘文件
+        self.max_spool_bytes = max_spool_bytes # 🧮 压缩阈值
+        self.epoch = uuid.uuid4().hex[:12] # 🏷️ 批次号命名空间 (随落盘文件延续)
+        self.next_id = 1 # 🔢 下一个批次号
+        self.batch = None # {"id", "deltas", "since"} (已冻结、待确认) # 📦 在途批次
+        self.pending = _zero_deltas() # 🧾 待发增量
+        self.pending_since = None # ⏱️ 最早待发增量时间
+        self.failures = 0 # 🔁 连续失败次数
+        self.next_attempt = 0.0 # ⏳ 下次允许发送 (monotonic)
+        self.last_success = None # ⏱️ 上次成功时间
+        self.last_error = "" # 🚨 最近错误
+        self.spool_bytes = 0 # 📏 落盘文件大小
+        self.client = None # 🌐 复用 HTTP 客户端
+        self.lock = asyncio.Lock() # 🔒 串行化 tick 与 flush
+        self.stats = {"batches": 0, "retries": 0, "failures": 0, "duplicates": 0, "recovered_batches": 0,
+                      "compactions": 0, "spool_errors": 0, "dropped_batches": 0, "dropped_bytes": 0, "dropped_usd": 0.0} # 📊 计数器
+        self._load() # 📥 恢复落盘账单
+
+    def _load(self):
+        # =============================================================================
+        #  🎉 恢复落盘账单 (无参数)
+        #
+        #  🎨 代码用途:
+        #      逐行回放落盘文件: freeze 之前的增量还原为在途批次 (沿用原批次号)，之后的增量还原为待发账单。
+        #
+        #  💡 易懂解释:
+        #      重启后翻开小本子，看看还有哪些账没交！
+        #
+        #  ⚠️ 警告:
+        #      [半行]: 崩溃时写了一半的末行会被跳过。
+        #
+        #  ⚙️ 触发源:
+        #      Through Energy/Tasks.py "__init__" -> _load
+        # =============================================================================
+        if not os.path.exists(self.spool_path): # 🚦 没有落盘文件
+            self._rewrite_sync() # 📝 写入文件头
+            return # 🔙 返回
+        acc, since = _zero_deltas(), None # 🧾 当前累计
+        with open(self.spool_path, "r", encoding="utf-8") as f: # 📖 读取落盘文件
+            for line in f: # 🔄 逐行回放
+                try: entry = json.loads(line) # 📦 解析
+                except ValueError: continue # 🛑 跳过半行
+                if "epoch" in entry: # 🏷️ 文件头
+                    self.epoch, self.next_id = entry["epoch"], max(self.next_id, int(entry.get("next_id", 1))) # 🏷️ 恢复命名空间
+                elif "d" in entry: # 🧾 增量
+                    _merge_deltas(acc, entry["d"]) # ➕ 累加
+                    since = since or entry.get("t") # ⏱️ 最早时间
+                elif "freeze" in entry: # 🧊 冻结标记
+                    self.batch = {"id": int(entry["freeze"]), "deltas": acc, "since": since or time.time()} # 📦 在途批次
+                    self.next_id = max(self.next_id, self.batch["id"] + 1) # 🔢 批次号前移
+                    acc, since = _zero_deltas(), None # 🧹 重新累计
+        self.pending = acc # 🧾 待发账单
+        self.pending_since = since if _has_deltas(acc) else None # ⏱️ 最早时间
+        self.spool_bytes = os.path.getsize(self.spool_path) # 📏 文件大小
+        if self.batch or self.pending_since: # 🚦 有未交账单
+            self.stats["recovered_batches"] = 1 if self.batch else 0 # 📈 恢复计数
+            print(f"📒 [Tasks] 从落盘文件恢复未上报账单 (在途批次: {self.batch['id'] if self.batch else '无'})") # 📢 打印日志
+
+    def _append_sync(self, entries):
+        line = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries) # 📝 序列化
+        with open(self.spool_path, "a", encoding="utf-8") as f: # 📒 追加写入
+            f.write(line) # 📝 写入
+            f.flush() # 💾 刷盘
+            os.fsync(f.fileno()) # 💾 落盘
+        self.spool_bytes += len(line.encode("utf-8")) # 📏 文件大小
+
+    def _rewrite_sync(self):
+        # =============================================================================
+        #  🎉 压缩落盘文件 (无参数)
+        #
+        #  🎨 代码用途:
+        #      用 文件头 + 在途批次 (合并为一行 + freeze) + 待发账单 (合并为一行) 原子替换落盘文件。
+        #
+        #  💡 易懂解释:
+        #      小本子写满了，把零碎的账誊成一行总账！
+        #
+        #  ⚠️ 警告:
+        #      [原子替换]: 先写临时文件再 os.replace，中途崩溃保留旧文件。
+        #
+        #  ⚙️ 触发源:
+        #      Through Energy/Tasks.py "_load / tick" -> _rewrite_sync
+        # =============================================================================
+        entries = [{"epoch": self.epoch, "next_id": self.next_id}] # 🏷️ 文件头
+        if self.batch: entries += [{"d": self.batch["deltas"], "t": self.batch["since"]}, {"freeze": self.batch["id"]}] # 📦 在途批次
+        if _has_deltas(self.pending): entries.append({"d": self.pending, "t": self.pending_since}) # 🧾 待发账单
+        os.makedirs(os.path.dirname(self.spool_path), exist_ok=True) # 📁 确保目录
+        tmp = self.spool_path + ".tmp" # 📄 临时文件
+        with open(tmp, "w", encoding="utf-8") as f: # 📝 写临时文件
+            f.write("".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries)) # 📝 写入
+            f.flush() # 💾 刷盘
+            os.fsync(f.fileno()) # 💾 落盘
+        os.replace(tmp, self.spool_path) # 🔁 原子替换
+        self.spool_bytes = os.path.getsize(self.spool_path) # 📏 文件大小
+
+    async def _spool(self, fn, *args):
+        try: await asyncio.to_thread(fn, *args) # 🧵 线程池写盘
+        except OSError as e: # 🚨 写盘失败 (账单仍在内存中)
+            self.stats["spool_errors"] += 1 # 📈 错误计数
+            print(f"⚠️ [Tasks] 成本落盘失败: {e}") # 📢 打印警告
+
+    def _get_client(self):
+        if self.client is None: # 🚦 首次使用
+            self.client = httpx.AsyncClient(timeout=COST_SYNC_TIMEOUT_S, limits=httpx.Limits(max_connections=2, max_keepalive_connections=1)) # 🌐 长连接客户端
+        return self.client # 📤 返回客户端
+
+    @staticmethod
+    def _items(d):
+        items = [] # 📋 批次条目
+        for kind in ("browser", "ws"): # 🔄 流量类
+            if d[f"{kind}_tx"] or d[f"{kind}_rx"]: items.append({"kind": kind, "tx": d[f"{kind}_tx"], "rx": d[f"{kind}_rx"]}) # 🌐 流量条目
+        if d["input_tokens"] or d["output_tokens"] or d["cost_usd"]: # 🚦 有 AI 用量
+            items.append({"kind": "ai", "input_tokens": d["input_tokens"], "output_tokens": d["output_tokens"],
+                          "cached_tokens": d["cached_tokens"], "cost_usd": d["cost_usd"]}) # 🧠 AI 条目
+        return items # 📤 返回条目
+
+    async def _send(self, batch):
+        payload = {"kind": "batch", "epoch": self.epoch, "batch_id": batch["id"], "items": self._items(batch["deltas"])} # 📦 批次报告
+        try:
+            resp = await self._get_client().post(self.url, json=payload) # 📮 发送
+            if resp.status_code == 200 and '"duplicate"' in resp.text: self.stats["duplicates"] += 1 # 🔁 已记过账
+            return resp.status_code, "" if resp.status_code < 400 else resp.text[:200] # 📤 状态码
+        except Exception as e: # 🚨 网络异常
+            return 0, f"{type(e).__name__}: {e}" # 📤 视为可重试
+
+    async def tick(self, force=False):
+        # =============================================================================
+        #  🎉 上报一次 (是否忽略退避)
+        #
+        #  🎨 代码用途:
+        #      汇总分用户增量 -> 取出增量并落盘 -> 未在退避期则冻结待发账单为新批次 (或重试在途批次) -> 发送 -> 按结果确认、丢弃或退避。
+        #
+        #  💡 易懂解释:
+        #      记账、交账、看回执，三步走！
+        #
+        #  ⚠️ 警告:
+        #      [退避]: 间隔为 COST_SYNC_INTERVAL_S × 2^(失败次数-1)，上限 COST_SYNC_BACKOFF_MAX_S，带 50% 抖动。
+        #
+        #  ⚙️ 触发源:
+        #      Through Energy/Tasks.py "cost_sync_loop / flush" -> tick
+        # =============================================================================
+        async with self.lock: # 🔒 串行
+            global_session_cost.rollup(global_net_cost) # 👤 分用户网络增量汇总到全局
+            net, ai = global_net_cost.pop_deltas(), global_ai_cost.pop_deltas() # 📊 取出增量
+            d = {"browser_tx": net["browser"]["tx"], "browser_rx": net["browser"]["rx"], "ws_tx": net["ws"]["tx"], "ws_rx": net["ws"]["rx"],
+                 "input_tokens": ai["input_tokens"], "output_tokens": ai["output_tokens"], "cached_tokens": ai.get("cached_tokens", 0), "cost_usd": ai["cost_usd"]} # 🧾 本周期增量
+            entries = [] # 📝 待落盘
+            if _has_deltas(d): # 🚦 有新增量
+                _merge_deltas(self.pending, d) # ➕ 合并到待发账单
+                self.pending_since = self.pending_since or time.time() # ⏱️ 最早时间
+                entries.append({"d": d, "t": time.time()}) # 📝 增量行
+            now = time.monotonic() # ⏱️ 当前时间
+            if not force and now < self.next_attempt: # 🚦 退避中
+                if entries: await self._spool(self._append_sync, entries) # 📒 先落盘
+                return # 🔙 等待下次
+            if self.batch is None: # 🚦 没有在途批次
+                if not _has_deltas(self.pending): # 🚦 无账可交
+                    if entries: await self._spool(self._append_sync, entries) # 📒 落盘
+                    return # 🔙 返回
+                self.batch = {"id": self.next_id, "deltas": self.pending, "since": self.pending_since} # 🧊 冻结批次
+                self.next_id += 1 # 🔢 批次号前移
+                self.pending, self.pending_since = _zero_deltas(), None # 🧹 清空待发
+                entries.append({"freeze": self.batch["id"]}) # 📝 冻结标记
+            else:
+                self.stats["retries"] += 1 # 🔁 重试计数
+            if entries: await self._spool(self._append_sync, entries) # 📒 发送前落盘
+
+            status, error = await self._send(self.batch) # 📮 发送批次
+            if 200 <= status < 300 or (400 <= status < 500 and status not in RETRYABLE_STATUSES): # 🚦 已确认或被明确拒绝
+                if status >= 400: # 🗑️ 被拒绝
+                    d = self.batch["deltas"] # 🧾 批次账单
+                    self.stats["dropped_batches"] += 1 # 📈 丢弃计数
+                    self.stats["dropped_bytes"] += d["browser_tx"] + d["browser_rx"] + d["ws_tx"] + d["ws_rx"] # 📈 丢弃字节
+                    self.stats["dropped_usd"] += d["cost_usd"] # 📈 丢弃金额
+                    print(f"❌ [Tasks] 成本批次 {self.batch['id']} 被拒绝 ({status})，已丢弃: {error}") # 📢 打印错误
+                else:
+                    self.stats["batches"] += 1 # 📈 成功计数
+                    if self.failures: print(f"✅ [Tasks] Rust Core 已恢复，补交 {time.time() - self.batch['since']:.0f} 秒内的账单") # 📢 打印恢复
+                    self.last_success = time.time() # ⏱️ 成功时间
+                self.batch, self.failures, self.next_attempt = None, 0, 0.0 # 🧹 清空在途
+                await self._spool(self._rewrite_sync) # 🗜️ 压缩落盘文件
+                return # 🔙 返回
+            self.failures += 1 # 🔁 连续失败
+            self.stats["failures"] += 1 # 📈 失败计数
+            self.last_error = error or f"HTTP {status}" # 🚨 记录错误
+            backoff = min(COST_SYNC_BACKOFF_MAX_S, COST_SYNC_INTERVAL_S * 2 ** (self.failures - 1)) # ⏳ 指数退避
+            self.next_attempt = now + backoff * random.uniform(0.5, 1.0) # 🎲 加抖动
+            if self.failures == 1: print(f"⚠️ [Tasks] 成本上报失败，账单暂存本地: {self.last_error}") # 📢 首次失败
+            if self.spool_bytes > self.max_spool_bytes: # 🚦 落盘文件过大
+                self.stats["compactions"] += 1 # 📈 压缩计数
+                await self._spool(self._rewrite_sync) # 🗜️ 合并为总账
+
+    async def flush(self):
+        # =============================================================================
+        #  🎉 立即上报并关闭 (无参数)
+        #
+        #  🎨 代码用途:
+        #      忽略退避立即尝试一次，然后关闭 HTTP 客户端；失败的账单留在落盘文件中等下次启动。
+        #
+        #  💡 易懂解释:
+        #      下班前再交一次账，交不上明天接着交！
+        #
+        #  ⚠️ 警告:
+        #      无。
+        #
+        #  ⚙️ 触发源:
+        #      Through Brain/main.py "close_clients" -> flush
+        # =============================================================================
+        try: await self.tick(force=True) # 📮 最后一次上报
+        except Exception as e: print(f"❌ [Tasks] 退出前成本上报失败: {e}") # 📢 打印错误
+        if self.client is not None: # 🚦 客户端已创建
+            await self.client.aclose() # 🔌 关闭连接
+            self.client = None # 🧹 清空引用
+
+    def get_stats(self):
+        # =============================================================================
+        #  🎉 获取统计 (无参数)
+        #
+        #  🎨 代码用途:
+        #      返回积压时长、未确认账单、退避状态、落盘大小与计数器。
+        #
+        #  💡 易懂解释:
+        #      看看还有多少账没交、拖了多久！
+        #
+        #  ⚠️ 警告:
+        #      [lag_s]: 最早一笔未确认增量距今的秒数，0 表示已全部交完。
+        #
+        #  ⚙️ 触发源:
+        #      Through Memory/Interface.py "/cost/sync" -> get_stats
+        # =============================================================================
+        unsent = _merge_deltas(_zero_deltas(), self.pending) # 🧾 待发账单
+        if self.batch: _merge_deltas(unsent, self.batch["deltas"]) # 📦 加上在途批次
+        oldest = min(t for t in (self.batch and self.batch["since"], self.pending_since) if t) if (self.batch or self.pending_since) else None # ⏱️ 最早未确认
+        return {
+            "url": self.url, # 🔗 上报地址
+            "epoch": self.epoch, # 🏷️ 命名空间
+            "next_id": self.next_id, # 🔢 下一个批次号
+            "inflight_batch": self.batch["id"] if self.batch else None, # 📦 在途批次
+            "unsent": unsent, # 🧾 未确认账单
+            "lag_s": round(time.time() - oldest, 1) if oldest else 0.0, # ⏳ 积压时长
+            "consecutive_failures": self.failures, # 🔁 连续失败
+            "retry_in_s": round(max(0.0, self.next_attempt - time.monotonic()), 1), # ⏳ 距下次重试
+            "last_success_age_s": round(time.time() - self.last_success, 1) if self.last_success else None, # ⏱️ 距上次成功
+            "last_error": self.last_error, # 🚨 最近错误
+            "spool_bytes": self.spool_bytes, # 📏 落盘大小
+            **self.stats, # 📊 计数器
+        } # 📦 统计结果
+
+global_cost_reporter = CostReporter()
+
 # =============================================================================
 #  🎉 cost_sync_loop (无参数)
 #
@@ -139,10 +431,10 @@ global_net_cost = Netstat()
 #      定期将成本数据同步给 Rust Core。
 #
 #  💡 易懂解释:
-#      "每隔 2 秒向总部汇报一次开销。"
+#      "每隔 2 秒向总部汇报一次开销，交不上就先记下来。"
 #
 #  ⚠️ 警告:
-#      如果 Rust 服务不可用，会静默失败。
+#      上报逻辑见 CostReporter，本循环只负责定时与兜底日志。
 #
 #  ⚙️ 触发源:
 #      Main.py (Startup)
@@ -150,29 +442,67 @@ global_net_cost = Netstat()
 async def cost_sync_loop():
     """定期将成本数据同步给 Rust Core"""
     print("🔄 [Tasks] 成本同步任务已启动") # 📢 启动日志
-    async with httpx.AsyncClient() as client: # 🌐 创建 HTTP 客户端
-        while True: # 🔄 无限循环
-            await asyncio.sleep(2) # 💤 睡眠 2 秒
-            
-            # 1. 网络成本
-            net_deltas = global_net_cost.pop_deltas() # 📊 获取网络增量
-            try: # 🛡️ 异常处理
-                if net_deltas["browser"]["tx"] > 0 or net_deltas["browser"]["rx"] > 0: # 🚦 检查是否有流量
-                    await client.post("http://127.0.0.1:8000/internal/cost", json={ # 📮 发送报告
-                        "kind": "browser",
-                        "tx": net_deltas["browser"]["tx"],
-                        "rx": net_deltas["browser"]["rx"]
-                    })
-            except: pass # 🤐 忽略错误
-
-            # 2. AI 成本
-            ai_deltas = global_ai_cost.pop_deltas() # 📊 获取 AI 增量
-            try: # 🛡️ 异常处理
-                if ai_deltas["cost_usd"] > 0: # 🚦 检查是否有成本
-                    await client.post("http://127.0.0.1:8000/internal/cost", json={ # 📮 发送报告
-                        "kind": "ai",
-                        "input_tokens": ai_deltas["input_tokens"],
-                        "output_tokens": ai_deltas["output_tokens"],
-                        "cost_usd": ai_deltas["cost_usd"]
-                    })
-            except: pass # 🤐 忽略错误
+    while True: # 🔄 无限循环
+        await asyncio.sleep(COST_SYNC_INTERVAL_S) # 💤 等待上报周期
+        try: # 🛡️ 异常处理
+            await global_cost_reporter.tick() # 📮 上报一次
+        except Exception as e: # 🚨 捕获异常
+            print(f"❌ [Tasks] 成本同步失败: {e}") # 📢 打印错误
+
+# =============================================================================
+#  🎉 cost_history_loop (无参数)
+#
+#  🎨 用途:
+#      按最细一级的分辨率 (默认每秒) 抄一次累计计数器，写入内存成本历史。
+#
+#  💡 易懂解释:
+#      "每秒看一眼电表，把走过的字记到历史本上。"
+#
+#  ⚠️ 警告:
+#      浏览器流量取分用户账本的累计值 (含尚未汇总到 Netstat 的部分)，曲线不会随上报周期出现锯齿。
+#
+#  ⚙️ 触发源:
+#      Main.py (Startup)
+# =============================================================================
+def cost_totals():
+    """读取成本历史各字段的当前累计值 (顺序同 CostHistory.FIELDS)"""
+    tx, rx = global_session_cost.total_tx, global_session_cost.total_rx # 🌐 浏览器累计
+    usd = global_ai_cost.cost_usd + tx / GB * PRICING_TABLE["network_egress"] # 💰 模型成本 + 网络成本
+    return (tx, rx, global_net_cost.ws_tx, global_net_cost.ws_rx, global_ai_cost.input_tokens, global_ai_cost.output_tokens, usd) # 📦 累计值
+
+async def cost_history_loop():
+    """定期采样成本累计值写入成本历史"""
+    print("🔄 [Tasks] 成本历史采样已启动") # 📢 启动日志
+    interval = COST_HISTORY_TIERS[0][0] # ⏱️ 最细分辨率
+    while True: # 🔄 无限循环
+        await asyncio.sleep(interval - time.time() % interval) # 💤 对齐到下一个桶边界
+        try: # 🛡️ 异常处理
+            global_cost_history.sample(cost_totals()) # 📥 采样一次
+        except Exception as e: # 🚨 捕获异常
+            print(f"❌ [Tasks] 成本历史采样失败: {e}") # 📢 打印错误
+
+# =============================================================================
+#  🎉 session_reaper_loop (无参数)
+#
+#  🎨 用途:
+#      定期休眠空闲的浏览器会话，释放渲染进程内存。
+#
+#  💡 易懂解释:
+#      "每隔一会儿巡视一遍，把没人用的窗口收起来。"
+#
+#  ⚠️ 警告:
+#      延迟导入 Body.Playwright，避免与 Netstat 的循环导入。
+#
+#  ⚙️ 触发源:
+#      Main.py (Startup)
+# =============================================================================
+async def session_reaper_loop():
+    """定期休眠空闲浏览器会话"""
+    from Body.Playwright import angel_browser # 📦 延迟导入
+    print("🔄 [Tasks] 会话回收任务已启动") # 📢 启动日志
+    while True: # 🔄 无限循环
+        await asyncio.sleep(SESSION_REAP_INTERVAL_S) # 💤 等待巡检周期
+        try: # 🛡️ 异常处理
+            await angel_browser.evict_idle_sessions() # 💤 休眠空闲会话
+        except Exception as e: # 🚨 捕获异常
+            print(f"❌ [Tasks] 会话回收失败: {e}") # 📢 打印错误
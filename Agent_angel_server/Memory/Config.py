@@ -3,7 +3,7 @@
 #   ⚡ 逻辑摘要 : 存储项目路径、API Key、浏览器设置和定价表。
 #   💡 易懂解释 : 机器人的 "基因" 和 "出厂设置"。
 #   🔋 未来扩展 : 支持从 .env 文件加载，支持动态热更新配置。
-#   📊 当前状态 : 活跃 (更新: 2025-12-16)
+#   📊 当前状态 : 活跃 (更新: 2026-10-17)
 #   🧱 Memory/Config.py 踩坑记录 :
 #      1. [2025-12-04] [已修复] [路径错误]: 之前注释写的是 Body 目录，实际在 Memory 目录。 -> 修正了注释。
 #      2. [2025-12-16] [已修复] [文件重复]: 文件内容被重复粘贴多次。 -> 清理重复内容。
@@ -11,6 +11,7 @@
 
 import os # 📂 引入操作系统模块
 import pathlib # 🛣️ 引入路径处理模块
+import re # 🔍 引入正则模块
 
 # =============================================================================
 #   🎉 路径配置
@@ -49,6 +50,193 @@ USER_DATA_DIR = os.path.join(PROJECT_ROOT, "Memorybank", "BrowserData") # 💾 
 VIEWPORT = {'width': 1280, 'height': 720} # 🖼️ 设定视口尺寸
 BROWSER_CHANNEL = None # 🌐 设定浏览器通道 (None=Chromium)
 TARGET_SEARCH_URL = "https://www.douyin.com/search/三角洲行动_零号大坝_老六点位" # 🎯 设定默认搜索目标
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36" # 🕵️ 设定浏览器 UA
+BROWSER_LOCALE = "zh-CN" # 🇨🇳 设定浏览器语言
+
+# =============================================================================
+#   🎉 浏览器进程池配置
+#
+#   🎨 代码用途：
+#      定义 Chromium 进程数量、调试端口起点和负载评分权重。
+#
+#   💡 易懂解释:
+#      "开几台浏览器一起干活？"
+#
+#   ⚠️ 警告:
+#      每个进程独占一个调试端口 (BASE + 序号)，Rust CDP 只连接 0 号进程 (9222)。
+#      进程数建议不超过 CPU 核心数。
+#
+#   ⚙️ 触发源:
+#      Playwright.py -> BrowserManager
+# =============================================================================
+BROWSER_POOL_SIZE = max(1, int(os.environ.get("ANGEL_BROWSER_POOL_SIZE", "1"))) # 🧮 浏览器进程数
+BROWSER_DEBUG_PORT_BASE = 9222 # 🔌 调试端口起点
+BROWSER_LATENCY_WEIGHT_MS = 200.0 # ⚖️ 截图延迟折算 (毫秒/上下文)
+
+# =============================================================================
+#   🎉 会话休眠配置
+#
+#   🎨 代码用途：
+#      定义空闲会话的休眠阈值、存活会话上限和巡检周期。
+#
+#   💡 易懂解释:
+#      "没人用的浏览器窗口先收起来，省内存。"
+#
+#   ⚠️ 警告:
+#      休眠会关闭上下文，仅保留 state.json 和当前 URL，页面内存态 (表单输入等) 会丢失。
+#
+#   ⚙️ 触发源:
+#      Playwright.py -> BrowserManager, Tasks.py -> session_reaper_loop
+# =============================================================================
+SESSION_IDLE_TTL_S = int(os.environ.get("ANGEL_SESSION_IDLE_TTL_S", "600")) # ⏳ 空闲休眠阈值 (秒)
+SESSION_MAX_LIVE = max(1, int(os.environ.get("ANGEL_SESSION_MAX_LIVE", "50"))) # 🧮 存活会话上限
+SESSION_REAP_INTERVAL_S = 30 # 🔄 巡检周期 (秒)
+
+# =============================================================================
+#   🎉 预热上下文池配置
+#
+#   🎨 代码用途：
+#      定义后台预先创建的空白上下文 (含页面) 数量。
+#
+#   💡 易懂解释:
+#      "提前开好几个空窗口，新朋友来了直接用。"
+#
+#   ⚠️ 警告:
+#      每个预热上下文都会占用渲染进程内存，0 表示关闭预热。
+#      预热只放在 1 号及以后的进程上，0 号进程 (端口 9222) 留给 Rust CDPstream (空白预热页会抢占它附着的第一个页面)；
+#      因此单进程 (默认 BROWSER_POOL_SIZE=1) 时预热不生效，需要预热请设置 ANGEL_BROWSER_POOL_SIZE>=2。
+#
+#   ⚙️ 触发源:
+#      Playwright.py -> BrowserManager
+# =============================================================================
+CONTEXT_POOL_SIZE = max(0, int(os.environ.get("ANGEL_CONTEXT_POOL_SIZE", "2"))) # 🧮 预热上下文数量
+
+# =============================================================================
+#   🎉 CDP 截屏流配置
+#
+#   🎨 代码用途：
+#      定义是否为每个会话开启 Page.startScreencast 帧缓冲及其参数。
+#
+#   💡 易懂解释:
+#      "让浏览器一直把画面推过来，要看的时候直接拿最新一张。"
+#
+#   ⚠️ 警告:
+#      页面无变化时 Chromium 不推新帧，等待新帧超时后会回退为普通截图。
+#      开启后推流质量为 SCREENCAST_QUALITY；capture 传入更低的 quality (如预算降级) 时按该质量重启推流。
+#
+#   ⚙️ 触发源:
+#      Playwright.py -> ScreenshotTool
+# =============================================================================
+SCREENCAST_ENABLED = os.environ.get("ANGEL_SCREENCAST", "0") == "1" # 🎥 截屏流开关 (默认关闭)
+SCREENCAST_QUALITY = 50 # 🖼️ 截屏流 JPEG 质量
+SCREENCAST_WAIT_S = 2.0 # ⏳ 等待新帧超时 (秒)
+
+# =============================================================================
+#   🎉 操作调度配置
+#
+#   🎨 代码用途：
+#      定义全局并发浏览器操作上限和单会话排队深度。
+#
+#   💡 易懂解释:
+#      "最多几个人同时用浏览器，每个人最多排几件事。"
+#
+#   ⚠️ 警告:
+#      排队已满的请求直接返回 429，调用方需要稍后重试。
+#
+#   ⚙️ 触发源:
+#      Scheduler.py -> FairScheduler
+# =============================================================================
+BROWSER_MAX_CONCURRENT_OPS = max(1, int(os.environ.get("ANGEL_MAX_CONCURRENT_OPS", str(8 * BROWSER_POOL_SIZE)))) # 🧮 全局并发操作上限
+SESSION_QUEUE_DEPTH = max(1, int(os.environ.get("ANGEL_SESSION_QUEUE_DEPTH", "8"))) # 🧮 单会话排队深度
+
+# =============================================================================
+#   🎉 请求拦截配置
+#
+#   🎨 代码用途：
+#      定义全局默认的浏览器请求拦截规则 (逗号分隔)，会话可单独覆盖。
+#
+#   💡 易懂解释:
+#      "哪些东西不用下载？"
+#
+#   ⚠️ 警告:
+#      拦截 image 会让截图缺少内容，默认只建议拦截 media/font 和追踪域名。
+#      资源类型取值: document, stylesheet, image, media, font, script, xhr, fetch, websocket, other。
+#
+#   ⚙️ 触发源:
+#      RequestPolicy.py -> global_request_policy
+# =============================================================================
+def _env_list(name, default=""):
+    return [v.strip() for v in os.environ.get(name, default).split(",") if v.strip()] # 📋 逗号分隔列表
+
+REQUEST_BLOCK_TYPES = _env_list("ANGEL_BLOCK_TYPES") # 🚫 拦截资源类型
+REQUEST_BLOCK_PATTERNS = _env_list("ANGEL_BLOCK_PATTERNS") # 🚫 拦截 URL 通配符
+REQUEST_BLOCK_DOMAINS = _env_list("ANGEL_BLOCK_DOMAINS") # 🚫 拦截域名
+REQUEST_ALLOW_DOMAINS = _env_list("ANGEL_ALLOW_DOMAINS") # ✅ 白名单域名
+
+# =============================================================================
+#   🎉 共享 HTTP 缓存配置
+#
+#   🎨 代码用途：
+#      定义跨上下文共享的静态资源磁盘缓存的开关、目录、容量和资源类型。
+#
+#   💡 易懂解释:
+#      "大家看过的图片脚本存一份，下次直接用。"
+#
+#   ⚠️ 警告:
+#      开启后所有上下文都会挂载路由，缓存资源经 route.fetch 下载，不走 Chromium 自带缓存。
+#
+#   ⚙️ 触发源:
+#      HttpCache.py -> global_http_cache
+# =============================================================================
+HTTP_CACHE_ENABLED = os.environ.get("ANGEL_HTTP_CACHE", "0") == "1" # 🚦 共享缓存开关 (默认关闭)
+HTTP_CACHE_DIR = os.path.join(PROJECT_ROOT, "Memorybank", "HttpCache") # 📂 缓存目录
+HTTP_CACHE_MAX_BYTES = int(os.environ.get("ANGEL_HTTP_CACHE_MB", "256")) * 1024 * 1024 # 🧮 缓存容量上限
+HTTP_CACHE_TYPES = ("script", "stylesheet", "image", "font") # 🗂️ 可缓存资源类型
+
+# =============================================================================
+#   🎉 浏览器流量计量配置
+#
+#   🎨 代码用途：
+#      选择浏览器流量的计量方式，并限制按域名分类统计的条目数。
+#
+#   💡 易懂解释:
+#      "流量是看标签估，还是让浏览器报实数？"
+#
+#   ⚠️ 警告:
+#      headers: 按 content-length 和 URL 长度估算 (分块或压缩响应常缺少长度)。
+#      cdp: 每个页面多开一个 CDP 会话，按 Network.loadingFinished.encodedDataLength 和实际请求头大小计量。
+#
+#   ⚙️ 触发源:
+#      Playwright.py -> get_or_create_session, NetAccounting.py -> TrafficBreakdown
+# =============================================================================
+NET_ACCOUNTING = os.environ.get("ANGEL_NET_ACCOUNTING", "headers") # 📏 计量方式 (headers / cdp)
+NET_BREAKDOWN_MAX_DOMAINS = max(1, int(os.environ.get("ANGEL_NET_MAX_DOMAINS", "256"))) # 🧮 分域名统计上限 (其余并入 "(other)")
+NET_PENDING_MAX = 2048 # 🧮 单页面未完成请求上限
+
+# =============================================================================
+#   🎉 截图预处理配置
+#
+#   🎨 代码用途：
+#      定义发给模型前的截图缩放宽度、Token 预算、裁剪模式和自适应 JPEG 质量。
+#
+#   💡 易懂解释:
+#      "给大脑看的图要多大、多清楚。"
+#
+#   ⚠️ 警告:
+#      Token 估算按 768px 切片 × 258 计算 (新版模型规则)，Gemini 1.5 对单张图片固定计 258。
+#      裁剪模式 changed 只保留变化区域，模型看不到区域外的元素。
+#
+#   ⚙️ 触发源:
+#      ImagePrep.py -> angel_image_prep
+# =============================================================================
+IMAGE_PREP_ENABLED = os.environ.get("ANGEL_IMAGE_PREP", "0") == "1" # 🚦 预处理开关 (默认关闭)
+IMAGE_PREP_MAX_WIDTH = int(os.environ.get("ANGEL_IMAGE_MAX_WIDTH", "1024")) # 📏 最大宽度 (0 不限)
+IMAGE_PREP_TOKEN_BUDGET = int(os.environ.get("ANGEL_IMAGE_TOKEN_BUDGET", "0")) # 🧮 单图 Token 预算 (0 不限)
+IMAGE_PREP_CROP = os.environ.get("ANGEL_IMAGE_CROP", "none") # ✂️ 裁剪模式 (none / changed)
+IMAGE_PREP_QUALITIES = (70, 55, 45, 35) # 🖼️ 自适应质量档位 (从高到低)
+IMAGE_PREP_TARGET_BYTES = int(os.environ.get("ANGEL_IMAGE_TARGET_KB", "60")) * 1024 # 🎯 目标大小
+IMAGE_TILE_PX = 768 # 🧩 图片切片边长
+IMAGE_TILE_TOKENS = 258 # 🧩 单个切片 Token 数
 
 # =============================================================================
 #   🎉 密钥配置
@@ -62,6 +250,9 @@ TARGET_SEARCH_URL = "https://www.douyin.com/search/三角洲行动_零号大坝_
 #   ⚠️ 警告:
 #      密钥由Agent_angel_client通过API传入并存储到RocksDB。
 #      用户在线时使用最新密钥，离线时使用缓存的密钥。
+#      共享密钥池对所有用户的规划流量生效 (谁的请求都可能用到池里任意一把钥匙)，
+#      因此 keys_db 里只有以 GEMINI_SHARED_KEY_PREFIX 开头登记的密钥进池，用户按 user_id 保存的个人密钥不会被别人使用。
+#      不符合 AIza... 格式的值直接丢弃 (否则 400 不会触发换钥重试)。
 #
 #   ⚙️ 触发源:
 #      Gemini.py
@@ -84,8 +275,185 @@ def get_gemini_api_key():
     
     return ""
 
+GEMINI_SHARED_KEY_PREFIX = os.environ.get("ANGEL_GEMINI_SHARED_PREFIX", "shared:") # 🔑 keys_db 中可进入共享密钥池的键前缀
+GEMINI_KEY_PATTERN = re.compile(r"^AIza[0-9A-Za-z_\-]{30,}$") # 🔍 Gemini API 密钥格式
+
+def get_gemini_api_keys():
+    """收集共享密钥池 (主密钥、ANGEL_GEMINI_KEYS、keys_db 中以共享前缀登记的密钥)，丢弃非 Gemini 格式的值，去重保序"""
+    keys = [get_gemini_api_key()] + _env_list("ANGEL_GEMINI_KEYS")
+    try:
+        import rocksdb
+        db_path = os.path.join(PROJECT_ROOT, "Memorybank", "keys_db")
+        if os.path.exists(db_path) and GEMINI_SHARED_KEY_PREFIX:
+            opts = rocksdb.Options()
+            opts.create_if_missing = False
+            db = rocksdb.DB(db_path, opts, read_only=True)
+            prefix = GEMINI_SHARED_KEY_PREFIX.encode('utf-8')
+            it = db.iteritems()
+            it.seek(prefix)
+            for name, value in it:
+                if not name.startswith(prefix):
+                    break
+                keys.append(value.decode('utf-8').strip())
+    except Exception:
+        # RocksDB读取失败，只使用已有密钥
+        pass
+    
+    return list(dict.fromkeys(k for k in keys if k and GEMINI_KEY_PATTERN.match(k)))
+
 GEMINI_API_KEY = get_gemini_api_key() # 🔑 获取 Gemini 密钥
 
+# =============================================================================
+#   🎉 Gemini 连接池配置
+#
+#   🎨 代码用途：
+#      定义模型调用的长连接池参数和全局并发上限。
+#
+#   💡 易懂解释:
+#      "和大脑之间保持几条电话线，最多同时问几个问题。"
+#
+#   ⚠️ 警告:
+#      并发上限是全局的，超出的调用会排队等待，不会报错。
+#
+#   ⚙️ 触发源:
+#      Gemini.py -> GeminiClient
+# =============================================================================
+GEMINI_MAX_CONNECTIONS = max(1, int(os.environ.get("ANGEL_GEMINI_CONNECTIONS", "32"))) # 🔌 连接池上限
+GEMINI_MAX_INFLIGHT = max(1, int(os.environ.get("ANGEL_GEMINI_INFLIGHT", "16"))) # 🧮 同时进行的模型调用上限
+GEMINI_DNS_TTL_S = 300 # 🌐 DNS 缓存时长 (秒)
+GEMINI_KEEPALIVE_S = 60 # 🔗 空闲连接保活时长 (秒)
+GEMINI_TIMEOUT_S = 60 # ⏳ 单次调用超时 (秒)
+GEMINI_API_BASE = os.environ.get("ANGEL_GEMINI_API_BASE", "https://generativelanguage.googleapis.com").rstrip("/") # 🔗 API 地址 (可指向本地模拟服务)
+GEMINI_STREAMING = os.environ.get("ANGEL_GEMINI_STREAM", "0") == "1" # 🌊 默认使用流式规划
+
+# =============================================================================
+#   🎉 Gemini 密钥池配置
+#
+#   🎨 代码用途：
+#      定义单个密钥的每分钟请求数/Token 数限额，以及 429/503 后的冷却退避参数。
+#
+#   💡 易懂解释:
+#      "每把钥匙一分钟能开几次门，被拒之后歇多久。"
+#
+#   ⚠️ 警告:
+#      限额按最低档配额设置，付费密钥可通过环境变量调高。
+#
+#   ⚙️ 触发源:
+#      KeyPool.py -> angel_key_pool
+# =============================================================================
+GEMINI_KEY_RPM = max(1, int(os.environ.get("ANGEL_GEMINI_KEY_RPM", "15"))) # 🧮 单密钥每分钟请求数
+GEMINI_KEY_TPM = max(1, int(os.environ.get("ANGEL_GEMINI_KEY_TPM", "1000000"))) # 🧮 单密钥每分钟 Token 数
+GEMINI_KEY_COOLDOWN_S = 2.0 # ⏳ 首次限流冷却 (秒)
+GEMINI_KEY_COOLDOWN_MAX_S = 120.0 # ⏳ 冷却上限 (秒)
+GEMINI_KEY_MAX_ATTEMPTS = 3 # 🔁 单次调用最多尝试的密钥数
+
+# =============================================================================
+#   🎉 模型级联配置
+#
+#   🎨 代码用途：
+#      定义规划时依次尝试的模型 (从便宜到昂贵) 和升级的置信度阈值。
+#
+#   💡 易懂解释:
+#      "小脑袋先想，想不明白再请大脑袋。"
+#
+#   ⚠️ 警告:
+#      模型名必须在 PRICING_TABLE 中有定价，否则按 Flash 价格记账。
+#      只配置一个模型即关闭级联。
+#
+#   ⚙️ 触发源:
+#      Gemini.py -> GeminiClient
+# =============================================================================
+GEMINI_MODEL_TIERS = _env_list("ANGEL_GEMINI_MODELS", "gemini-1.5-flash,gemini-1.5-pro") # 🪜 级联模型
+GEMINI_ESCALATE_CONFIDENCE = float(os.environ.get("ANGEL_ESCALATE_CONFIDENCE", "0.6")) # 📏 低于此置信度升级
+
+# =============================================================================
+#   🎉 规划缓存配置
+#
+#   🎨 代码用途：
+#      定义动作规划语义缓存的容量、有效期和截图相似度阈值。
+#
+#   💡 易懂解释:
+#      "画面差不多就当没变，直接用上次的答案。"
+#
+#   ⚠️ 警告:
+#      阈值是 64 位 dHash 的汉明距离，过大会把真正变化的页面当成未变化。
+#      容量设为 0 即关闭缓存。
+#
+#   ⚙️ 触发源:
+#      PlanCache.py -> angel_plan_cache
+# =============================================================================
+PLAN_CACHE_SIZE = max(0, int(os.environ.get("ANGEL_PLAN_CACHE_SIZE", "512"))) # 🧮 缓存桶上限
+PLAN_CACHE_TTL_S = float(os.environ.get("ANGEL_PLAN_CACHE_TTL_S", "30")) # ⏳ 条目有效期 (秒)
+PLAN_CACHE_MAX_DISTANCE = int(os.environ.get("ANGEL_PLAN_CACHE_DISTANCE", "4")) # 📏 汉明距离阈值
+
+# =============================================================================
+#   🎉 成本同步配置
+#
+#   🎨 代码用途：
+#      定义向 Rust Core 汇报成本的地址、周期、失败退避上限和本地落盘文件。
+#
+#   💡 易懂解释:
+#      "账单多久交一次，交不上就先记在小本子上。"
+#
+#   ⚠️ 警告:
+#      落盘文件只追加，成功上报后压缩；超过上限时合并为一行，不会丢账。
+#
+#   ⚙️ 触发源:
+#      Tasks.py -> CostReporter
+# =============================================================================
+CORE_API_BASE = os.environ.get("ANGEL_CORE_URL", "http://127.0.0.1:8000").rstrip("/") # 🔗 Rust Core 地址
+COST_SYNC_INTERVAL_S = float(os.environ.get("ANGEL_COST_SYNC_S", "2")) # 🔄 上报周期 (秒)
+COST_SYNC_BACKOFF_MAX_S = float(os.environ.get("ANGEL_COST_BACKOFF_MAX_S", "60")) # ⏳ 失败退避上限 (秒)
+COST_SYNC_TIMEOUT_S = 5.0 # ⏱️ 单次上报超时 (秒)
+COST_SPOOL_PATH = os.path.join(PROJECT_ROOT, "Memorybank", "cost_spool.jsonl") # 📒 未确认账单落盘文件
+COST_SPOOL_MAX_BYTES = int(os.environ.get("ANGEL_COST_SPOOL_KB", "1024")) * 1024 # 🧮 落盘文件压缩阈值
+COST_SESSIONS_MAX = max(1, int(os.environ.get("ANGEL_COST_SESSIONS", "10000"))) # 🧮 分用户账本上限 (超出淘汰最久未活跃)
+
+# =============================================================================
+#   🎉 成本历史配置
+#
+#   🎨 代码用途：
+#      定义内存成本时间序列的分级环形缓冲 (分辨率秒数, 槽位数) 与单次查询的最大点数。
+#
+#   💡 易懂解释:
+#      "最近一小时按秒记，最近一天按分钟记，最近一个月按小时记。"
+#
+#   ⚠️ 警告:
+#      内存固定: 槽位总数 × 字段数 × 8 字节 (默认约 360 KB)，进程重启后历史清空。
+#
+#   ⚙️ 触发源:
+#      CostHistory.py -> CostHistory, Tasks.py -> cost_history_loop
+# =============================================================================
+COST_HISTORY_TIERS = ((1, 3600), (60, 1440), (3600, 720)) # 🗂️ (分辨率秒数, 槽位数): 1 小时 / 1 天 / 30 天
+COST_HISTORY_MAX_POINTS = 2000 # 🧮 单次查询最多返回点数 (超出自动放大步长)
+
+# =============================================================================
+#   🎉 成本预算配置
+#
+#   🎨 代码用途：
+#      定义分用户与全局的预算 (每小时/每天美元、每小时流量) 以及逐级降级的阈值。
+#
+#   💡 易懂解释:
+#      "花到七成先省着用 (降低截图质量)，花到九成放慢脚步，花完就停下。"
+#
+#   ⚠️ 警告:
+#      0 表示不限制；全部为 0 时预算功能关闭。窗口为滑动估算 (上一窗口按剩余比例折算 + 当前窗口)。
+#
+#   ⚙️ 触发源:
+#      Budget.py -> BudgetTracker, Interface.py -> /action/execute, /agent/step
+# =============================================================================
+BUDGET_USER_USD_HOUR = float(os.environ.get("ANGEL_BUDGET_USER_USD_HOUR", "0")) # 💰 单用户每小时美元上限
+BUDGET_USER_USD_DAY = float(os.environ.get("ANGEL_BUDGET_USER_USD_DAY", "0")) # 💰 单用户每天美元上限
+BUDGET_USER_BYTES_HOUR = int(float(os.environ.get("ANGEL_BUDGET_USER_MB_HOUR", "0")) * 1024 * 1024) # 📏 单用户每小时流量上限
+BUDGET_GLOBAL_USD_HOUR = float(os.environ.get("ANGEL_BUDGET_GLOBAL_USD_HOUR", "0")) # 💰 全局每小时美元上限
+BUDGET_GLOBAL_USD_DAY = float(os.environ.get("ANGEL_BUDGET_GLOBAL_USD_DAY", "0")) # 💰 全局每天美元上限
+BUDGET_GLOBAL_BYTES_HOUR = int(float(os.environ.get("ANGEL_BUDGET_GLOBAL_MB_HOUR", "0")) * 1024 * 1024) # 📏 全局每小时流量上限
+BUDGET_DEGRADE_AT = 0.7 # 🖼️ 用量达到上限的比例: 降低截图质量
+BUDGET_SLOW_AT = 0.9 # 🐢 用量达到上限的比例: 降低调度权重并放慢步频
+BUDGET_DEGRADED_QUALITY = 30 # 🖼️ 降级后的截图 JPEG 质量
+BUDGET_SLOW_WEIGHT = 0.25 # ⚖️ 放慢后的调度权重
+BUDGET_SLOW_DELAY_S = 2.0 # ⏱️ 放慢后每步额外等待 (秒)
+
 # =============================================================================
 #   🎉 定价表
 #
@@ -102,8 +470,8 @@ GEMINI_API_KEY = get_gemini_api_key() # 🔑 获取 Gemini 密钥
 #      Gemini.py, Tasks.py
 # =============================================================================
 PRICING_TABLE = { # 💰 定义价格字典
-    "gemini-1.5-flash": {"input": 0.075, "output": 0.30}, # ⚡ Flash 模型费率
-    "gemini-1.5-pro": {"input": 3.50, "output": 10.50},   # 🧠 Pro 模型费率
+    "gemini-1.5-flash": {"input": 0.075, "output": 0.30, "cached": 0.01875}, # ⚡ Flash 模型费率
+    "gemini-1.5-pro": {"input": 3.50, "output": 10.50, "cached": 0.875},   # 🧠 Pro 模型费率
     "network_egress": 0.1 # 🌐 网络流量费率
 }
 
@@ -3,7 +3,7 @@
 #   ⚡ 逻辑摘要 : 提供 Python 端访问 Rust 共享内存 (AppState) 的 HTTP 接口封装。
 #   💡 易懂解释 : Python 想要看日记，得通过这个 "图书管理员"。
 #   🔋 未来扩展 : 支持 gRPC 或 WebSocket 以提高性能。
-#   📊 当前状态 : 活跃 (更新: 2025-12-06)
+#   📊 当前状态 : 活跃 (更新: 2026-10-17)
 #   🧱 Memory/Interface.py 踩坑记录 :
 #      1. [2025-12-04] [已修复] [类型错误]: 任务 ID 必须是字符串。 -> 强制类型转换。
 #      2. [2025-12-16] [已修复] [缺少router]: Brain/Main.py 需要导入 router。 -> 添加 FastAPI router。
@@ -13,7 +13,13 @@ import requests # 🌐 引入 HTTP 请求库
 import json # 📦 引入 JSON 处理库
 import sys
 import os
-from fastapi import APIRouter, Query
+import time
+import asyncio
+import base64
+from typing import List, Optional
+from urllib.parse import quote
+from fastapi import APIRouter, Query, Header, Response, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 # 🛠️ 确保能导入 Body 模块
@@ -39,9 +45,20 @@ router = APIRouter()
 class SessionInitReq(BaseModel):
     user_id: str
 
+class RequestPolicyReq(BaseModel):
+    user_id: str
+    block_types: List[str] = []
+    block_patterns: List[str] = []
+    block_domains: List[str] = []
+    allow_domains: List[str] = []
+    reset: bool = False
+
 class ActionExecuteReq(BaseModel):
     user_id: str
-    action: dict
+    action: Optional[dict] = None
+    actions: Optional[List[dict]] = None
+    observe_after: bool = False
+    observe_fields: str = ""
 
 @router.post("/session/init")
 async def init_session(req: SessionInitReq):
@@ -54,16 +71,80 @@ async def init_session(req: SessionInitReq):
 async def close_session(req: SessionInitReq):
     """关闭浏览器会话"""
     from Body.Playwright import angel_browser
+    from Body.Scheduler import angel_scheduler
+    from Body.ImagePrep import angel_image_prep
     await angel_browser.close_session(req.user_id)
+    angel_scheduler.forget(req.user_id)
+    angel_image_prep.forget(req.user_id)
     return {"status": "ok"}
 
+async def scheduled(user_id: str, fn):
+    """在公平调度器下串行执行会话操作，返回 (结果, 排队毫秒, 执行毫秒)，队列已满时返回 429"""
+    from Body.Scheduler import angel_scheduler, QueueFullError
+    try:
+        return await angel_scheduler.run(user_id, fn)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+def budget_error(e):
+    """预算耗尽 -> 402 (detail 说明超限范围与指标，Retry-After 为预计恢复秒数)"""
+    detail = {"status": "budget_exceeded", "scope": e.scope, "limit": e.limit, "retry_after": e.retry_after, "error": str(e)}
+    return HTTPException(status_code=402, detail=detail, headers={"Retry-After": str(e.retry_after)})
+
+async def budget_gate(user_id: str):
+    """预算准入：额度紧张时放慢步频，耗尽时返回 402"""
+    from Energy.Budget import global_budget, BudgetExceededError
+    try:
+        return await global_budget.admit(user_id)
+    except BudgetExceededError as e:
+        raise budget_error(e)
+
 @router.get("/state/screenshot")
-async def get_screenshot(user_id: str = Query(...)):
-    """获取当前页面截图"""
+async def get_screenshot(user_id: str = Query(...), after_seq: int = Query(None), accept: str = Header("")):
+    """获取当前页面截图 (Accept: image/jpeg 时返回原始字节，否则返回 Base64 JSON；after_seq 等待更新的画面)"""
     from Body.Playwright import angel_browser
-    session = await angel_browser.get_or_create_session(user_id)
-    screenshot_b64 = await session["eye"].capture()
-    return {"screenshot": screenshot_b64}
+    from Energy.Budget import global_budget
+    from Memory.Config import VIEWPORT
+    quality = global_budget.quality(user_id)
+
+    async def op():
+        session = await angel_browser.get_or_create_session(user_id)
+        eye = session["eye"]
+        if "image/jpeg" not in accept:
+            screenshot_b64 = await eye.capture(quality, after_seq=after_seq)
+            return {"screenshot": screenshot_b64, "seq": eye.frame_seq}
+        screenshot_bytes = await eye.capture_bytes(quality, after_seq=after_seq)
+        if not screenshot_bytes:
+            return Response(status_code=503)
+        url = session["page"].url if session["page"] else ""
+        return Response(content=screenshot_bytes, media_type="image/jpeg", headers={
+            "X-Page-Url": quote(url, safe=":/?#[]@!$&'()*+,;=%~"),
+            "X-Viewport": f"{VIEWPORT['width']}x{VIEWPORT['height']}",
+            "X-Captured-At": f"{eye.last_capture_at:.3f}",
+            "X-Frame-Seq": str(eye.frame_seq),
+        })
+
+    result, wait_ms, exec_ms = await scheduled(user_id, op)
+    if isinstance(result, Response):
+        result.headers["X-Queue-Ms"] = f"{wait_ms:.1f}"
+        result.headers["X-Exec-Ms"] = f"{exec_ms:.1f}"
+    return result
+
+@router.get("/state/observe")
+async def observe_state(user_id: str = Query(...), fields: str = Query(""), after_seq: int = Query(None)):
+    """一次获取画面、URL、标题、滚动位置、视口和页面变化标记 (fields 逗号分隔，可选)"""
+    from Body.Playwright import angel_browser
+    from Energy.Budget import global_budget
+    wanted = [f.strip() for f in fields.split(",") if f.strip()] or None
+    quality = global_budget.quality(user_id)
+
+    async def op():
+        session = await angel_browser.get_or_create_session(user_id)
+        return await session["eye"].observe(wanted, quality, after_seq=after_seq)
+
+    result, wait_ms, exec_ms = await scheduled(user_id, op)
+    result["timings"] = {"queue_ms": round(wait_ms, 1), "exec_ms": round(exec_ms, 1)}
+    return result
 
 @router.get("/state/url")
 async def get_url(user_id: str = Query(...)):
@@ -73,22 +154,130 @@ async def get_url(user_id: str = Query(...)):
     url = session["page"].url if session["page"] else ""
     return {"url": url}
 
-@router.post("/action/execute")
-async def execute_action(req: ActionExecuteReq):
-    """执行浏览器动作"""
+@router.get("/browser/stats")
+async def get_browser_stats():
+    """获取浏览器进程池负载统计"""
+    from Body.Playwright import angel_browser
+    from Body.RequestPolicy import global_request_policy
+    from Body.HttpCache import global_http_cache
+    return {
+        "browsers": angel_browser.get_pool_stats(),
+        "sessions": len(angel_browser.sessions),
+        "hibernation": angel_browser.get_hibernation_stats(),
+        "prewarm": angel_browser.get_warm_stats(),
+        "request_policy": global_request_policy.to_dict(),
+        "http_cache": global_http_cache.get_stats(),
+    }
+
+@router.post("/session/policy")
+async def set_session_policy(req: RequestPolicyReq):
+    """设置会话请求拦截策略 (覆盖全局策略，reset=true 恢复全局)"""
     from Body.Playwright import angel_browser
-    session = await angel_browser.get_or_create_session(req.user_id)
-    action = req.action
+    from Body.RequestPolicy import RequestPolicy
+    policy = None if req.reset else RequestPolicy.from_dict(req.dict())
+    await angel_browser.set_request_policy(req.user_id, policy)
+    return {"status": "ok", "policy": policy.to_dict() if policy else None}
+
+@router.get("/session/policy")
+async def get_session_policy(user_id: str = Query(None)):
+    """查询请求拦截策略与拦截统计 (不带 user_id 时返回全局策略)"""
+    from Body.Playwright import angel_browser
+    from Body.RequestPolicy import global_request_policy
+    policy = angel_browser.policies.get(user_id, global_request_policy) if user_id else global_request_policy
+    return {"scope": "session" if user_id in angel_browser.policies else "global", "policy": policy.to_dict()}
+
+@router.get("/scheduler/stats")
+async def get_scheduler_stats():
+    """获取操作调度统计 (排队耗时与执行耗时分开统计)"""
+    from Body.Scheduler import angel_scheduler
+    return angel_scheduler.get_stats()
+
+@router.get("/brain/stats")
+async def get_brain_stats():
+    """获取模型调用统计 (进行中、排队深度与耗时)"""
+    from Body.Gemini import angel_brain
+    from Body.PlanCache import angel_plan_cache
+    from Body.KeyPool import angel_key_pool
+    from Body.ImagePrep import angel_image_prep
+    return {**angel_brain.get_stats(), "plan_cache": angel_plan_cache.get_stats(), "key_pool": angel_key_pool.get_stats(), "image_prep": angel_image_prep.get_stats()}
+
+@router.get("/brain/cost")
+async def get_brain_cost():
+    """获取模型用量与成本 (按模型、用户、模态汇总)"""
+    from Body.Gemini import global_ai_cost
+    return global_ai_cost.get_stats()
+
+@router.get("/cost/sync")
+async def get_cost_sync():
+    """获取成本上报状态 (积压时长、未确认账单、重试与丢弃计数)"""
+    from Energy.Tasks import global_cost_reporter
+    return global_cost_reporter.get_stats()
+
+@router.get("/cost/sessions")
+async def get_cost_sessions(top: int = Query(10, ge=1, le=1000), by: str = Query("cost_usd"), user_id: str = Query(None)):
+    """按用户查询流量与模型成本 (user_id 查单个用户，否则按 by 指标返回前 top 名)"""
+    from Energy.SessionCost import global_session_cost, RANK_KEYS
+    if user_id:
+        entry = global_session_cost.get(user_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail=f"no cost recorded for {user_id}")
+        return {"user_id": user_id, **entry}
+    if by not in RANK_KEYS:
+        raise HTTPException(status_code=400, detail=f"unknown metric: {by} (expected one of {', '.join(RANK_KEYS)})")
+    return {"by": by, "sessions": global_session_cost.top(top, by), **global_session_cost.get_stats()}
+
+@router.get("/cost/traffic")
+async def get_cost_traffic(top: int = Query(20, ge=1, le=1000)):
+    """浏览器流量按资源类型/域名的分类汇总，以及 CDP 计量器的计数"""
+    from Memory.Config import NET_ACCOUNTING
+    from Energy.NetAccounting import global_traffic
+    from Body.Playwright import angel_browser
+    meters = {}
+    for session in list(angel_browser.sessions.values()):
+        meter = session.get("meter")
+        if meter is None:
+            continue
+        for k, v in meter.stats.items():
+            meters[k] = meters.get(k, 0) + v
+        meters["pending"] = meters.get("pending", 0) + len(meter.pending)
+    return {"mode": NET_ACCOUNTING, "meters": meters, **global_traffic.get_stats(top)}
+
+@router.get("/cost/history")
+async def get_cost_history(range_: str = Query("1h", alias="range"), step: str = Query(None)):
+    """成本时间序列 (range/step 支持 90、30s、15m、6h、7d；step 缺省约 60 个点)"""
+    from Energy.CostHistory import global_cost_history, parse_duration
+    try:
+        range_s = parse_duration(range_)
+        step_s = parse_duration(step) if step else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return global_cost_history.query(range_s, step_s)
+
+@router.get("/cost/budget")
+async def get_cost_budget(user_id: str = Query(None)):
+    """预算配置与降级统计 (user_id 时返回该用户与全局的当前用量和等级)"""
+    from Energy.Budget import global_budget
+    if user_id:
+        return global_budget.status(user_id)
+    return global_budget.get_stats()
+
+async def run_action(session, action: dict):
+    """在会话上执行单个浏览器动作"""
     action_type = action.get("action_type", "")
-    params = action.get("params", {})
+    params = action.get("params") or {}
     
     if action_type == "click":
         x = params.get("x", 0.5)
         y = params.get("y", 0.5)
-        await session["hand"].click(x, y)
+        await session["hand"].click(x, y, element=params.get("element"))
     elif action_type == "type":
         text = params.get("text", "")
+        if params.get("element") is not None:
+            await session["hand"].click(element=params["element"])
         await session["page"].keyboard.type(text)
+    elif action_type == "press":
+        key = params.get("key", "Enter")
+        await session["page"].keyboard.press(key)
     elif action_type == "scroll":
         delta_y = params.get("delta_y", 0)
         await session["page"].mouse.wheel(0, delta_y)
@@ -97,11 +286,150 @@ async def execute_action(req: ActionExecuteReq):
         if url:
             await session["page"].goto(url)
     elif action_type == "wait":
-        import asyncio
         await asyncio.sleep(1)
     # "done" 不需要执行任何操作
-    
-    return {"status": "ok"}
+
+async def run_actions(session, actions: List[dict]):
+    """按顺序执行动作列表，遇到首个错误即停止，返回 (是否全部成功, 逐条结果)"""
+    results = []
+    for index, action in enumerate(actions):
+        start_t = time.perf_counter()
+        item = {"index": index, "action_type": action.get("action_type", "")}
+        try:
+            await run_action(session, action)
+            item["status"] = "ok"
+        except Exception as e:
+            item["status"] = "error"
+            item["error"] = str(e)
+        item["ms"] = round((time.perf_counter() - start_t) * 1000, 1)
+        results.append(item)
+        if item["status"] != "ok":
+            return False, results
+    return True, results
+
+@router.post("/action/execute")
+async def execute_action(req: ActionExecuteReq):
+    """执行浏览器动作 (action 单条 或 actions 批量，observe_after 时附带动作后的观察结果；没有动作时返回 400，预算耗尽时返回 402)"""
+    from Body.Playwright import angel_browser
+    from Energy.Budget import global_budget
+    actions = req.actions if req.actions is not None else ([req.action] if req.action else [])
+    if not actions:
+        raise HTTPException(status_code=400, detail="action or a non-empty actions list is required")
+    await budget_gate(req.user_id)
+
+    async def op():
+        session = await angel_browser.get_or_create_session(req.user_id)
+        seq_before = session["eye"].frame_seq
+        ok, results = await run_actions(session, actions)
+        body = {"status": "ok" if ok else "error", "results": results}
+        if ok and req.observe_after:
+            wanted = [f.strip() for f in req.observe_fields.split(",") if f.strip()] or None
+            body["observation"] = await session["eye"].observe(wanted, global_budget.quality(req.user_id), after_seq=seq_before)
+        return ok, body
+
+    (ok, body), wait_ms, exec_ms = await scheduled(req.user_id, op)
+    body["timings"] = {"queue_ms": round(wait_ms, 1), "exec_ms": round(exec_ms, 1)}
+    if not ok:
+        return JSONResponse(status_code=500, content=body)
+    return body
+
+class ThinkReq(BaseModel):
+    user_id: str
+    task: str
+    url: str = ""
+    screenshot: str = ""
+
+@router.post("/think")
+async def think(req: ThinkReq):
+    """Rust 规划器的决策入口：截图 (Base64) 经预处理后交给 plan_next_action，返回 {action, params, reason}"""
+    from Body.ImagePrep import angel_image_prep
+    from Body.Gemini import angel_brain
+    from Energy.Budget import BudgetExceededError
+    try:
+        shot = base64.b64decode(req.screenshot) if req.screenshot else b""
+    except ValueError:
+        raise HTTPException(status_code=400, detail="screenshot is not valid base64")
+    frame = await angel_image_prep.prepare(shot, req.user_id) if shot else None
+    try:
+        plan = await angel_brain.plan_next_action(frame.b64 if frame else "", req.task, req.url, req.user_id, frame_box=frame.box if frame else None)
+    except BudgetExceededError as e:
+        raise budget_error(e)
+    if plan is None:
+        raise HTTPException(status_code=502, detail="no plan")
+    return {"action": plan.get("action", ""), "params": plan.get("params"), "reason": plan.get("reason")}
+
+class AgentStepReq(BaseModel):
+    user_id: str
+    goal: str
+    observe: str = "image"
+    roi: Optional[List[float]] = None
+    execute: bool = True
+    use_cache: bool = True
+    stream: Optional[bool] = None
+
+@router.post("/agent/step")
+async def agent_step(req: AgentStepReq):
+    """一步完成 截图 -> 预处理 -> 规划 -> 执行，返回决策与各阶段耗时 (observe: image / elements / both；预算耗尽时返回 402)"""
+    from Body.Playwright import angel_browser, serialize_elements
+    from Body.ImagePrep import angel_image_prep
+    from Body.Gemini import angel_brain
+    from Energy.Budget import global_budget, BudgetExceededError, LEVELS
+    want_image = req.observe in ("image", "both")
+    want_elements = req.observe in ("elements", "both")
+    if not (want_image or want_elements):
+        raise HTTPException(status_code=400, detail=f"unknown observe mode: {req.observe}")
+    timings = {}
+    start_t = time.perf_counter()
+    level = await budget_gate(req.user_id)
+    timings["budget"] = {"level": LEVELS[level], "wait_ms": round((time.perf_counter() - start_t) * 1000, 1)}
+
+    async def capture():
+        session = await angel_browser.get_or_create_session(req.user_id)
+        eye = session["eye"]
+        shot = await eye.capture_bytes(global_budget.quality(req.user_id)) if want_image else b""
+        elements = await eye.elements() if want_elements else []
+        return shot, elements, session["page"].url if session["page"] else "", eye.frame_seq
+
+    # 浏览器名额只在截图和执行时占用，模型调用期间释放给其他会话
+    (shot, elements, url, seq), wait_ms, exec_ms = await scheduled(req.user_id, capture)
+    timings["capture"] = {"queue_ms": round(wait_ms, 1), "exec_ms": round(exec_ms, 1)}
+    if want_image and not shot:
+        return JSONResponse(status_code=503, content={"status": "error", "error": "capture failed", "timings": timings})
+
+    start_t = time.perf_counter()
+    frame = await angel_image_prep.prepare(shot, req.user_id, req.roi) if shot else None
+    timings["prep_ms"] = round((time.perf_counter() - start_t) * 1000, 1)
+
+    start_t = time.perf_counter()
+    try:
+        plan = await angel_brain.plan_next_action(
+            frame.b64 if frame else "", req.goal, url, req.user_id, use_cache=req.use_cache, stream=req.stream,
+            frame_box=frame.box if frame else None, elements=serialize_elements(elements) if want_elements else None)
+    except BudgetExceededError as e:
+        raise budget_error(e)
+    timings["plan_ms"] = round((time.perf_counter() - start_t) * 1000, 1)
+    body = {"url": url, "seq": seq, "frame": frame.to_dict() if frame else None, "decision": plan, "timings": timings}
+    if plan is None:
+        body["status"] = "error"
+        body["error"] = "no plan"
+        return JSONResponse(status_code=502, content=body)
+
+    action = {"action_type": plan.get("action", ""), "params": plan.get("params") or {}}
+    if not req.execute or action["action_type"] == "done":
+        body["status"] = "done" if action["action_type"] == "done" else "planned"
+        return body
+
+    async def execute():
+        session = await angel_browser.get_or_create_session(req.user_id)
+        return await run_actions(session, [action])
+
+    (ok, results), wait_ms, exec_ms = await scheduled(req.user_id, execute)
+    timings["execute"] = {"queue_ms": round(wait_ms, 1), "exec_ms": round(exec_ms, 1)}
+    body["status"] = "ok" if ok else "error"
+    body["results"] = results
+    if not ok:
+        return JSONResponse(status_code=500, content=body)
+    return body
 
 class MemoryInterface:
     # =============================================================================
@@ -0,0 +1,148 @@
+# ==========================================================================
+#  📃 文件功能 : 流式规划测试
+#  ⚡ 逻辑摘要 : 用分片 SSE 样本驱动 JsonObjectScanner (字符串被切断、转义引号、Markdown 围栏、截断对象)，
+#               再起一个本地模拟 generateContent / streamGenerateContent 服务，确认流式与阻塞模式返回同一计划。
+#  💡 易懂解释 : 故意把话说得断断续续，看看大脑还能不能听懂！
+#  🔋 未来扩展 : 覆盖 429 换钥与模型级联。
+#  📊 当前状态 : 活跃 (更新: 2026-10-17)
+#
+#  用法:
+#     python -m pytest -q tests
+# ==========================================================================
+
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp") # 📦 Body/Gemini.py 依赖 aiohttp
+from aiohttp import web
+
+# 🛠️ 确保能导入同级模块 (Body, Memory, Energy)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Body.Gemini as gemini
+from Body.Gemini import GeminiClient, JsonObjectScanner
+from Body.KeyPool import angel_key_pool, ApiKey
+
+FIXTURES = {
+    "split_strings": [
+        '{"action": "ty', 'pe", "reason": "brace } in', 'side {text}", "confidence": 0.9, "par',
+        'ams": {"text": "hello wor', 'ld"}}',
+    ], # ✂️ 键、值、字符串内括号都被切断
+    "escaped_quotes": [
+        '{"action": "type", "reason": "quote \\', '"}\\" and slash \\\\',
+        '", "confidence": 0.9, "params": {"text": "say \\"hi\\""}}',
+    ], # ↩️ 转义符与引号分属两片，结尾是转义的反斜杠
+    "fenced_json": [
+        '```json\n{"action": "scroll", ', '"reason": "read more", "confidence": 0.9, "params": {"delta_y": 600}}\n```',
+    ], # 🧱 Markdown 围栏
+} # 📜 分片样本 (每片一个 SSE 事件)
+TRUNCATED = ['{"action": "click", "reason": "cut', ' off", "params": {"x": 0.5, '] # ✂️ 对象没有闭合
+USAGE = {"promptTokenCount": 300, "candidatesTokenCount": 40, "totalTokenCount": 340} # 🧾 模拟用量
+
+def expected(chunks):
+    return json.loads("".join(chunks).replace("```json", "").replace("```", "").strip()) # 📦 整段解析结果
+
+def sse_lines(chunks):
+    lines = [] # 📋 SSE 行
+    for i, text in enumerate(chunks): # 🔄 每片一个事件
+        event = {"candidates": [{"content": {"parts": [{"text": text}]}}]} # 📦 事件
+        if i == len(chunks) - 1: event["usageMetadata"] = USAGE # 🧾 最后一片带用量
+        lines += [f"data: {json.dumps(event)}\r\n".encode("utf-8"), b"\r\n"] # 📤 事件行与空行
+    return lines # 📤 返回行
+
+class FakeResponse:
+    def __init__(self, lines):
+        self.content = self._iter(lines) # 🌊 模拟 aiohttp 的 resp.content
+
+    @staticmethod
+    async def _iter(lines):
+        for line in lines: yield line # 📤 逐行产出
+
+async def scan(chunks):
+    state = {"usage": None, "first_t": None, "images": 0} # 📋 流状态
+    scanner = JsonObjectScanner() # 🔍 增量解析器
+    results = [] # 📋 每片的解析结果
+    async for text in GeminiClient()._sse_chunks(FakeResponse(sse_lines(chunks)), state): results.append(scanner.feed(text)) # 🔍 逐片喂入
+    return results, state # 📤 返回结果
+
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_scanner_closes_on_last_chunk(name):
+    results, state = asyncio.run(scan(FIXTURES[name])) # 🌊 走 SSE 解析
+    assert results[:-1] == [None] * (len(results) - 1) # ⏳ 闭合前不返回
+    assert results[-1] == expected(FIXTURES[name]) # 📦 与整段解析一致
+    assert state["usage"] == USAGE # 🧾 记下用量
+
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_scanner_one_char_per_chunk(name):
+    scanner = JsonObjectScanner() # 🔍 增量解析器
+    plans = [p for p in map(scanner.feed, "".join(FIXTURES[name])) if p is not None] # 🔍 逐字符喂入
+    assert plans[:1] == [expected(FIXTURES[name])] # 📦 任意切分点都能解析
+
+def test_scanner_escaped_quotes_keep_strings_open():
+    plan = asyncio.run(scan(FIXTURES["escaped_quotes"]))[0][-1] # 📦 解析结果
+    assert plan["reason"] == 'quote "}" and slash \\' # ↩️ 字符串内的括号与转义保留
+    assert plan["params"]["text"] == 'say "hi"' # ↩️ 转义引号
+
+def test_scanner_truncated_object():
+    results, _ = asyncio.run(scan(TRUNCATED)) # 🌊 走 SSE 解析
+    assert results == [None] * len(TRUNCATED) # ⏳ 始终未闭合
+
+def mock_app(chunks, calls):
+    async def handle(request):
+        method = request.match_info["call"].split(":")[-1] # 🧭 generateContent / streamGenerateContent
+        calls.append(method) # 📋 记录调用
+        if method == "generateContent": # 🚦 阻塞模式
+            return web.json_response({"candidates": [{"content": {"parts": [{"text": "".join(chunks)}]}}], "usageMetadata": USAGE}) # 📤 完整响应
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"}) # 🌊 SSE 响应
+        await resp.prepare(request) # 📮 发送响应头
+        for line in sse_lines(chunks): await resp.write(line) # 📤 逐行写出
+        await resp.write_eof() # 🏁 结束
+        return resp # 📤 返回响应
+
+    app = web.Application() # 🏗️ 应用
+    app.router.add_post("/v1beta/models/{call}", handle) # 🛣️ model:method 路由
+    return app # 📤 返回应用
+
+@pytest.mark.parametrize("name", sorted(FIXTURES) + ["truncated"])
+def test_stream_and_blocking_return_same_plan(name, monkeypatch):
+    chunks = TRUNCATED if name == "truncated" else FIXTURES[name] # 📜 样本
+    calls = [] # 📋 模拟服务收到的调用
+
+    async def main():
+        runner = web.AppRunner(mock_app(chunks, calls)) # 🏗️ 模拟服务
+        await runner.setup() # ⚙️ 初始化
+        site = web.TCPSite(runner, "127.0.0.1", 0) # 🔌 随机端口
+        await site.start() # 🚀 启动
+        port = site._server.sockets[0].getsockname()[1] # 🔢 实际端口
+        monkeypatch.setattr(gemini, "GEMINI_API_BASE", f"http://127.0.0.1:{port}") # 🔗 指向模拟服务
+        client = GeminiClient() # 🧠 新客户端 (会话绑定本事件循环)
+        drained = asyncio.Event() # 🏁 后台记账结束
+        drain = client._drain_stream # 🧾 原记账任务
+
+        async def watched_drain(*args):
+            try: return await drain(*args) # 🧾 照常记账
+            finally: drained.set() # 🏁 通知结束
+
+        client._drain_stream = watched_drain # 👀 监听后台记账
+        ledger = gemini.global_ai_cost # 🧾 全局账本
+        plans, billed = [], [] # 📋 计划与记账
+        try:
+            for stream in (False, True): # 🔄 阻塞、流式各一次
+                before = (ledger.input_tokens + ledger.output_tokens, ledger.cost_usd) # 📏 调用前
+                plans.append(await client.plan_next_action("", "find the box", "http://example.test/", use_cache=False, stream=stream)) # 📮 规划
+                if stream: await asyncio.wait_for(drained.wait(), 5) # ⏳ 等流式记账读完 (成功在后台，失败就地)
+                billed.append((ledger.input_tokens + ledger.output_tokens - before[0], round(ledger.cost_usd - before[1], 9))) # 🧾 本次记账
+        finally:
+            await client.close() # 🔒 关闭会话
+            await runner.cleanup() # 🛑 停止模拟服务
+        return plans, billed # 📤 返回计划与记账
+
+    monkeypatch.setattr(angel_key_pool, "keys", [ApiKey("AIza" + "0" * 35, 600, 10 ** 7)]) # 🔑 测试密钥
+    (blocking, stream), billed = asyncio.run(main()) # 🚀 运行
+    assert stream == blocking # ⚖️ 两种模式结果一致
+    assert billed[0] == billed[1] and billed[0][0] > 0 # 🧾 两种模式记账一致 (截断对象也照常计费)
+    assert blocking == (None if name == "truncated" else expected(chunks)) # 📦 截断对象两边都返回空
+    assert "generateContent" in calls and "streamGenerateContent" in calls # 🧭 两个端点都被调用